@@ -1,15 +1,40 @@
 # notebooks/25_machine_learning_pipeline.py
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
+from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import joblib
+import os
+import sys
+
+# Registry format the API serves every model from, and the parallel training engine
+sys.path.insert(0, os.path.join('webapp', 'backend'))
+from features import FEATURE_COLUMNS, FeaturePipeline, training_frame
+from model_registry import save_model
+from online import initial_state
+from profiler import TrainingProfiler
+from training import TrainingPool, train_models
+from search import SEARCH_SPACES, successive_halving
+
+# Processes for the (model, fold) fits; default one per CPU
+TRAINING_WORKERS = int(os.environ.get('WATERTRACE_TRAINING_WORKERS', '0')) or None
+# Tune the ensembles by successive halving first; 0 keeps the fixed n_estimators=100 settings
+HYPERPARAMETER_SEARCH = os.environ.get('WATERTRACE_HYPERPARAMETER_SEARCH', '1') != '0'
+
+MODEL_REGISTRY_DIR = 'webapp/backend/data/processed/models'
+# Set to a path to time every stage and (model, fold) fit and save a Chrome trace timeline there;
+# WATERTRACE_PROFILE_MEMORY=1 adds each span's peak allocations, at the cost of slower fits
+PROFILE_TRACE = os.environ.get('WATERTRACE_PROFILE')
+PROFILER = TrainingProfiler(enabled=bool(PROFILE_TRACE), memory=os.environ.get('WATERTRACE_PROFILE_MEMORY') == '1')
 
 def create_ml_features():
-    """Create features for machine learning from both datasets"""
+    """Create features for machine learning from both datasets
+
+    Returns the training rows and the feature state after the last month,
+    which the API continues from (features.py builds both).
+    """
     
     # Load both datasets
     grace_df = pd.read_csv('data/csv/pakistan_grace_2002_2017_complete.csv')
@@ -19,9 +44,9 @@ def create_ml_features():
     grace_df['date'] = pd.to_datetime(grace_df['date'])
     grace_df = grace_df.sort_values('date')
     
-    # Create time-based features
-    grace_df['year'] = grace_df['date'].dt.year
-    grace_df['month'] = grace_df['date'].dt.month
+    # Lags, rolling averages, trend and seasonal features, shared with the API
+    pipeline = FeaturePipeline.fit(grace_df['groundwater_cm'], grace_df['date'])
+    grace_df = training_frame(grace_df['date'], grace_df['groundwater_cm'])
     grace_df['season'] = grace_df['month'].map({
         12: 'Winter', 1: 'Winter', 2: 'Winter',
         3: 'Spring', 4: 'Spring', 5: 'Spring', 
@@ -29,123 +54,109 @@ def create_ml_features():
         9: 'Autumn', 10: 'Autumn', 11: 'Autumn'
     })
     
-    # Create lag features
-    for lag in [1, 2, 3, 6, 12]:
-        grace_df[f'gw_lag_{lag}'] = grace_df['groundwater_cm'].shift(lag)
-    
-    # Create rolling averages
-    for window in [3, 6, 12]:
-        grace_df[f'gw_ma_{window}'] = grace_df['groundwater_cm'].rolling(window=window).mean()
-    
-    # Create trend and seasonal decomposition features
-    grace_df['linear_trend'] = range(len(grace_df))
-    grace_df['seasonal_avg'] = grace_df.groupby('month')['groundwater_cm'].transform('mean')
-    grace_df['seasonal_anomaly'] = grace_df['groundwater_cm'] - grace_df['seasonal_avg']
-    
     # Drop rows with NaN values (due to lag features)
     grace_ml = grace_df.dropna()
     
-    return grace_ml
+    return grace_ml, pipeline
+
+def tune_ensembles(X, y, feature_cols):
+    """Best parameters of each searched model by time series CV (successive halving)"""
+    tuned = {}
+    with TrainingPool({'pakistan': (X.to_numpy(), y.to_numpy(), feature_cols)}, TRAINING_WORKERS) as pool:
+        for name, (estimator, scale, grid) in SEARCH_SPACES.items():
+            print(f"🔎 Searching {name}...")
+            search = successive_halving(pool, 'pakistan', estimator, scale, grid)
+            for rung in search['rungs']:
+                print(f"   {rung['candidates']:>3} candidates x {rung['budget']:>3} trees: "
+                      f"best CV {rung['best_score']:.3f} ({rung['seconds']:.1f} s)")
+            print(f"   ✅ {search['best_params']}")
+            tuned[name] = search['best_params']
+    return tuned
 
 def train_prediction_models():
     """Train multiple ML models for groundwater prediction"""
     
     # Prepare data
-    ml_data = create_ml_features()
+    with PROFILER.stage('create features'):
+        ml_data, pipeline = create_ml_features()
     
     # Define features and target
-    feature_cols = [col for col in ml_data.columns if col not in 
-                   ['date', 'groundwater_cm', 'season', 'data_source', 'system_time', 'variable', '.geo', 'system:index']]
+    feature_cols = list(FEATURE_COLUMNS)
     
     X = ml_data[feature_cols]
     y = ml_data['groundwater_cm']
     
-    # Time series split (important for temporal data)
-    tscv = TimeSeriesSplit(n_splits=5)
-    
-    # Models to test
+    # Models to test; True scales features (inside each fold) first
     models = {
-        'Linear Regression': LinearRegression(),
-        'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
-        'Gradient Boosting': GradientBoostingRegressor(n_estimators=100, random_state=42)
+        'Linear Regression': (LinearRegression(), True),
+        'Random Forest': (RandomForestRegressor(n_estimators=100, random_state=42), False),
+        'Gradient Boosting': (GradientBoostingRegressor(n_estimators=100, random_state=42), False)
     }
-    
-    # Train and evaluate models
+    with PROFILER.stage('tune hyperparameters'):
+        tuned = tune_ensembles(X, y, feature_cols) if HYPERPARAMETER_SEARCH else {}
+    for name, params in tuned.items():
+        models[name][0].set_params(**params)
+    
+    # Every model's 5 time series folds and final fit run as parallel tasks
+    print(f"🤖 Training {', '.join(models)} ({len(models) * 6} fits in parallel)...")
+    with PROFILER.stage('train models'):
+        trained = train_models({'pakistan': (X.to_numpy(), y.to_numpy(), feature_cols)}, models,
+                               n_splits=5, workers=TRAINING_WORKERS, profiler=PROFILER)['pakistan']
+    
+    # Evaluate models
     results = {}
     
-    for name, model in models.items():
-        print(f"🤖 Training {name}...")
-        
-        # Cross-validation scores
-        cv_scores = []
-        feature_importance_sum = np.zeros(len(feature_cols))
-        
-        for train_idx, val_idx in tscv.split(X):
-            X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-            y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-            
-            # Scale features
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_val_scaled = scaler.transform(X_val)
-            
-            # Train model
-            if name == 'Linear Regression':
-                model.fit(X_train_scaled, y_train)
-                y_pred = model.predict(X_val_scaled)
-            else:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_val)
-                
-                # Accumulate feature importance
-                if hasattr(model, 'feature_importances_'):
-                    feature_importance_sum += model.feature_importances_
-            
-            # Calculate metrics
-            cv_score = r2_score(y_val, y_pred)
-            cv_scores.append(cv_score)
-        
-        # Final model training on full dataset
-        scaler = StandardScaler()
-        if name == 'Linear Regression':
-            X_scaled = scaler.fit_transform(X)
-            model.fit(X_scaled, y)
-            final_pred = model.predict(X_scaled)
-        else:
-            model.fit(X, y)
-            final_pred = model.predict(X)
+    for name, fit in trained.items():
+        cv_scores = fit['cv_scores']
+        final_pred = fit['prediction']
         
         # Calculate final metrics
-        rmse = np.sqrt(mean_squared_error(y, final_pred))
-        mae = mean_absolute_error(y, final_pred)
-        r2 = r2_score(y, final_pred)
+        with PROFILER.stage('score model', model=name):
+            rmse = np.sqrt(mean_squared_error(y, final_pred))
+            mae = mean_absolute_error(y, final_pred)
+            r2 = r2_score(y, final_pred)
         
         results[name] = {
-            'model': model,
-            'scaler': scaler if name == 'Linear Regression' else None,
+            'model': fit['estimator'],
+            'scaler': fit['scaler'],
             'cv_scores': cv_scores,
             'cv_mean': np.mean(cv_scores),
             'cv_std': np.std(cv_scores),
             'rmse': rmse,
             'mae': mae,
             'r2': r2,
-            'feature_importance': feature_importance_sum / 5 if hasattr(model, 'feature_importances_') else None
+            'feature_importance': fit['feature_importance'] / 5 if fit['feature_importance'] is not None else None
         }
         
+        print(f"🤖 {name}")
         print(f"   ✅ R² Score: {r2:.3f}")
         print(f"   ✅ RMSE: {rmse:.3f}")
         print(f"   ✅ CV Score: {np.mean(cv_scores):.3f} ± {np.std(cv_scores):.3f}")
     
-    # Select best model
-    best_model_name = max(results.keys(), key=lambda x: results[x]['r2'])
+    # Select best model by time series CV; in-sample R² rewards overfitting
+    best_model_name = max(results.keys(), key=lambda x: results[x]['cv_mean'])
     best_model = results[best_model_name]
     
     print(f"\n🏆 Best Model: {best_model_name}")
     
+    # Register every model so the API can serve any of them (?model=...), the best by default
+    for name, result in results.items():
+        with PROFILER.stage('register model', model=name):
+            meta = save_model(
+                MODEL_REGISTRY_DIR, name.lower().replace(' ', '_'), result['model'], result['scaler'],
+                feature_names=feature_cols,
+                metrics={key: float(result[key]) for key in ('r2', 'rmse', 'mae', 'cv_mean', 'cv_std')},
+                info={'title': name, 'rows': len(X), 'params': tuned.get(name)}, pipeline=pipeline,
+                online=initial_state(result['model'], result['scaler'], X.to_numpy(), y.to_numpy(), feature_cols),
+                default=name == best_model_name
+            )
+        print(f"   📦 Registered {meta['name']} ({meta['format']}, version {meta['version']})")
+    
     # Save best model
-    joblib.dump(best_model['model'], 'data/processed/best_groundwater_model.pkl')
-    if best_model['scaler']:
-        joblib.dump(best_model['scaler'], 'data/processed/feature_scaler.pkl')
+    with PROFILER.stage('save best model'):
+        joblib.dump(best_model['model'], 'data/processed/best_groundwater_model.pkl')
+        if best_model['scaler']:
+            joblib.dump(best_model['scaler'], 'data/processed/feature_scaler.pkl')
     
     # Save feature importance
     if best_model['feature_importance'] is not None:
@@ -162,6 +173,13 @@ def train_prediction_models():
     
     return results, feature_cols
 
-# Execute ML pipeline
-ml_results, features = train_prediction_models()
-print("✅ Machine learning pipeline completed!")
\ No newline at end of file
+# Execute ML pipeline (guarded: spawned training workers import this file)
+if __name__ == '__main__':
+    with PROFILER:
+        ml_results, features = train_prediction_models()
+    print("✅ Machine learning pipeline completed!")
+    if PROFILE_TRACE:
+        print("\n⏱️ Training profile:")
+        PROFILER.print_summary()
+        PROFILER.write_trace(PROFILE_TRACE)
+        print(f"📈 Timeline saved: {PROFILE_TRACE} (open in chrome://tracing or ui.perfetto.dev)")
\ No newline at end of file
@@ -0,0 +1,188 @@
+# notebooks/15_district_zonal_statistics.py
+import ee
+import geopandas as gpd
+import numpy as np
+import json
+import os
+import sys
+
+# Zonal statistics engine and table format shared with the API
+sys.path.insert(0, os.path.join('webapp', 'backend'))
+from zonal import Grid, overlap_weights, zonal_mean, geojson_polygons, polygon_centroid
+from districts import save_district_table
+from cube import write_cube
+
+print("🗺️ Computing district-level groundwater from GRACE/GLDAS grids...")
+
+# Load project configuration
+with open('data/processed/earth_engine_config.json', 'r') as f:
+    config = json.load(f)
+PROJECT_ID = config['project_id']
+
+ee.Initialize(project=PROJECT_ID)
+
+GRID_CACHE_DIR = 'data/raw/grids'
+TABLE_PATH = 'webapp/backend/data/processed/district_groundwater.npz'
+BOUNDARIES_PATH = 'webapp/backend/data/processed/district_boundaries.geojson'
+CUBE_DIR = 'webapp/backend/data/processed/district_cube'
+os.makedirs(GRID_CACHE_DIR, exist_ok=True)
+
+# Load cleaned districts
+districts_gdf = gpd.read_file("data/processed/pakistan_districts_cleaned.shp").to_crs(epsg=4326)
+districts_gdf['geometry'] = districts_gdf.geometry.buffer(0)  # Repair self-intersections before clipping
+zones = [geojson_polygons(geom.__geo_interface__) for geom in districts_gdf.geometry]
+bounds = districts_gdf.total_bounds
+
+print(f"📋 Districts: {len(districts_gdf)}")
+
+def snapped_grid(cell_size, origin=0.0):
+    """Grid aligned to the dataset's native pixels that covers every district"""
+    west = origin + np.floor((bounds[0] - origin) / cell_size) * cell_size
+    east = origin + np.ceil((bounds[2] - origin) / cell_size) * cell_size
+    south = origin + np.floor((bounds[1] - origin) / cell_size) * cell_size
+    north = origin + np.ceil((bounds[3] - origin) / cell_size) * cell_size
+    return Grid(west, north, cell_size, cell_size,
+                int(round((east - west) / cell_size)), int(round((north - south) / cell_size)))
+
+def fetch_pixels(image, band, grid, nodata=-9999.0):
+    """Download one band of an image on ``grid`` as a float array (NaN where masked)"""
+    pixels = ee.data.computePixels({
+        'expression': image.select(band).unmask(nodata),
+        'fileFormat': 'NUMPY_NDARRAY',
+        'grid': {
+            'dimensions': {'width': grid.width, 'height': grid.height},
+            'affineTransform': {
+                'scaleX': grid.cell_width, 'shearX': 0, 'translateX': grid.west,
+                'shearY': 0, 'scaleY': -grid.cell_height, 'translateY': grid.north
+            },
+            'crsCode': 'EPSG:4326'
+        }
+    })[band].astype(np.float64)
+    pixels[pixels == nodata] = np.nan
+    return pixels
+
+def fetch_stack(name, images, band, grid):
+    """Monthly field stack for ``images`` [(date, ee.Image)], cached on disk"""
+    cache_path = os.path.join(GRID_CACHE_DIR, f'{name}.npz')
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if cached['fields'].shape[1:] == grid.shape:
+            print(f"   ♻️ Using cached {name} grids ({cache_path})")
+            return cached['dates'], cached['fields']
+
+    dates, fields = [], []
+    for i, (date, image) in enumerate(images):
+        fields.append(fetch_pixels(image, band, grid))
+        dates.append(date)
+        if (i + 1) % 12 == 0:
+            print(f"   ⏳ {name}: {i + 1}/{len(images)} months")
+    dates = np.array(dates, dtype='datetime64[D]')
+    fields = np.stack(fields)
+    np.savez_compressed(cache_path, dates=dates, fields=fields)
+    return dates, fields
+
+# ========================================
+# PART 1: GRACE monthly grids (2002-2017)
+# ========================================
+print("\n🛰️ PART 1: Downloading GRACE grids (0.5°)")
+
+grace_band = 'lwe_thickness'
+grace_grid = snapped_grid(0.5)  # Mascon CRI pixels are centred on the quarter degree, edges on the half
+grace = ee.ImageCollection('NASA/GRACE/MASS_GRIDS/MASCON_CRI').filterDate('2002-01-01', '2017-12-31')
+grace_times = grace.aggregate_array('system:time_start').getInfo()
+grace_list = grace.toList(len(grace_times))
+grace_images = [
+    (np.datetime64(int(t), 'ms').astype('datetime64[D]'), ee.Image(grace_list.get(i)))
+    for i, t in enumerate(grace_times)
+]
+grace_dates, grace_fields = fetch_stack('grace_mascon_cri', grace_images, grace_band, grace_grid)
+print(f"📊 GRACE: {len(grace_dates)} months on a {grace_grid.width}x{grace_grid.height} grid")
+
+# ========================================
+# PART 2: GLDAS monthly grids (2018-2024)
+# ========================================
+print("\n🌱 PART 2: Downloading GLDAS grids (0.25°)")
+
+gldas_band = 'SoilMoi100_200cm_inst'
+gldas_grid = snapped_grid(0.25)
+gldas = ee.ImageCollection('NASA/GLDAS/V021/NOAH/G025/T3H').select(gldas_band)
+gldas_images = []
+for year in range(2018, 2025):
+    for month in range(1, 13):
+        start = ee.Date.fromYMD(year, month, 1)
+        gldas_images.append((np.datetime64(f'{year}-{month:02d}-15'), gldas.filterDate(start, start.advance(1, 'month')).mean()))
+gldas_dates, gldas_fields = fetch_stack('gldas_soil_moisture', gldas_images, gldas_band, gldas_grid)
+print(f"📊 GLDAS: {len(gldas_dates)} months on a {gldas_grid.width}x{gldas_grid.height} grid")
+
+# ========================================
+# PART 3: Area-weighted zonal statistics
+# ========================================
+print("\n📐 PART 3: Computing pixel-overlap weights and district means")
+
+grace_weights = overlap_weights(zones, grace_grid)
+gldas_weights = overlap_weights(zones, gldas_grid)
+print(f"   GRACE: {len(grace_weights.weight)} district/pixel overlaps")
+print(f"   GLDAS: {len(gldas_weights.weight)} district/pixel overlaps")
+
+grace_series = zonal_mean(grace_weights, grace_fields).T  # districts x months
+gldas_series = zonal_mean(gldas_weights, gldas_fields).T
+
+missing_grace = int(np.isnan(grace_series).all(axis=1).sum())
+missing_gldas = int(np.isnan(gldas_series).all(axis=1).sum())
+print(f"   Districts without GRACE data: {missing_grace}, without GLDAS data: {missing_gldas}")
+
+# ========================================
+# PART 4: Save the indexed table and boundaries for the API
+# ========================================
+print("\n💾 PART 4: Saving district table")
+
+centroids = np.array([polygon_centroid(polygons) for polygons in zones])
+save_district_table(
+    TABLE_PATH,
+    district=districts_gdf['DISTRICT'].astype(str).values,
+    province=districts_gdf['PROVINCE_C'].fillna(districts_gdf['PROVINCE']).astype(str).values,
+    lon=centroids[:, 0],
+    lat=centroids[:, 1],
+    grace_dates=grace_dates,
+    grace_anomaly_cm=grace_series,
+    gldas_dates=gldas_dates,
+    gldas_soil_moisture=gldas_series
+)
+print(f"✅ District table saved: {TABLE_PATH}")
+
+# Simplified boundaries for ?geometry=polygon (about 1 km tolerance)
+boundaries = districts_gdf[['DISTRICT', 'PROVINCE_C', 'geometry']].rename(
+    columns={'DISTRICT': 'district', 'PROVINCE_C': 'province'}
+)
+boundaries['geometry'] = boundaries.geometry.simplify(0.01, preserve_topology=True)
+boundaries.to_file(BOUNDARIES_PATH, driver='GeoJSON', COORDINATE_PRECISION=4)
+print(f"✅ Boundaries saved: {BOUNDARIES_PATH}")
+
+# District x month x variable cube on one monthly axis, memory-mapped by the API
+cube_index = write_cube(
+    CUBE_DIR,
+    codes=districts_gdf['OBJECTID'].astype(int).values,
+    districts=districts_gdf['DISTRICT'].astype(str).values,
+    provinces=districts_gdf['PROVINCE_C'].fillna(districts_gdf['PROVINCE']).astype(str).values,
+    variables={
+        'grace_anomaly_cm': (grace_dates, grace_series, 'cm'),
+        'gldas_soil_moisture': (gldas_dates, gldas_series, 'kg/m²')
+    }
+)
+print(f"✅ District cube saved: {CUBE_DIR} ({len(cube_index['codes'])} districts x {cube_index['months']} months "
+      f"x {len(cube_index['variables'])} variables from {cube_index['start_month']})")
+
+# Save summary
+summary = {
+    'districts': len(districts_gdf),
+    'grace': {'months': len(grace_dates), 'grid': grace_grid.describe(), 'overlaps': len(grace_weights.weight),
+              'districts_without_data': missing_grace},
+    'gldas': {'months': len(gldas_dates), 'grid': gldas_grid.describe(), 'overlaps': len(gldas_weights.weight),
+              'districts_without_data': missing_gldas},
+    'method': 'Pixel-overlap area weights (cos-latitude scaled), NaN pixels excluded and weights renormalized'
+}
+with open('data/processed/district_zonal_summary.json', 'w') as f:
+    json.dump(summary, f, indent=2)
+
+print("✅ Summary saved: data/processed/district_zonal_summary.json")
+print("\n🎉 District zonal statistics complete! Restart or wait for the API to hot-reload the table.")
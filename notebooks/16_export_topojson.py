@@ -0,0 +1,130 @@
+# notebooks/16_export_topojson.py
+import gzip
+import json
+import os
+import sys
+
+import numpy as np
+import shapely
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Shapefile reader and topology builder shared with the API
+sys.path.insert(0, os.path.join('webapp', 'backend'))
+from spatial import DistrictIndex
+from topology import Topology, dumps
+
+print("🗺️ Exporting district boundaries as quantized TopoJSON...")
+
+SHAPEFILE = 'webapp/backend/data/processed/pakistan_districts_cleaned.shp'
+OUTPUT_DIR = 'webapp/backend/data/processed/district_topology'
+QUANTIZATION = 100_000  # ~20 m grid steps across Pakistan's bounding box
+
+# Douglas-Peucker tolerance per level, in degrees (0.001° ≈ 100 m)
+LEVELS = {
+    'full': 0.0,
+    'high': 0.001,
+    'medium': 0.005,
+    'low': 0.02
+}
+DEFAULT_LEVEL = 'medium'
+
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+def local_meters(geometries, lat0):
+    """Equirectangular meters around lat0, close enough to measure errors at district scale"""
+    kx = 111_320 * np.cos(np.radians(lat0))
+    return shapely.transform(geometries, lambda coords: coords * [kx, 110_574])
+
+def geojson_bytes(geometries, properties):
+    """Size of the same geometry as plain GeoJSON at 5 decimals (~1 m), for comparison"""
+    features = []
+    for geometry, props in zip(geometries, properties):
+        rounded = shapely.transform(geometry, lambda coords: np.round(coords, 5))
+        features.append({'type': 'Feature', 'properties': props, 'geometry': json.loads(shapely.to_geojson(rounded))})
+    return json.dumps({'type': 'FeatureCollection', 'features': features}, separators=(',', ':')).encode('utf-8')
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+# ========================================
+# PART 1: Build the shared-arc topology
+# ========================================
+index = DistrictIndex.from_shapefile(SHAPEFILE)
+properties = [{'district': district, 'province': province}
+              for district, province in zip(index.districts.tolist(), index.provinces.tolist())]
+source_vertices = int(shapely.get_num_coordinates(index.geometries).sum())
+
+topology = Topology(index.geometries, properties, quantization=QUANTIZATION)
+topology_vertices = sum(len(arc) for arc in topology.arcs)
+print(f"📋 Districts: {len(index)}, rings: {len(topology.rings())}")
+print(f"🔗 {source_vertices:,} shapefile vertices -> {len(topology.arcs)} arcs with {topology_vertices:,} vertices "
+      f"({1 - topology_vertices / source_vertices:.0%} were shared borders stored twice)")
+
+# ========================================
+# PART 2: Simplify, measure and write each level
+# ========================================
+print("\n📐 Simplifying levels")
+lat0 = (topology.bbox[1] + topology.bbox[3]) / 2
+original_m = local_meters(index.geometries, lat0)
+
+report = {}
+print(f"{'level':<8} {'tol °':>7} {'vertices':>9} {'KB':>7} {'KB gz':>7} {'KB br':>7} {'GeoJSON KB':>11} "
+      f"{'Hausdorff max m':>16} {'p95 m':>7}")
+for level, tolerance in LEVELS.items():
+    arcs = topology.simplify(tolerance)
+    body = dumps(topology.to_topojson(arcs))
+    rebuilt = topology.geometries(arcs)
+    error = shapely.hausdorff_distance(original_m, local_meters(rebuilt, lat0))
+
+    path = os.path.join(OUTPUT_DIR, f'{level}.topojson')
+    write(path, body)
+    sizes = {'bytes': len(body)}
+    # Compressed once here at the highest levels; the API serves these files as they are
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    write(path + '-gz', gz)
+    sizes['bytes_gzip'] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        write(path + '-br', br)
+        sizes['bytes_br'] = len(br)
+    elif os.path.exists(path + '-br'):
+        os.remove(path + '-br')
+
+    geojson_size = len(geojson_bytes(rebuilt, properties))
+    report[level] = dict(
+        file=os.path.basename(path),
+        tolerance_deg=tolerance,
+        vertices=sum(len(arc) for arc in arcs),
+        geojson_bytes=geojson_size,
+        hausdorff_max_m=round(float(error.max()), 1),
+        hausdorff_p95_m=round(float(np.percentile(error, 95)), 1),
+        invalid_districts=int((~shapely.is_valid(rebuilt)).sum()),
+        **sizes
+    )
+    print(f"{level:<8} {tolerance:>7} {report[level]['vertices']:>9,} {len(body) / 1024:>7.1f} "
+          f"{len(gz) / 1024:>7.1f} {sizes.get('bytes_br', 0) / 1024:>7.1f} {geojson_size / 1024:>11.1f} "
+          f"{report[level]['hausdorff_max_m']:>16,.1f} {report[level]['hausdorff_p95_m']:>7,.1f}")
+
+# ========================================
+# PART 3: Save the report (the API watches it and reloads all levels)
+# ========================================
+manifest = {
+    'source': os.path.basename(SHAPEFILE),
+    'districts': len(index),
+    'quantization': QUANTIZATION,
+    'source_vertices': source_vertices,
+    'arcs': len(topology.arcs),
+    'default_level': DEFAULT_LEVEL,
+    'levels': report,
+    'method': 'Shared arcs on a quantized grid, Douglas-Peucker per arc with fixed end points'
+}
+with open(os.path.join(OUTPUT_DIR, 'levels.json'), 'w') as f:
+    json.dump(manifest, f, indent=2)
+
+print(f"\n✅ Levels saved to {OUTPUT_DIR}")
+print("🎉 TopoJSON export complete! Restart or wait for the API to hot-reload the levels.")
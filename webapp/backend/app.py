@@ -1,12 +1,38 @@
 # webapp/backend/app.py
-from flask import Flask, jsonify, request, send_from_directory
-from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import joblib
+from contextlib import nullcontext
 from datetime import datetime
 import json
 
+from startup import startup_phases
+
+# Time each heavy import so /api/health can report where cold starts go
+with startup_phases.phase('import flask'):
+    from flask import Flask, Response, g, got_request_exception, jsonify, redirect, request, send_from_directory, stream_with_context
+    from flask_cors import CORS
+with startup_phases.phase('import numpy'):
+    import numpy as np
+with startup_phases.phase('import pandas'):
+    import pandas as pd
+with startup_phases.phase('import joblib'):
+    import joblib
+
+from batch_predict import BatchError, read_batch_frame, validate_features
+from columnar import BINARY_ENCODERS
+from cube import INDEX_FILE, DistrictCube
+from districts import DistrictTable, water_status
+from features import BUFFER_MONTHS, FeaturePipeline
+from forecast import month_axis, recursive_forecast
+from metrics import PROMETHEUS_MIME, ROUTE_KEY, MetricsMiddleware, metrics
+from model_registry import REGISTRY_FILE, ModelRegistry, ServedModel
+from prediction_cache import PredictionCache, normalize_features
+from response_cache import ResponseCache, payload_response, read_payload
+from serialization import float_values, int_values, iso_dates, nullable_floats, records
+from snapshot import Snapshot, SnapshotManager, file_sha256
+from spatial import DistrictIndex, PointsError, parse_coordinate, read_points
+from streaming import STREAM_FORMATS, column_blocks, encode_stream, requested_format
+from tiles import DistrictTiles, valid_tile
+from timeseries import apply_window, parse_window
+
 app = Flask(__name__)
 
 # Configure CORS for production
@@ -17,46 +43,188 @@ CORS(app,
      supports_credentials=True
 )
 
-# Load models and data
-try:
-    import os
-    # Get the base directory (webapp/backend)
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Use local data directory
-    model_path = os.path.join(base_dir, 'data', 'processed', 'best_groundwater_model.pkl')
-    scaler_path = os.path.join(base_dir, 'data', 'processed', 'feature_scaler.pkl')
-    grace_path = os.path.join(base_dir, 'data', 'csv', 'pakistan_grace_2002_2017_complete.csv')
-    gldas_path = os.path.join(base_dir, 'data', 'csv', 'pakistan_gldas_2018_2024_monthly.csv')
+# Per-route request counts, latency, payload sizes and errors, served on /metrics
+app.wsgi_app = MetricsMiddleware(app.wsgi_app, metrics)
+
+@app.before_request
+def tag_route():
+    """Label the request with its route pattern for the metrics middleware"""
+    if request.url_rule is not None:
+        request.environ[ROUTE_KEY] = request.url_rule.rule
+
+def count_exception(sender, exception, **extra):
+    metrics.exceptions.inc((request.environ.get(ROUTE_KEY, request.path), type(exception).__name__))
+
+got_request_exception.connect(count_exception, app)
+
+# Pre-serialized payloads for endpoints that only change with the datasets
+response_cache = ResponseCache(dumps=lambda payload: app.json.dumps(payload, separators=(',', ':')))
+
+# Single /api/predict results by model version and features, cleared on every snapshot swap
+prediction_cache = PredictionCache()
+
+def columnar_payload(key):
+    """Register a ``(columns, metadata)`` builder under every binary format for ``key``"""
+    def register(builder):
+        for mimetype, encode in BINARY_ENCODERS.items():
+            response_cache.payload(key, mimetype)(lambda encode=encode: encode(*builder()))
+        return builder
+    return register
+
+import os
+# Get the base directory (webapp/backend)
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Use local data directory
+model_path = os.path.join(base_dir, 'data', 'processed', 'best_groundwater_model.pkl')
+scaler_path = os.path.join(base_dir, 'data', 'processed', 'feature_scaler.pkl')
+model_registry_path = os.path.join(base_dir, 'data', 'processed', 'models', REGISTRY_FILE)
+# Name the single best_groundwater_model.pkl is served under when there is no registry
+LEGACY_MODEL = 'best'
+# The benchmark suite points these at synthetic, larger datasets
+grace_path = os.environ.get('WATERTRACE_GRACE_CSV') or os.path.join(base_dir, 'data', 'csv', 'pakistan_grace_2002_2017_complete.csv')
+gldas_path = os.environ.get('WATERTRACE_GLDAS_CSV') or os.path.join(base_dir, 'data', 'csv', 'pakistan_gldas_2018_2024_monthly.csv')
+district_table_path = os.path.join(base_dir, 'data', 'processed', 'district_groundwater.npz')
+district_boundaries_path = os.path.join(base_dir, 'data', 'processed', 'district_boundaries.geojson')
+district_shapes_path = os.path.join(base_dir, 'data', 'processed', 'pakistan_districts_cleaned.shp')
+district_topology_path = os.path.join(base_dir, 'data', 'processed', 'district_topology', 'levels.json')
+district_cube_path = os.path.join(base_dir, 'data', 'processed', 'district_cube', INDEX_FILE)
+
+def load_topology_levels(manifest_path):
+    """Report and payload (with its precompressed variants) of every exported TopoJSON level"""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    directory = os.path.dirname(manifest_path)
+    payloads = {level: read_payload(os.path.join(directory, info['file']))
+                for level, info in manifest['levels'].items()}
+    return manifest, payloads
+
+def load_artifacts(paths):
+    """Load the model, scaler and date-sorted datasets for one snapshot"""
+    # First load happens at startup; later ones are hot reloads and not startup phases
+    timed = startup_phases.phase if snapshots.current is None else (lambda name: nullcontext())
     
-    # Load model
-    model = joblib.load(model_path)
-    try:
-        scaler = joblib.load(scaler_path)
-    except:
-        scaler = None
+    # Every model notebook 13 trained, as arrays all workers map read-only. Without a
+    # registry the single best model is unpickled (importing scikit-learn) and served alone
+    model = scaler = None
+    if os.path.exists(paths['models']):
+        with timed('map model registry'):
+            models = ModelRegistry.load(paths['models'])
+    else:
+        with timed('load model'):
+            model = joblib.load(paths['model'])
+        with timed('load scaler'):
+            try:
+                scaler = joblib.load(paths['scaler'])
+            except:
+                scaler = None
+        legacy = ServedModel.from_estimator(LEGACY_MODEL, model, scaler, version=file_sha256(paths['model'])[:12])
+        models = ModelRegistry({LEGACY_MODEL: legacy}, LEGACY_MODEL)
     
     # Load processed datasets
-    grace_data = pd.read_csv(grace_path)
-    gldas_data = pd.read_csv(gldas_path)
-    
-    grace_data['date'] = pd.to_datetime(grace_data['date'])
-    gldas_data['date'] = pd.to_datetime(gldas_data['date'])
-    
-    print("✅ Models and data loaded successfully")
-    print(f"Model path: {model_path}")
-    print(f"GRACE data shape: {grace_data.shape}")
-    print(f"GLDAS data shape: {gldas_data.shape}")
-    
-except Exception as e:
-    print(f"⚠️ Error loading models/data: {e}")
-    print(f"Current working directory: {os.getcwd()}")
-    print(f"Base directory: {base_dir}")
-    print(f"Looking for model at: {model_path}")
-    print(f"Files in base dir: {os.listdir(base_dir) if os.path.exists(base_dir) else 'Base dir not found'}")
-    model = None
-    grace_data = None
-    gldas_data = None
+    with timed('load datasets'):
+        grace_data = pd.read_csv(paths['grace'])
+        gldas_data = pd.read_csv(paths['gldas'])
+        
+        grace_data['date'] = pd.to_datetime(grace_data['date'])
+        gldas_data['date'] = pd.to_datetime(gldas_data['date'])
+        
+        # Keep both series date-sorted so range queries can binary search
+        grace_data = grace_data.sort_values('date', kind='stable').reset_index(drop=True)
+        gldas_data = gldas_data.sort_values('date', kind='stable').reset_index(drop=True)
+    
+    # Lags, rolling means and seasonal means after the last GRACE month, for models without their own
+    feature_pipeline = FeaturePipeline.fit(grace_data['groundwater_cm'], grace_data['date'])
+    
+    # Per-district zonal statistics from notebook 15 (optional: the map falls back to estimates)
+    district_table = None
+    if os.path.exists(paths['districts']):
+        with timed('load district table'):
+            boundaries = paths['boundaries'] if os.path.exists(paths['boundaries']) else None
+            district_table = DistrictTable.load(paths['districts'], boundaries)
+    
+    # District polygons for point lookups
+    district_index = None
+    if os.path.exists(paths['shapes']):
+        with timed('build district index'):
+            district_index = DistrictIndex.from_shapefile(paths['shapes'])
+    
+    # Quantized TopoJSON levels from notebook 16
+    district_topology = None
+    if os.path.exists(paths['topology']):
+        with timed('load district topology'):
+            district_topology = load_topology_levels(paths['topology'])
+    
+    # District x month x variable cube from notebook 15, memory-mapped (shared by all workers)
+    district_cube = None
+    if os.path.exists(paths['cube']):
+        with timed('map district cube'):
+            district_cube = DistrictCube.load(paths['cube'])
+    
+    return {'model': model, 'scaler': scaler, 'models': models, 'grace_data': grace_data, 'gldas_data': gldas_data,
+            'feature_pipeline': feature_pipeline, 'district_table': district_table, 'district_index': district_index,
+            'district_topology': district_topology, 'district_cube': district_cube}
+
+def prepare_snapshot(snapshot):
+    """Build the cached payloads of a snapshot before it goes live"""
+    timed = startup_phases.phase if snapshots.current is None else (lambda name: nullcontext())
+    with timed('build response cache'):
+        responses = response_cache.build_all()
+    # Tiles are built on demand; this only projects the polygons and attaches the values
+    tiles = None
+    if snapshot.district_index is not None:
+        tiles = DistrictTiles(snapshot.district_index, snapshot.district_table, version=snapshot.version)
+    return {'responses': responses, 'tiles': tiles}
+
+def install_snapshot(snapshot):
+    response_cache.install(snapshot.parts.get('responses', {}))
+    prediction_cache.clear()
+
+snapshots = SnapshotManager(
+    {'model': model_path, 'scaler': scaler_path, 'models': model_registry_path, 'grace': grace_path, 'gldas': gldas_path,
+     'districts': district_table_path, 'boundaries': district_boundaries_path,
+     'shapes': district_shapes_path, 'shape_records': os.path.splitext(district_shapes_path)[0] + '.dbf',
+     'topology': district_topology_path, 'cube': district_cube_path},
+    load_artifacts, prepare=prepare_snapshot, install=install_snapshot
+)
+
+def current_snapshot():
+    """Snapshot pinned for the current request (the live one outside requests)"""
+    return snapshots.snapshot()
+
+def load_data():
+    """Load models and datasets as the first snapshot"""
+    try:
+        snapshot = snapshots.load()
+        
+        print("✅ Models and data loaded successfully")
+        print(f"Model path: {model_path}")
+        print(f"GRACE data shape: {snapshot.grace_data.shape}")
+        print(f"GLDAS data shape: {snapshot.gldas_data.shape}")
+        print(f"Data snapshot: {snapshot.version}")
+        
+    except Exception as e:
+        print(f"⚠️ Error loading models/data: {e}")
+        print(f"Current working directory: {os.getcwd()}")
+        print(f"Base directory: {base_dir}")
+        print(f"Looking for model at: {model_path}")
+        print(f"Files in base dir: {os.listdir(base_dir) if os.path.exists(base_dir) else 'Base dir not found'}")
+        # Serve the "not available" errors until the watcher sees loadable files
+        snapshots.swap(Snapshot(None, {}, model=None, scaler=None, models=None, grace_data=None, gldas_data=None,
+                                feature_pipeline=None, district_table=None, district_index=None, district_topology=None, district_cube=None,
+                                tiles=None))
+
+@app.before_request
+def pin_snapshot():
+    """Serve the whole request from the snapshot that is live when it starts"""
+    snapshots.ensure_watching()
+    g.snapshot_token = snapshots.pin_request()
+
+@app.teardown_request
+def unpin_snapshot(exc=None):
+    token = g.pop('snapshot_token', None)
+    if token is not None:
+        snapshots.unpin(token)
 
 @app.route('/')
 def home():
@@ -70,29 +238,94 @@ def home():
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return jsonify(health_status())
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics.render(), content_type=PROMETHEUS_MIME)
+
+def health_status():
+    """Health details shared by the Flask and ASGI health endpoints"""
+    snapshot = current_snapshot()
+    return {
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'models_loaded': model is not None,
-        'data_loaded': grace_data is not None and gldas_data is not None,
-        'cors_enabled': True
-    })
+        'models_loaded': snapshot.models is not None and len(snapshot.models) > 0,
+        'data_loaded': snapshot.grace_data is not None and snapshot.gldas_data is not None,
+        'cors_enabled': True,
+        'snapshot': snapshots.describe(),
+        'tile_cache': snapshot.tiles.describe() if snapshot.tiles is not None else None,
+        'prediction_cache': prediction_cache.describe(),
+        'startup': startup_phases.report()
+    }
+
+def stream_response(stream_format, blocks, names, filename=None):
+    """Stream column blocks as NDJSON or CSV, formatted chunk by chunk as the client reads"""
+    response = Response(stream_with_context(encode_stream(stream_format, blocks, names)),
+                        mimetype=STREAM_FORMATS[stream_format])
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{stream_format}"'
+    return response
+
+def stream_timeseries(stream_format, columns_builder, window, value_column, filename=None):
+    """Stream a time series' rows (windowed if asked), with its constant fields on every row"""
+    columns, metadata = columns_builder()
+    if window is not None:
+        columns, _ = apply_window(columns, window, value_column)
+    columns = dict(columns, **metadata.get('constant_fields', {}))
+    return stream_response(stream_format, column_blocks(columns), list(columns), filename)
+
+def respond_timeseries(key, columns_builder, json_builder, value_column):
+    """Serve a time series from the cache, or sliced and downsampled when the query asks for it
+
+    ``?format=ndjson|csv`` (or an ``Accept`` header preferring those) streams
+    the rows instead of building one JSON document.
+    """
+    try:
+        window = parse_window(request.args)
+        stream_format = requested_format(request.args.get('format'), request.headers.get('Accept'),
+                                         response_cache.mimetypes(key))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if stream_format is not None:
+        return stream_timeseries(stream_format, columns_builder, window, value_column)
+    if window is None:
+        return response_cache.respond(key)
+    
+    columns, metadata = columns_builder()
+    columns, window_info = apply_window(columns, window, value_column)
+    
+    mimetype = request.accept_mimetypes.best_match(response_cache.mimetypes(key), default='application/json')
+    if mimetype in BINARY_ENCODERS:
+        if 'total_points' in metadata:
+            metadata = dict(metadata, total_points=window_info['returned_points'])
+        body = BINARY_ENCODERS[mimetype](columns, dict(metadata, window=window_info))
+        return Response(body, mimetype=mimetype)
+    return jsonify(dict(json_builder(columns), window=window_info))
 
 @app.route('/api/historical/timeseries')
 def get_historical_timeseries():
     """Get historical GRACE time series (2002-2017)"""
+    grace_data = current_snapshot().grace_data
     if grace_data is None:
         return jsonify({'error': 'Historical data not available'}), 500
     
-    data = []
-    for _, row in grace_data.iterrows():
-        data.append({
-            'date': row['date'].strftime('%Y-%m-%d'),
-            'groundwater_cm': float(row['groundwater_cm']),
-            'data_source': 'GRACE'
-        })
+    return respond_timeseries('historical_timeseries', historical_timeseries_columns, build_historical_timeseries, 'groundwater_cm')
+
+@response_cache.payload('historical_timeseries')
+def build_historical_timeseries(columns=None):
+    """Build the historical GRACE time series payload"""
+    if columns is None:
+        columns = historical_timeseries_columns()[0]
     
-    return jsonify({
+    data = records(
+        date=iso_dates(columns['date']),
+        groundwater_cm=float_values(columns['groundwater_cm']),
+        data_source='GRACE'
+    )
+    
+    return {
         'success': True,
         'data': data,
         'metadata': {
@@ -100,14 +333,33 @@ def get_historical_timeseries():
             'total_points': len(data),
             'data_source': 'GRACE satellites'
         }
-    })
+    }
+
+@columnar_payload('historical_timeseries')
+def historical_timeseries_columns():
+    """Columns of the historical GRACE time series for binary formats"""
+    grace_data = current_snapshot().grace_data
+    columns = {'date': grace_data['date'], 'groundwater_cm': grace_data['groundwater_cm']}
+    return columns, {
+        'constant_fields': {'data_source': 'GRACE'},
+        'period': '2002-2017',
+        'total_points': len(grace_data),
+        'data_source': 'GRACE satellites'
+    }
 
 @app.route('/api/gldas/trend-analysis')
 def get_gldas_trend_analysis():
     """Analyze GLDAS trends to infer groundwater changes"""
+    gldas_data = current_snapshot().gldas_data
     if gldas_data is None:
         return jsonify({'error': 'GLDAS data not available'}), 500
     
+    return response_cache.respond('gldas_trend_analysis')
+
+def gldas_trend_summary():
+    """Baseline anomalies, trend statistics and metadata shared by every trend format"""
+    gldas_data = current_snapshot().gldas_data
+    
     # Calculate baseline (2018 average)
     gldas_2018 = gldas_data[gldas_data['date'].dt.year == 2018]
     baseline = gldas_2018['groundwater_cm'].mean()
@@ -136,52 +388,80 @@ def get_gldas_trend_analysis():
     else:
         interpretation = "Relatively stable - minimal change detected"
     
+    analysis = {
+        'baseline_2018': float(baseline),
+        'current_value': float(gldas_data['groundwater_cm'].iloc[-1]),
+        'total_change': float(total_change),
+        'annual_change': float(annual_change),
+        'monthly_change': float(monthly_change),
+        'interpretation': interpretation,
+        'trend_direction': 'increasing' if annual_change > 0 else 'decreasing',
+        'comparison_note': 'GLDAS measures soil moisture, not direct groundwater. Positive values may indicate better water retention.'
+    }
+    metadata = {
+        'data_source': 'GLDAS V021',
+        'variable': 'Deep Soil Moisture (100-200cm)',
+        'units': 'kg/m²',
+        'period': f"{gldas_data['date'].min().strftime('%Y-%m')} to {gldas_data['date'].max().strftime('%Y-%m')}"
+    }
+    
+    return anomalies, analysis, metadata
+
+@response_cache.payload('gldas_trend_analysis')
+def build_gldas_trend_analysis():
+    """Build the GLDAS trend analysis payload"""
+    gldas_data = current_snapshot().gldas_data
+    anomalies, analysis, metadata = gldas_trend_summary()
+    
     # Prepare time series with anomalies
-    trend_data = []
-    for i, row in gldas_data.iterrows():
-        trend_data.append({
-            'date': row['date'].strftime('%Y-%m-%d'),
-            'absolute_value': float(row['groundwater_cm']),
-            'anomaly': float(row['groundwater_cm'] - baseline),
-            'year': row['date'].year
-        })
+    trend_data = records(
+        date=iso_dates(gldas_data['date']),
+        absolute_value=float_values(gldas_data['groundwater_cm']),
+        anomaly=float_values(anomalies),
+        year=int_values(gldas_data['date'].dt.year)
+    )
     
-    return jsonify({
+    return {
         'success': True,
-        'analysis': {
-            'baseline_2018': float(baseline),
-            'current_value': float(gldas_data['groundwater_cm'].iloc[-1]),
-            'total_change': float(total_change),
-            'annual_change': float(annual_change),
-            'monthly_change': float(monthly_change),
-            'interpretation': interpretation,
-            'trend_direction': 'increasing' if annual_change > 0 else 'decreasing',
-            'comparison_note': 'GLDAS measures soil moisture, not direct groundwater. Positive values may indicate better water retention.'
-        },
+        'analysis': analysis,
         'time_series': trend_data,
-        'metadata': {
-            'data_source': 'GLDAS V021',
-            'variable': 'Deep Soil Moisture (100-200cm)',
-            'units': 'kg/m²',
-            'period': f"{gldas_data['date'].min().strftime('%Y-%m')} to {gldas_data['date'].max().strftime('%Y-%m')}"
-        }
-    })
+        'metadata': metadata
+    }
+
+@columnar_payload('gldas_trend_analysis')
+def gldas_trend_columns():
+    """Columns of the GLDAS trend series for binary formats (year derives from date)"""
+    gldas_data = current_snapshot().gldas_data
+    anomalies, analysis, metadata = gldas_trend_summary()
+    columns = {
+        'date': gldas_data['date'],
+        'absolute_value': gldas_data['groundwater_cm'],
+        'anomaly': anomalies
+    }
+    return columns, dict(metadata, analysis=analysis)
 
 @app.route('/api/recent/timeseries')
 def get_recent_timeseries():
     """Get recent GLDAS time series (2018-2024)"""
+    gldas_data = current_snapshot().gldas_data
     if gldas_data is None:
         return jsonify({'error': 'Recent data not available'}), 500
     
-    data = []
-    for _, row in gldas_data.iterrows():
-        data.append({
-            'date': row['date'].strftime('%Y-%m-%d'),
-            'groundwater_cm': float(row['groundwater_cm']),
-            'data_source': 'GLDAS'
-        })
+    return respond_timeseries('recent_timeseries', recent_timeseries_columns, build_recent_timeseries, 'groundwater_cm')
+
+@response_cache.payload('recent_timeseries')
+def build_recent_timeseries(columns=None):
+    """Build the recent GLDAS time series payload"""
+    if columns is None:
+        columns = recent_timeseries_columns()[0]
     
-    return jsonify({
+    data = records(
+        date=iso_dates(columns['date']),
+        groundwater_cm=float_values(columns['groundwater_cm']),
+        data_source='GLDAS'
+    )
+    
+    return {
         'success': True,
         'data': data,
         'metadata': {
@@ -189,11 +469,30 @@ def get_recent_timeseries():
             'total_points': len(data),
             'data_source': 'GLDAS V021'
         }
-    })
+    }
+
+@columnar_payload('recent_timeseries')
+def recent_timeseries_columns():
+    """Columns of the recent GLDAS time series for binary formats"""
+    gldas_data = current_snapshot().gldas_data
+    columns = {'date': gldas_data['date'], 'groundwater_cm': gldas_data['groundwater_cm']}
+    return columns, {
+        'constant_fields': {'data_source': 'GLDAS'},
+        'period': '2018-2024',
+        'total_points': len(gldas_data),
+        'data_source': 'GLDAS V021'
+    }
 
 @app.route('/api/analysis/summary')
 def get_analysis_summary():
     """Get comprehensive analysis summary"""
+    return response_cache.respond('analysis_summary')
+
+@response_cache.payload('analysis_summary')
+def build_analysis_summary():
+    """Build the analysis summary payload"""
+    snapshot = current_snapshot()
+    grace_data, gldas_data = snapshot.grace_data, snapshot.gldas_data
     
     summary = {
         'project_title': 'WaterTrace: Pakistan Groundwater Monitoring',
@@ -232,23 +531,31 @@ def get_analysis_summary():
         ]
     }
     
-    return jsonify(summary)
+    return summary
 
 @app.route('/api/combined/timeline')
 def get_combined_timeline():
     """Get combined GRACE and GLDAS data with proper scaling for visualization"""
+    return respond_timeseries('combined_timeline', combined_timeline_columns, build_combined_timeline, 'value')
+
+@columnar_payload('combined_timeline')
+def combined_timeline_columns():
+    """Date-sorted columns and summary of the combined timeline, shared by every format"""
+    snapshot = current_snapshot()
+    grace_data, gldas_data = snapshot.grace_data, snapshot.gldas_data
     
-    combined_data = []
+    # Column chunks per source, seeded empty so concatenation works without data
+    dates = [np.array([], dtype='datetime64[ns]')]
+    values = [np.array([], dtype=float)]
+    sources = [np.array([], dtype=str)]
+    types = [np.array([], dtype=str)]
     
     # Add GRACE data (already in anomalies)
     if grace_data is not None:
-        for _, row in grace_data.iterrows():
-            combined_data.append({
-                'date': row['date'].strftime('%Y-%m-%d'),
-                'value': float(row['groundwater_cm']),  # Already anomalies in cm
-                'source': 'GRACE',
-                'type': 'measured_anomaly'
-            })
+        dates.append(grace_data['date'].to_numpy(dtype='datetime64[ns]'))
+        values.append(grace_data['groundwater_cm'].to_numpy(dtype=float))  # Already anomalies in cm
+        sources.append(np.full(len(grace_data), 'GRACE'))
+        types.append(np.full(len(grace_data), 'measured_anomaly'))
     
     # Add GLDAS data converted to anomalies
     if gldas_data is not None:
@@ -258,51 +565,116 @@ def get_combined_timeline():
         
         # Convert GLDAS to anomalies and rough cm equivalent
         # Rough conversion: 10 kg/m² ≈ 1 cm of water
-        for _, row in gldas_data.iterrows():
-            anomaly_kg = row['groundwater_cm'] - baseline_kg
-            anomaly_cm_equivalent = anomaly_kg / 10  # Convert to cm scale
-            
-            # Apply the last known GRACE value as offset for continuity
-            # Last GRACE value was around -8.73 cm in 2017
-            grace_end_value = -8.73
-            
-            combined_data.append({
-                'date': row['date'].strftime('%Y-%m-%d'),
-                'value': float(grace_end_value + anomaly_cm_equivalent),
-                'source': 'GLDAS',
-                'type': 'estimated_anomaly'
-            })
-    
-    # Sort by date
-    combined_data.sort(key=lambda x: x['date'])
+        anomaly_kg = gldas_data['groundwater_cm'].to_numpy(dtype=float) - baseline_kg
+        anomaly_cm_equivalent = anomaly_kg / 10  # Convert to cm scale
+        
+        # Apply the last known GRACE value as offset for continuity
+        # Last GRACE value was around -8.73 cm in 2017
+        grace_end_value = -8.73
+        
+        dates.append(gldas_data['date'].to_numpy(dtype='datetime64[ns]'))
+        values.append(grace_end_value + anomaly_cm_equivalent)
+        sources.append(np.full(len(gldas_data), 'GLDAS'))
+        types.append(np.full(len(gldas_data), 'estimated_anomaly'))
+    
+    # Sort by date (stable, so GRACE stays ahead of GLDAS on equal dates)
+    order = np.argsort(np.concatenate(dates), kind='stable')
+    dates = np.concatenate(dates)[order]
+    values = np.concatenate(values)[order]
+    sources = np.concatenate(sources)[order]
+    types = np.concatenate(types)[order]
     
     # Calculate statistics
-    grace_values = [d['value'] for d in combined_data if d['source'] == 'GRACE']
-    gldas_values = [d['value'] for d in combined_data if d['source'] == 'GLDAS']
+    grace_values = float_values(values[sources == 'GRACE'])
+    gldas_values = float_values(values[sources == 'GLDAS'])
     
-    return jsonify({
+    columns = {'date': dates, 'value': values, 'source': sources, 'type': types}
+    summary = {
+        'grace_period': {
+            'start': '2002',
+            'end': '2017',
+            'final_value': grace_values[-1] if grace_values else None,
+            'trend': 'Declining at -0.81 cm/year'
+        },
+        'gldas_period': {
+            'start': '2018',
+            'end': '2024',
+            'estimated_current': gldas_values[-1] if gldas_values else None,
+            'trend': 'Slight improvement (+0.15 cm/year equivalent)'
+        },
+        'interpretation': 'GLDAS data suggests possible stabilization after severe depletion'
+    }
+    
+    return columns, summary
+
+@response_cache.payload('combined_timeline')
+def build_combined_timeline(columns=None):
+    """Build the combined GRACE and GLDAS timeline payload"""
+    full_columns, summary = combined_timeline_columns()
+    if columns is None:
+        columns = full_columns
+    
+    combined_data = records(
+        date=iso_dates(columns['date']),
+        value=float_values(columns['value']),
+        source=columns['source'].tolist(),
+        type=columns['type'].tolist()
+    )
+    
+    return {
         'success': True,
         'data': combined_data,
-        'summary': {
-            'grace_period': {
-                'start': '2002',
-                'end': '2017',
-                'final_value': grace_values[-1] if grace_values else None,
-                'trend': 'Declining at -0.81 cm/year'
-            },
-            'gldas_period': {
-                'start': '2018',
-                'end': '2024',
-                'estimated_current': gldas_values[-1] if gldas_values else None,
-                'trend': 'Slight improvement (+0.15 cm/year equivalent)'
-            },
-            'interpretation': 'GLDAS data suggests possible stabilization after severe depletion'
-        }
-    })
+        'summary': summary
+    }
 
 @app.route('/api/districts/groundwater')
 def get_district_groundwater():
-    """Get district-wise groundwater data for mapping"""
+    """Get district-wise groundwater data for mapping
+
+    ``?geometry=polygon`` returns district boundaries instead of centroid
+    points when the zonal-statistics table and boundaries are available.
+    """
+    if request.args.get('geometry') == 'polygon':
+        return response_cache.respond('district_groundwater_polygons')
+    return response_cache.respond('district_groundwater')
+
+def district_table_payload(table, geometry):
+    """District map payload from the precomputed zonal-statistics table"""
+    values = table.latest_change_cm.astype(float)
+    values = values[~np.isnan(values)]
+    
+    return {
+        'success': True,
+        'data': {
+            "type": "FeatureCollection",
+            "features": table.features(geometry)
+        },
+        'summary': {
+            'total_districts': len(table),
+            'average_change': float(values.mean()) if len(values) else None,
+            'most_depleted': float(values.min()) if len(values) else None,
+            'most_improved': float(values.max()) if len(values) else None,
+            'critical_districts': int((values < -10).sum()),
+            'improving_districts': int((values > 0).sum()),
+            'as_of': str(table.latest_date) if not np.isnat(table.latest_date) else None,
+            'method': 'Area-weighted zonal statistics of GRACE and GLDAS grids'
+        }
+    }
+
+@response_cache.payload('district_groundwater_polygons')
+def build_district_groundwater_polygons():
+    """Build the district groundwater payload with boundary polygons"""
+    table = current_snapshot().district_table
+    if table is None:
+        return build_district_groundwater()
+    return district_table_payload(table, 'polygon')
+
+@response_cache.payload('district_groundwater')
+def build_district_groundwater():
+    """Build the district groundwater GeoJSON payload"""
+    table = current_snapshot().district_table
+    if table is not None:
+        return district_table_payload(table, 'centroid')
     
     # Since we only have national-level data, we'll create representative data
     # based on known water stress patterns in Pakistan
@@ -367,7 +739,7 @@ def get_district_groundwater():
                     "district": district,
                     "province": province,
                     "groundwater_change": change_value,
-                    "status": "Critical" if change_value < -10 else "Warning" if change_value < -5 else "Moderate" if change_value < 0 else "Improving"
+                    "status": water_status(change_value)
                 },
                 "geometry": {
                     "type": "Point",
@@ -379,7 +751,7 @@ def get_district_groundwater():
     # Add summary statistics
     all_values = [v for province in regional_patterns.values() for v in province.values()]
     
-    return jsonify({
+    return {
         'success': True,
         'data': districts_data,
         'summary': {
@@ -390,42 +762,580 @@ def get_district_groundwater():
             'critical_districts': sum(1 for v in all_values if v < -10),
             'improving_districts': sum(1 for v in all_values if v > 0)
         }
+    }
+
+@app.route('/api/export/<dataset>')
+def export_dataset(dataset):
+    """Bulk download of a dataset, streamed as NDJSON (default) or CSV (``?format=csv``)
+
+    ``historical``, ``recent`` and ``combined`` accept the same
+    ``start``/``end``/``max_points`` window as the time-series endpoints.
+    ``districts`` streams every district's monthly series in long format
+    (district, province, source, date, value, unit); ``?source=grace`` or
+    ``gldas`` limits it to one dataset and ``start``/``end`` to a period.
+    """
+    try:
+        window = parse_window(request.args)
+        stream_format = requested_format(request.args.get('format') or 'ndjson')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    snapshot = current_snapshot()
+    if dataset == 'districts':
+        table = snapshot.district_table
+        if table is None:
+            return jsonify({'error': 'District data not available'}), 500
+        sources = request.args.get('source', 'grace,gldas').split(',')
+        if window is not None and window.max_points is not None:
+            return jsonify({'error': 'max_points is not supported for the districts export'}), 400
+        if not set(sources) <= set(table.SERIES):
+            return jsonify({'error': f"source must be one of: {', '.join(table.SERIES)}"}), 400
+        start, end = (window.start, window.end) if window is not None else (None, None)
+        return stream_response(stream_format, table.series_blocks(sources, start, end),
+                               ['district', 'province', 'source', 'date', 'value', 'unit'], 'watertrace_districts')
+
+    exports = {
+        'historical': (historical_timeseries_columns, 'groundwater_cm', ('grace_data',)),
+        'recent': (recent_timeseries_columns, 'groundwater_cm', ('gldas_data',)),
+        'combined': (combined_timeline_columns, 'value', ())
+    }
+    if dataset not in exports:
+        return jsonify({'error': f"Unknown dataset '{dataset}'", 'datasets': list(exports) + ['districts']}), 404
+    columns_builder, value_column, required = exports[dataset]
+    if any(getattr(snapshot, name) is None for name in required):
+        return jsonify({'error': 'Data not available'}), 500
+    return stream_timeseries(stream_format, columns_builder, window, value_column, f'watertrace_{dataset}')
+
+@app.route('/api/districts/lookup')
+def lookup_district():
+    """Resolve a ?lat=&lon= point to its district and province"""
+    index = current_snapshot().district_index
+    if index is None:
+        return jsonify({'error': 'District boundaries not available'}), 500
+    
+    try:
+        lat = parse_coordinate(request.args.get('lat'), 'lat', 90)
+        lon = parse_coordinate(request.args.get('lon'), 'lon', 180)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    districts, provinces = index.names(index.lookup([lon], [lat]))
+    if districts[0] is None:
+        return jsonify({'error': 'Point is not inside any district', 'lat': lat, 'lon': lon}), 404
+    
+    return jsonify({
+        'success': True,
+        'lat': lat,
+        'lon': lon,
+        'district': districts[0],
+        'province': provinces[0]
     })
 
+@app.route('/api/districts/lookup/batch', methods=['POST'])
+def lookup_districts_batch():
+    """Resolve many points (e.g. well locations) to districts in one call
+
+    Accepts ``{"lat": [...], "lon": [...]}``, a list of ``[lat, lon]`` pairs
+    or ``{"lat", "lon"}`` objects, or CSV with lat/lon columns. Returns
+    district and province lists aligned with the input (null when a point
+    is outside every district).
+    """
+    index = current_snapshot().district_index
+    if index is None:
+        return jsonify({'error': 'District boundaries not available'}), 500
+    
+    try:
+        lat, lon = read_points(request.get_data(), request.content_type)
+    except PointsError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = index.lookup(lon, lat)
+    districts, provinces = index.names(rows)
+    
+    return jsonify({
+        'success': True,
+        'total_points': len(rows),
+        'matched': int((rows >= 0).sum()),
+        'district': districts,
+        'province': provinces
+    })
+
+@app.route('/api/tiles/districts/<int:z>/<int:x>/<int:y>.mvt')
+def get_district_tile(z, x, y):
+    """Mapbox Vector Tile of district boundaries with their groundwater change"""
+    tiles = current_snapshot().tiles
+    if tiles is None:
+        return jsonify({'error': 'District boundaries not available'}), 500
+    if not valid_tile(z, x, y):
+        return jsonify({'error': f'No tile {z}/{x}/{y}'}), 404
+    
+    status, headers, body = payload_response(
+        tiles.get(z, x, y),
+        request.headers.get('Accept-Encoding'),
+        request.headers.get('If-None-Match')
+    )
+    # Tiles outside Pakistan are empty; MapLibre and Leaflet.VectorGrid treat 204 as a blank tile
+    if status == 200 and not body:
+        status = 204
+    return Response(body, status=status, headers=headers)
+
+@app.route('/api/tiles/districts.json')
+def get_district_tilejson():
+    """TileJSON describing the district vector tiles"""
+    tiles = current_snapshot().tiles
+    if tiles is None:
+        return jsonify({'error': 'District boundaries not available'}), 500
+    url = request.host_url.rstrip('/') + '/api/tiles/districts/{z}/{x}/{y}.mvt'
+    return jsonify(tiles.tilejson(url))
+
+TOPOLOGY_MAX_AGE = 365 * 24 * 3600
+
+def topology_url(level, entry):
+    """Versioned URL of a TopoJSON level; the version is its content hash"""
+    return f"/api/districts/topology/{level}/{entry.etag[:12]}.topojson"
+
+@app.route('/api/districts/topology')
+def get_district_topology_levels():
+    """List the TopoJSON levels with vertex counts, sizes, Hausdorff errors and URLs"""
+    topology = current_snapshot().district_topology
+    if topology is None:
+        return jsonify({'error': 'District topology not available'}), 500
+    
+    manifest, payloads = topology
+    levels = {level: dict(info, url=topology_url(level, payloads[level])) for level, info in manifest['levels'].items()}
+    return jsonify(dict(manifest, success=True, levels=levels))
+
+@app.route('/api/districts/topology/<level>')
+def get_district_topology(level):
+    """Redirect to the current version of a level (``default`` for the recommended one)"""
+    topology = current_snapshot().district_topology
+    if topology is None:
+        return jsonify({'error': 'District topology not available'}), 500
+    
+    manifest, payloads = topology
+    if level == 'default':
+        level = manifest['default_level']
+    if level not in payloads:
+        return jsonify({'error': f"Unknown level '{level}'", 'levels': list(payloads)}), 404
+    
+    response = redirect(topology_url(level, payloads[level]))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/districts/topology/<level>/<version>.topojson')
+def get_district_topology_version(level, version):
+    """One TopoJSON level; its URL changes with the content, so clients may cache it for a year"""
+    topology = current_snapshot().district_topology
+    if topology is None:
+        return jsonify({'error': 'District topology not available'}), 500
+    
+    manifest, payloads = topology
+    if level not in payloads:
+        return jsonify({'error': f"Unknown level '{level}'", 'levels': list(payloads)}), 404
+    entry = payloads[level]
+    if version != entry.etag[:12]:
+        # An older export: send the client to the current one
+        response = redirect(topology_url(level, entry))
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    status, headers, body = payload_response(
+        entry,
+        request.headers.get('Accept-Encoding'),
+        request.headers.get('If-None-Match')
+    )
+    headers['Cache-Control'] = f'public, max-age={TOPOLOGY_MAX_AGE}, immutable'
+    return Response(body, status=status, headers=headers)
+
+def respond_columns(columns, metadata, payload):
+    """JSON ``payload`` by default, or the columns in a binary encoding the client accepts"""
+    mimetype = request.accept_mimetypes.best_match(['application/json'] + list(BINARY_ENCODERS),
+                                                   default='application/json')
+    if mimetype in BINARY_ENCODERS:
+        return Response(BINARY_ENCODERS[mimetype](columns, metadata), mimetype=mimetype)
+    return jsonify(payload)
+
+def cube_variables(cube, names):
+    """Column numbers of ``?variables=a,b`` (all variables when not given)"""
+    if not names:
+        return list(range(len(cube.variables)))
+    names = names.split(',')
+    unknown = [name for name in names if name not in cube.variables]
+    if unknown:
+        raise ValueError(f"Unknown variables {unknown}; available: {', '.join(cube.variables)}")
+    return [cube.variables.index(name) for name in names]
+
+@app.route('/api/cube')
+def get_cube_info():
+    """Shape, months and variables of the district cube"""
+    cube = current_snapshot().district_cube
+    if cube is None:
+        return jsonify({'error': 'District cube not available'}), 500
+    return jsonify(dict(cube.describe(), success=True))
+
+@app.route('/api/cube/districts/<key>')
+def get_cube_district(key):
+    """One district's monthly series (by code or name), optionally limited by start/end and variables"""
+    cube = current_snapshot().district_cube
+    if cube is None:
+        return jsonify({'error': 'District cube not available'}), 500
+    try:
+        window = parse_window(request.args)
+        variables = cube_variables(cube, request.args.get('variables'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if window is not None and window.max_points is not None:
+        return jsonify({'error': 'max_points is not supported by the cube'}), 400
+    row = cube.row(key)
+    if row is None:
+        return jsonify({'error': f"Unknown district '{key}'"}), 404
+    
+    months = cube.month_slice(window.start, window.end) if window is not None else slice(None)
+    series = cube.series(row, months)
+    names = [cube.variables[k] for k in variables]
+    metadata = {
+        'code': int(cube.codes[row]),
+        'district': str(cube.districts[row]),
+        'province': str(cube.provinces[row]),
+        'units': {name: cube.units[name] for name in names}
+    }
+    dates = cube.months(months)
+    columns = dict({'month': dates}, **{name: series[:, k] for name, k in zip(names, variables)})
+    payload = dict(metadata, success=True, months=np.datetime_as_string(dates).tolist(),
+                   variables={name: nullable_floats(series[:, k], 4) for name, k in zip(names, variables)})
+    return respond_columns(columns, metadata, payload)
+
+@app.route('/api/cube/months/<month>')
+def get_cube_month(month):
+    """Every district's values for one month (YYYY-MM)"""
+    cube = current_snapshot().district_cube
+    if cube is None:
+        return jsonify({'error': 'District cube not available'}), 500
+    try:
+        variables = cube_variables(cube, request.args.get('variables'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        offset = cube.month_offset(month)
+    except ValueError:
+        return jsonify({'error': 'month must look like 2010-06'}), 400
+    if offset is None:
+        return jsonify({'error': f"{month} is outside the cube ({cube.start} to {cube.months()[-1]})"}), 404
+    
+    section = cube.cross_section(offset)
+    names = [cube.variables[k] for k in variables]
+    metadata = {'month': str(cube.months()[offset]), 'units': {name: cube.units[name] for name in names}}
+    columns = dict({'code': cube.codes, 'district': cube.districts, 'province': cube.provinces},
+                   **{name: section[:, k] for name, k in zip(names, variables)})
+    data = records(
+        code=cube.codes.tolist(),
+        district=cube.districts.tolist(),
+        province=cube.provinces.tolist(),
+        **{name: nullable_floats(section[:, k], 4) for name, k in zip(names, variables)}
+    )
+    return respond_columns(columns, metadata, dict(metadata, success=True, data=data))
+
+def select_model(name=None):
+    """The snapshot's model called ``name`` (default model for None); KeyError when unknown"""
+    models = current_snapshot().models
+    if models is None:
+        raise LookupError('Model not available')
+    return models.get(name)
+
+def unknown_model(name):
+    return jsonify({'error': f"Unknown model '{name}'", 'models': list(current_snapshot().models.models)}), 404
+
+@app.route('/api/models')
+def list_models():
+    """Every servable model with its version, algorithm, features and training metrics"""
+    models = current_snapshot().models
+    if models is None:
+        return jsonify({'error': 'Model not available'}), 500
+    return jsonify(dict(models.describe(), success=True))
+
 @app.route('/api/predict', methods=['POST'])
 def predict_groundwater():
-    """Predict groundwater levels using ML model"""
-    if model is None:
+    """Predict groundwater levels using ML model
+
+    ``model`` (in the body or the query string) picks a registered model;
+    see /api/models. The default model answers otherwise. ``month``,
+    ``year`` and ``linear_trend`` (or any other feature of the model) set
+    those inputs; the lags and rolling and seasonal means come from the
+    months the model was trained on, or the latest GRACE months.
+    """
+    snapshot = current_snapshot()
+    if snapshot.models is None:
         return jsonify({'error': 'Model not available'}), 500
     
     try:
         data = request.get_json()
+        name = data.get('model') or request.args.get('model')
+        try:
+            served = select_model(name)
+        except KeyError:
+            return unknown_model(name)
         
-        # Extract features (this would need to match your model's expected features)
-        features = [
-            data.get('month', 6),
-            data.get('year', 2024),
-            data.get('linear_trend', 200),
-            # Add other features as needed
-        ]
+        # Build the model's whole feature vector, in the order it was trained on
+        try:
+            key = model_inputs(served, snapshot, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Make prediction
-        if scaler:
-            features_scaled = scaler.transform([features])
-            prediction = model.predict(features_scaled)[0]
-        else:
-            prediction = model.predict([features])[0]
+        def infer():
+            with metrics.time_inference('predict'):
+                return float(served.predict([key])[0])
+        
+        # Make prediction (repeated scenarios come from the memo)
+        prediction, _ = prediction_cache.get_or_compute(served.version, key, infer)
         
         return jsonify({
             'success': True,
-            'prediction': float(prediction),
-            'input_features': features,
+            'prediction': prediction,
+            'input_features': dict(zip(served.feature_names, key)),
+            'model': served.name,
+            'model_version': served.version,
             'model_info': 'Trained on GRACE 2002-2017 data'
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Scenario inputs /api/predict and /api/predict/batch assume when not given
+INPUT_DEFAULTS = {'month': 6, 'year': 2024, 'linear_trend': 200}
+
+def model_inputs(served, snapshot, values):
+    """A model's whole feature vector, as a tuple, from the features in ``values``
+
+    ``month``, ``year`` and ``linear_trend`` default to June 2024 and 200;
+    the rest come from the model's feature pipeline, or the latest GRACE
+    months. Raises ValueError for bad or (without a pipeline) missing
+    features.
+    """
+    overrides = dict(INPUT_DEFAULTS)
+    overrides.update({name: values[name] for name in INPUT_DEFAULTS if name in values})
+    overrides.update({name: values[name] for name in served.feature_names if name in values})
+    overrides = dict(zip(overrides, normalize_features(overrides.values())))
+    pipeline = served.pipeline or snapshot.feature_pipeline
+    if pipeline is not None:
+        features = pipeline.features(served.feature_names, overrides)[0]
+    else:
+        missing = [name for name in served.feature_names if name not in overrides]
+        if missing:
+            raise ValueError(f"Missing features {missing}")
+        features = [overrides[name] for name in served.feature_names]
+    return normalize_features(features)
+
+def model_input_rows(served, snapshot, X):
+    """``model_inputs`` of many rows at once: (rows, features) with NaN where not given
+
+    Returns the completed rows and a dict of row position -> error for the
+    rows that cannot be completed.
+    """
+    names = served.feature_names
+    X = np.array(X, dtype=np.float64)
+    for name, value in INPUT_DEFAULTS.items():
+        if name in names:
+            column = X[:, names.index(name)]
+            column[np.isnan(column)] = value
+    pipeline = served.pipeline or snapshot.feature_pipeline
+    if pipeline is None:
+        missing = np.isnan(X)
+        return X, {int(i): f"Missing features {[name for name, gap in zip(names, missing[i]) if gap]}"
+                   for i in np.flatnonzero(missing.any(axis=1))}
+    
+    months = X[:, names.index('month')] if 'month' in names else np.full(len(X), INPUT_DEFAULTS['month'])
+    bad_month = ~((months >= 1) & (months <= 12))
+    X = pipeline.feature_rows(names, X, np.where(bad_month, INPUT_DEFAULTS['month'], months))
+    errors = {int(i): 'month must be between 1 and 12' for i in np.flatnonzero(bad_month)}
+    errors.update({int(i): 'Features must be finite numbers'
+                   for i in np.flatnonzero(~bad_month & ~np.isfinite(X).all(axis=1))})
+    return X, errors
+
+def model_feature_names(name=None):
+    """Feature columns a model (the default one for None) was fitted on, in order"""
+    return select_model(name).feature_names
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_groundwater_batch():
+    """Predict groundwater levels for many feature rows in one call
+
+    Accepts a JSON list (or ``{"rows": [...]}``), NDJSON or CSV body and
+    streams one NDJSON line per input row, followed by a summary line.
+    Rows that fail validation get an ``error`` instead of a prediction.
+    ``?model=`` picks a registered model. Rows may leave features out:
+    they are filled in as /api/predict fills them.
+    """
+    snapshot = current_snapshot()
+    if snapshot.models is None:
+        return jsonify({'error': 'Model not available'}), 500
+    
+    name = request.args.get('model')
+    try:
+        served = select_model(name)
+    except KeyError:
+        return unknown_model(name)
+    feature_names = served.feature_names
+    try:
+        frame = read_batch_frame(request.get_data(), request.content_type, feature_names)
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    X, valid, errors = validate_features(frame, feature_names,
+                                         fill=lambda rows: model_input_rows(served, snapshot, rows))
+    predictions = np.full(len(X), np.nan)
+    
+    try:
+        if valid.any():
+            # One predict over every usable row
+            X_valid = X[valid]
+            with metrics.time_inference('predict_batch', rows=len(X_valid)):
+                predictions[valid] = served.predict(X_valid)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate(chunk_size=1000):
+        for start in range(0, len(X), chunk_size):
+            lines = []
+            for i in range(start, min(start + chunk_size, len(X))):
+                if valid[i]:
+                    lines.append(json.dumps({'index': i, 'prediction': float(predictions[i])}))
+                else:
+                    lines.append(json.dumps({'index': i, 'error': errors[i]}))
+            yield '\n'.join(lines) + '\n'
+        yield json.dumps({'summary': {
+            'total_rows': len(X),
+            'predicted': int(valid.sum()),
+            'failed': len(errors),
+            'features': feature_names,
+            'model_info': 'Trained on GRACE 2002-2017 data'
+        }}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def forecast_histories(snapshot, districts):
+    """Keys, per-key metadata, history matrix and month axis of the series to forecast
+
+    No ``districts`` forecasts the national GRACE series; ``all`` or a comma
+    separated list of names (in any case) forecasts those districts' GRACE
+    series together.
+    """
+    if not districts:
+        grace_data = snapshot.grace_data
+        values = grace_data['groundwater_cm'].to_numpy(dtype=np.float64)[None, :]
+        months = grace_data['date'].to_numpy(dtype='datetime64[M]')
+        return ['Pakistan'], [{}], values, months
+    
+    table = snapshot.district_table
+    if table is None:
+        raise LookupError('District data not available')
+    if districts == 'all':
+        rows = np.arange(len(table))
+    else:
+        names = [name.strip() for name in districts.split(',') if name.strip()]
+        missing = [name for name in names if table.row(name) is None]
+        if missing:
+            raise KeyError(f"Unknown districts: {missing}")
+        rows = np.array([table.row(name) for name in names], dtype=int)
+    metadata = [{'province': str(province)} for province in table.province[rows]]
+    return (table.district[rows].tolist(), metadata, table.grace_anomaly_cm[rows].astype(np.float64),
+            table.grace_dates.astype('datetime64[M]'))
+
+def scenario_histories(body):
+    """Keys, metadata, history matrix and month axis of posted scenarios
+
+    ``series`` is a list of value lists or an object of name -> values, each
+    ending at ``end`` (YYYY-MM, default the last GRACE month). Shorter series
+    are padded at the front.
+    """
+    series = body.get('series')
+    if isinstance(series, dict):
+        keys, series = [str(key) for key in series], list(series.values())
+    elif isinstance(series, list):
+        keys = [str(i) for i in range(len(series))]
+    else:
+        raise ValueError('series must be a list of value lists or an object of name -> values')
+    if not series or not all(isinstance(values, list) for values in series):
+        raise ValueError('series must contain at least one list of values')
+    length = max(len(values) for values in series)
+    values = np.full((len(series), length), np.nan)
+    for i, history in enumerate(series):
+        try:
+            values[i, length - len(history):] = np.array(history, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Series {keys[i]} must contain numbers")
+    end = body.get('end') or current_snapshot().grace_data['date'].iloc[-1].strftime('%Y-%m')
+    try:
+        months = month_axis(end, length)
+    except ValueError:
+        raise ValueError('end must look like 2017-06')
+    return keys, [{} for _ in keys], values, months
+
+@app.route('/api/forecast', methods=['GET', 'POST'])
+def forecast_groundwater():
+    """Recursive monthly forecast of ``horizon`` months
+
+    GET forecasts the national GRACE series, or district series with
+    ``districts=all`` / ``districts=Lahore,Karachi``. POST forecasts the
+    scenarios in ``series`` (see scenario_histories). ``model`` picks a
+    registered model. Every series advances together, one model call per
+    month; series without their last 12 months observed are listed under
+    ``skipped``.
+    """
+    snapshot = current_snapshot()
+    if snapshot.models is None or snapshot.grace_data is None:
+        return jsonify({'error': 'Model or data not available'}), 500
+    body = (request.get_json(silent=True) or {}) if request.method == 'POST' else {}
+    if not isinstance(body, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    name = body.get('model') or request.args.get('model')
+    try:
+        served = select_model(name)
+    except KeyError:
+        return unknown_model(name)
+    
+    try:
+        horizon = int(body.get('horizon') or request.args.get('horizon', 12))
+        if request.method == 'POST':
+            keys, metadata, values, months = scenario_histories(body)
+        else:
+            keys, metadata, values, months = forecast_histories(snapshot, request.args.get('districts'))
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 500
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Histories shorter than the buffer have months missing too
+    complete = ~np.isnan(values[:, -BUFFER_MONTHS:]).any(axis=1) & (values.shape[1] >= BUFFER_MONTHS)
+    skipped = [{'key': keys[i], 'error': f"Needs its last {BUFFER_MONTHS} months observed"}
+               for i in np.flatnonzero(~complete)]
+    if not complete.any():
+        return jsonify({'error': 'No series can be forecast', 'skipped': skipped}), 400
+    
+    try:
+        pipeline = FeaturePipeline.fit(values[complete], months)
+        with metrics.time_inference('forecast', rows=int(complete.sum()) * horizon):
+            forecast_months, forecast = recursive_forecast(served, pipeline, horizon)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    series = [dict(metadata[i], key=keys[i], forecast=nullable_floats(row, 4))
+              for i, row in zip(np.flatnonzero(complete), forecast)]
+    return jsonify({
+        'success': True,
+        'model': served.name,
+        'model_version': served.version,
+        'horizon': horizon,
+        'history_end': str(months[-1]),
+        'months': np.datetime_as_string(forecast_months).tolist(),
+        'series': series,
+        'skipped': skipped
+    })
+
+# Load models and data once every payload builder is registered, so the cache fills too
+load_data()
+
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5000))
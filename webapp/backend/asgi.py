@@ -0,0 +1,293 @@
+# webapp/backend/asgi.py
+"""ASGI serving mode for the WaterTrace API
+
+Run with uvicorn workers instead of gunicorn's sync workers:
+
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 asgi:application
+
+(``uvicorn --workers N`` works too, but its shared listening socket skips
+TCP_NODELAY, which adds ~40 ms of delayed-ACK latency to every response.)
+
+Health checks and the cached time-series payloads are answered directly on
+the event loop. Every other request (predictions, windowed queries,
+district data, ...) runs the existing Flask view in a bounded thread pool
+of ``WATERTRACE_ASGI_THREADS`` threads (default 8), so a slow client only
+costs an idle coroutine and CPU-bound work never blocks the loop. Once
+``WATERTRACE_ASGI_QUEUE`` requests (default 256) are already waiting for
+the pool, new ones get a 503 instead of piling up.
+
+Responses longer than ``STREAM_BUFFER`` (streamed NDJSON/CSV exports) are
+relayed piece by piece as the view produces them rather than collected
+first; the view's thread stays at most one piece ahead of the client and
+stops when the client disconnects.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as backend
+from metrics import metrics
+from streaming import requested_format
+
+POOL_THREADS = int(os.environ.get('WATERTRACE_ASGI_THREADS', '8'))
+QUEUE_LIMIT = int(os.environ.get('WATERTRACE_ASGI_QUEUE', '256'))
+STREAM_BUFFER = 64 * 1024
+
+# Bare GETs on these paths come straight from the response cache,
+# as long as the live snapshot has the frames they are built from
+CACHED_ROUTES = {
+    '/api/historical/timeseries': ('historical_timeseries', ('grace_data',)),
+    '/api/recent/timeseries': ('recent_timeseries', ('gldas_data',)),
+    '/api/combined/timeline': ('combined_timeline', ()),
+    '/api/gldas/trend-analysis': ('gldas_trend_analysis', ('gldas_data',)),
+    '/api/analysis/summary': ('analysis_summary', ()),
+    '/api/districts/groundwater': ('district_groundwater', ()),
+}
+
+
+class WaterTraceASGI:
+    """ASGI front for the Flask app with an event-loop fast path"""
+
+    def __init__(self, wsgi_app, threads=POOL_THREADS, queue_limit=QUEUE_LIMIT):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='watertrace-asgi')
+        self.max_in_flight = threads + queue_limit
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        start = time.perf_counter()
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        path = scope['path']
+
+        if scope['method'] in ('GET', 'HEAD'):
+            if path == '/api/health':
+                body = backend.app.json.dumps(backend.health_status()).encode('utf-8')
+                await self._send(send, scope, headers, 200, {'Content-Type': 'application/json'}, body, start)
+                return
+
+            route = CACHED_ROUTES.get(path)
+            snapshot = backend.current_snapshot()
+            if (route and not scope['query_string'] and all(getattr(snapshot, name) is not None for name in route[1])
+                    and self._cached_format(route[0], headers.get('accept'))):
+                status, response_headers, body = backend.response_cache.lookup(
+                    route[0], headers.get('accept'), headers.get('accept-encoding'), headers.get('if-none-match')
+                )
+                await self._send(send, scope, headers, status, response_headers, body, start)
+                return
+
+        await self._call_wsgi(scope, receive, send, headers)
+
+    @staticmethod
+    def _cached_format(key, accept):
+        """False when Accept prefers a stream (NDJSON/CSV), which only the Flask view produces"""
+        if not accept:
+            return True
+        try:
+            return requested_format(None, accept, backend.response_cache.mimetypes(key)) is None
+        except ValueError:
+            return False
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Fast-path requests never reach Flask's before_request, so start the watcher here
+                backend.snapshots.ensure_watching()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _send(self, send, scope, request_headers, status, headers, body, start=None):
+        headers = dict(headers)
+        origin = request_headers.get('origin')
+        if origin and scope['path'].startswith('/api/'):
+            # Same answer flask-cors gives for the /api/* resources in app.py
+            headers['Access-Control-Allow-Origin'] = origin
+            headers['Access-Control-Allow-Credentials'] = 'true'
+        headers['Content-Length'] = str(len(body))
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+        })
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+        if start is not None:
+            # Requests that reach Flask are recorded by its metrics middleware instead
+            metrics.observe_request(scope['path'], scope['method'], status, time.perf_counter() - start,
+                                    0 if scope['method'] == 'HEAD' else len(body))
+
+    async def _call_wsgi(self, scope, receive, send, request_headers):
+        if self.in_flight >= self.max_in_flight:
+            await self._send(send, scope, request_headers, 503,
+                             {'Content-Type': 'application/json', 'Retry-After': '1'},
+                             b'{"error":"Server busy, retry shortly"}')
+            return
+
+        # Held until the view's thread is done, including the whole of a streamed response
+        self.in_flight += 1
+        try:
+            body = await self._read_body(receive)
+            environ = self._environ(scope, body)
+            loop = asyncio.get_running_loop()
+            stream = ResponseStream(loop)
+            worker = loop.run_in_executor(self.executor, self._run_wsgi, environ, stream)
+            try:
+                await stream.relay(worker, receive, send)
+            finally:
+                stream.close()
+                with contextlib.suppress(Exception):
+                    await worker
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if message['type'] == 'http.disconnect' or not message.get('more_body'):
+                return b''.join(chunks)
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        for name, value in scope['headers']:
+            name, value = name.decode('latin-1'), value.decode('latin-1')
+            if name == 'content-type':
+                key = 'CONTENT_TYPE'
+            elif name == 'content-length':
+                key = 'CONTENT_LENGTH'
+            else:
+                key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run_wsgi(self, environ, stream):
+        """Run the Flask app in a pool thread
+
+        Returns ``(status, headers, body)`` for a response shorter than
+        ``STREAM_BUFFER``; a longer one goes to ``stream`` as ASGI messages,
+        one buffer at a time, and None is returned once it has all been
+        handed over. Iteration stays in this one thread from start to
+        ``close()``, as the app's per-request context requires.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            pieces, size, streaming = [], 0, False
+            for chunk in result:
+                if not chunk:
+                    continue
+                pieces.append(chunk)
+                size += len(chunk)
+                if size >= STREAM_BUFFER:
+                    if not streaming:
+                        stream.put({'type': 'http.response.start', 'status': started['status'],
+                                    'headers': started['headers']})
+                        streaming = True
+                    stream.put({'type': 'http.response.body', 'body': b''.join(pieces), 'more_body': True})
+                    pieces, size = [], 0
+            if not streaming:
+                return started['status'], started['headers'], b''.join(pieces)
+            stream.put({'type': 'http.response.body', 'body': b''.join(pieces), 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return None
+
+
+class ResponseStream:
+    """Hands a long response from its pool thread to the event loop, one piece at a time
+
+    The queue holds a single piece, so the thread formats the next one while
+    the loop sends the last and never gets further ahead than that.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1)
+        self.closed = False
+
+    def put(self, message):
+        """Called from the pool thread; blocks while the loop still has a piece to send"""
+        if self.closed:
+            raise ConnectionAbortedError('Response abandoned (client disconnected)')
+        asyncio.run_coroutine_threadsafe(self.queue.put(message), self.loop).result()
+
+    def close(self):
+        """Stop the thread at its next piece (on the loop; frees a put that is waiting)"""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def relay(self, worker, receive, send):
+        """Send the worker's response: whole if it returned one, else as its pieces arrive"""
+        getter = disconnect = None
+        try:
+            while True:
+                getter = asyncio.ensure_future(self.queue.get())
+                waiting = {getter, worker} | ({disconnect} if disconnect else set())
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    if disconnect is not None and disconnect.done():
+                        getter.cancel()
+                        return
+                    response = worker.result()
+                    if response is not None:
+                        getter.cancel()
+                        status, headers, body = response
+                        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                        await send({'type': 'http.response.body', 'body': body})
+                        return
+                    # Streamed to the end; its last piece is already queued
+                    await getter
+                message = getter.result()
+                await send(message)
+                if message['type'] == 'http.response.start':
+                    # The body was read in full, so the next message is the client leaving
+                    disconnect = asyncio.ensure_future(receive())
+                elif not message['more_body']:
+                    return
+        finally:
+            for task in (getter, disconnect):
+                if task is not None:
+                    task.cancel()
+
+
+application = WaterTraceASGI(backend.app)
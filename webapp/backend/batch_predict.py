@@ -0,0 +1,134 @@
+# webapp/backend/batch_predict.py
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+MAX_BATCH_ROWS = 100_000
+
+
+class BatchError(ValueError):
+    """Raised when a batch body cannot be read at all"""
+
+
+def read_batch_frame(body, content_type, feature_names):
+    """Parse a JSON, CSV or NDJSON request body into a DataFrame of raw rows
+
+    JSON bodies may be a list of rows or ``{"rows": [...]}``; each row is
+    either an object keyed by feature name or an array in ``feature_names``
+    order. CSV bodies need a header row naming the features.
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    text = body.decode('utf-8') if isinstance(body, bytes) else body
+
+    if content_type == 'text/csv':
+        try:
+            frame = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+        except (ValueError, pd.errors.ParserError) as e:
+            raise BatchError(f"Invalid CSV body: {e}")
+        if len(frame) > MAX_BATCH_ROWS:
+            raise BatchError(f"Batch too large: {len(frame)} rows (max {MAX_BATCH_ROWS})")
+        return frame.where(frame != '', None)
+
+    try:
+        if content_type in ('application/x-ndjson', 'application/ndjson'):
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            rows = json.loads(text)
+    except ValueError as e:
+        raise BatchError(f"Invalid JSON body: {e}")
+
+    if isinstance(rows, dict):
+        rows = rows.get('rows')
+    if not isinstance(rows, list):
+        raise BatchError("Expected a list of rows or an object with a 'rows' list")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise BatchError(f"Batch too large: {len(rows)} rows (max {MAX_BATCH_ROWS})")
+
+    width = len(feature_names)
+    records, row_errors = [], {}
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            records.append(row)
+            continue
+        records.append({})
+        if not isinstance(row, (list, tuple)):
+            row_errors[i] = 'row must be an object or an array'
+        elif len(row) != width:
+            row_errors[i] = f"expected {width} values, got {len(row)}"
+        else:
+            records[i] = dict(zip(feature_names, row))
+
+    frame = pd.DataFrame(records, dtype=object)
+    frame['_error'] = pd.Series(row_errors, index=list(row_errors), dtype=object)
+    return frame
+
+
+def validate_features(frame, feature_names, fill=None):
+    """Coerce every feature column at once and collect per-row errors
+
+    Returns the float feature matrix, a boolean mask of usable rows and a
+    dict mapping row index to an error message for the rest. ``fill``, if
+    given, completes the rows missing some features instead of rejecting
+    them: it takes their (rows, features) matrix, NaN where a feature is
+    missing, and returns the completed matrix and a dict of errors keyed
+    by position in it.
+    """
+    n_rows = len(frame)
+    X = np.full((n_rows, len(feature_names)), np.nan)
+    problems = np.zeros(n_rows, dtype=bool)
+    missing = {}
+    invalid = {}
+
+    for j, name in enumerate(feature_names):
+        if name not in frame:
+            missing[name] = np.ones(n_rows, dtype=bool)
+            continue
+        raw = frame[name]
+        values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=float)
+        absent = raw.isna().to_numpy()
+        bad = ~absent & ~np.isfinite(values)
+        X[:, j] = values
+        if absent.any():
+            missing[name] = absent
+        if bad.any():
+            invalid[name] = bad
+        problems |= bad
+
+    row_errors = frame['_error'].to_numpy() if '_error' in frame else np.full(n_rows, None)
+    problems |= pd.notna(row_errors)
+
+    incomplete = np.zeros(n_rows, dtype=bool)
+    for mask in missing.values():
+        incomplete |= mask
+    fill_errors = {}
+    if fill is not None:
+        rows = np.flatnonzero(incomplete & ~problems)
+        if len(rows):
+            X[rows], failed = fill(X[rows])
+            for position, message in failed.items():
+                fill_errors[int(rows[position])] = message
+                problems[rows[position]] = True
+        missing = {}  # Filled in, or the row failed above
+    else:
+        problems |= incomplete
+
+    errors = {}
+    for i in np.flatnonzero(problems):
+        if pd.notna(row_errors[i]):
+            errors[int(i)] = row_errors[i]
+            continue
+        if int(i) in fill_errors:
+            errors[int(i)] = fill_errors[int(i)]
+            continue
+        parts = []
+        names = [name for name, mask in missing.items() if mask[i]]
+        if names:
+            parts.append(f"missing {', '.join(names)}")
+        names = [name for name, mask in invalid.items() if mask[i]]
+        if names:
+            parts.append(f"non-numeric {', '.join(names)}")
+        errors[int(i)] = '; '.join(parts)
+
+    return X, ~problems, errors
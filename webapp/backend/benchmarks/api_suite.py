@@ -0,0 +1,363 @@
+# webapp/backend/benchmarks/api_suite.py
+"""Latency and throughput of every API route, saved as JSON for comparison
+
+    python benchmarks/api_suite.py --concurrency 1 8 --duration 2
+    python benchmarks/api_suite.py --scale 100 --server --compare benchmarks/results/baseline.json
+
+Each scenario (one route, method and body) runs for ``--duration`` seconds
+at each concurrency level, in-process through the Flask test client (one
+thread and client per concurrent caller) and, with ``--server``, against
+gunicorn on localhost using the load_test.py client. ``--scale N`` first
+writes synthetic GRACE/GLDAS CSVs with N times the rows of the real ones
+and points the app at them.
+
+Results (throughput, p50/p95/p99 latency, status codes) go to
+benchmarks/results/ as JSON, with the RSS, PSS (shared pages split between
+the processes sharing them) and private memory of every gunicorn worker
+before and after the run when ``--server`` starts one. ``--compare`` matches rows against an
+earlier file and exits with status 1 when p95 latency or throughput got
+worse by more than ``--tolerance``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from columnar import COLUMNAR_MIME
+from load_test import free_port, launch_server, run_load, stop_server, summarize
+
+DATA_DIR = os.path.join(BACKEND_DIR, 'data', 'csv')
+GRACE_CSV = os.path.join(DATA_DIR, 'pakistan_grace_2002_2017_complete.csv')
+GLDAS_CSV = os.path.join(DATA_DIR, 'pakistan_gldas_2018_2024_monthly.csv')
+
+
+def synthetic_series(path, scale, rng):
+    """A dataset with ``scale`` times the rows over the same date range
+
+    Values follow the real series (interpolated) plus noise the size of
+    its month-to-month changes, so trends and baselines stay realistic.
+    """
+    frame = pd.read_csv(path)
+    dates = pd.to_datetime(frame['date'])
+    values = frame['groundwater_cm'].to_numpy(dtype=float)
+    n_rows = len(frame) * scale
+
+    new_dates = pd.date_range(dates.min(), dates.max(), periods=n_rows).round('s')
+    seconds = dates.astype('int64').to_numpy() / 1e9
+    new_seconds = new_dates.astype('int64').to_numpy() / 1e9
+    noise = rng.normal(0, np.std(np.diff(values)) if len(values) > 1 else 0.0, n_rows)
+
+    synthetic = pd.DataFrame({column: frame[column].iloc[0] for column in frame.columns}, index=range(n_rows))
+    synthetic['date'] = new_dates.strftime('%Y-%m-%dT%H:%M:%S')
+    synthetic['groundwater_cm'] = np.interp(new_seconds, seconds, values) + noise
+    if 'month' in synthetic:
+        synthetic['month'] = new_dates.month
+    if 'year' in synthetic:
+        synthetic['year'] = new_dates.year
+    if 'system:index' in synthetic:
+        synthetic['system:index'] = np.arange(n_rows)
+    return synthetic
+
+
+def write_synthetic_datasets(directory, scale, seed=42):
+    """Write scaled GRACE and GLDAS CSVs; returns their paths and row counts"""
+    rng = np.random.default_rng(seed)
+    paths, rows = {}, {}
+    for name, source in (('grace', GRACE_CSV), ('gldas', GLDAS_CSV)):
+        frame = synthetic_series(source, scale, rng)
+        paths[name] = os.path.join(directory, os.path.basename(source))
+        frame.to_csv(paths[name], index=False)
+        rows[name] = len(frame)
+    return paths, rows
+
+
+def build_scenarios(backend, lookup_points, batch_rows, seed=42):
+    """(name, method, path, JSON body[, extra headers]) for every route of the API"""
+    rng = np.random.default_rng(seed)
+    client = backend.app.test_client()
+
+    # Versioned TopoJSON URL from the level manifest (the hash is content-based, so servers agree)
+    topology = client.get('/api/districts/topology').get_json() or {}
+    topology_url = topology.get('levels', {}).get(topology.get('default_level'), {}).get('url')
+
+    feature_names = backend.model_feature_names()
+    lat = rng.uniform(24, 37, lookup_points).round(5).tolist()
+    lon = rng.uniform(61, 79, lookup_points).round(5).tolist()
+    rows = rng.normal(0, 1, (batch_rows, len(feature_names))).round(4).tolist()
+    # What a scenario UI sends: the API fills in the lags and means
+    calendar_rows = [{'month': int(month), 'year': int(year), 'linear_trend': int(trend)} for month, year, trend in
+                     zip(rng.integers(1, 13, batch_rows), rng.integers(2018, 2031, batch_rows),
+                         rng.integers(150, 300, batch_rows))]
+    models = (client.get('/api/models').get_json() or {}).get('models', [])
+    # Posted what-if histories: 24 months each, one too short to forecast
+    scenario_series = {f'scenario_{i}': rng.normal(-5, 3, 24).round(3).tolist() for i in range(8)}
+    scenario_series['too_short'] = [0.0] * 6
+
+    scenarios = [
+        ('home', 'GET', '/', None),
+        ('health', 'GET', '/api/health', None),
+        ('metrics', 'GET', '/metrics', None),
+        ('historical', 'GET', '/api/historical/timeseries', None),
+        ('historical_window', 'GET', '/api/historical/timeseries?start=2005&end=2012&max_points=100', None),
+        ('recent', 'GET', '/api/recent/timeseries', None),
+        ('combined', 'GET', '/api/combined/timeline', None),
+        ('combined_window', 'GET', '/api/combined/timeline?start=2015&max_points=200', None),
+        ('historical_ndjson', 'GET', '/api/historical/timeseries?format=ndjson', None),
+        ('export_combined_csv', 'GET', '/api/export/combined?format=csv', None),
+        ('export_districts', 'GET', '/api/export/districts?source=grace&start=2015', None),
+        ('gldas_trend', 'GET', '/api/gldas/trend-analysis', None),
+        ('analysis_summary', 'GET', '/api/analysis/summary', None),
+        ('districts', 'GET', '/api/districts/groundwater', None),
+        ('districts_polygons', 'GET', '/api/districts/groundwater?geometry=polygon', None),
+        ('district_lookup', 'GET', '/api/districts/lookup?lat=31.52&lon=74.35', None),
+        ('district_lookup_batch', 'POST', '/api/districts/lookup/batch', {'lat': lat, 'lon': lon}),
+        ('tile', 'GET', '/api/tiles/districts/6/44/26.mvt', None),
+        ('tilejson', 'GET', '/api/tiles/districts.json', None),
+        ('topology_levels', 'GET', '/api/districts/topology', None),
+        ('topology_redirect', 'GET', '/api/districts/topology/default', None),
+        ('models', 'GET', '/api/models', None),
+        ('predict', 'POST', '/api/predict', {'month': 6, 'year': 2024, 'linear_trend': 200}),
+        ('predict_batch', 'POST', '/api/predict/batch', rows),
+        ('predict_batch_calendar', 'POST', '/api/predict/batch', calendar_rows),
+        ('forecast', 'GET', '/api/forecast?horizon=24', None),
+        ('forecast_districts', 'GET', '/api/forecast?horizon=24&districts=all', None),
+        ('forecast_scenarios', 'POST', '/api/forecast', {'horizon': 24, 'series': scenario_series}),
+    ]
+    if topology_url:
+        scenarios.append(('topology', 'GET', topology_url, None))
+    # The cube only exists once notebook 15 has written one
+    cube = backend.current_snapshot().district_cube
+    if cube is not None:
+        district = f"/api/cube/districts/{cube.codes[len(cube) // 2]}"
+        month = f"/api/cube/months/{cube.months()[cube.n_months // 2]}"
+        columnar = {'Accept': COLUMNAR_MIME}
+        scenarios += [
+            ('cube', 'GET', '/api/cube', None),
+            ('cube_district', 'GET', district, None),
+            ('cube_district_columnar', 'GET', district, None, columnar),
+            ('cube_month', 'GET', month, None),
+            ('cube_month_columnar', 'GET', month, None, columnar),
+        ]
+    # Every registered model, when there is more than the default
+    for model in models if len(models) > 1 else []:
+        name = model['name']
+        model_rows = rng.normal(0, 1, (batch_rows, len(model['feature_names']))).round(4).tolist()
+        scenarios.append((f'predict_{name}', 'POST', f'/api/predict?model={name}',
+                          {'month': 6, 'year': 2024, 'linear_trend': 200}))
+        scenarios.append((f'predict_batch_{name}', 'POST', f'/api/predict/batch?model={name}', model_rows))
+    return scenarios
+
+
+def worker_memory(master_pid):
+    """RSS, PSS and private MB of each child of ``master_pid`` (Linux)"""
+    workers = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The parent pid follows the parenthesized command name
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            if parent != master_pid:
+                continue
+            fields = {}
+            with open(f'/proc/{entry}/smaps_rollup') as f:
+                for line in f:
+                    key, _, value = line.partition(':')
+                    if value.strip().endswith('kB'):
+                        fields[key] = int(value.split()[0])
+        except (OSError, ValueError, IndexError):
+            continue
+        workers.append({
+            'pid': int(entry),
+            'rss_mb': round(fields.get('Rss', 0) / 1024, 1),
+            'pss_mb': round(fields.get('Pss', 0) / 1024, 1),
+            'private_mb': round((fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024, 1),
+        })
+    return sorted(workers, key=lambda worker: worker['pid'])
+
+
+def print_worker_memory(label, workers):
+    for worker in workers:
+        print(f"🧠 {label} worker {worker['pid']}: RSS {worker['rss_mb']} MB, PSS {worker['pss_mb']} MB, "
+              f"private {worker['private_mb']} MB")
+
+
+def run_client(app, scenario, concurrency, duration):
+    """Drive the Flask app in-process from ``concurrency`` threads for ``duration`` seconds"""
+    name, method, path, body, *extra = scenario
+    headers = dict({'Accept-Encoding': 'identity'}, **(extra[0] if extra else {}))
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    def caller():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            size = len(response.get_data())  # Streams are consumed, as a real client would
+            response.close()
+            samples.append((time.perf_counter() - start, response.status_code, size))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - start), Counter(sample[1] for sample in samples)
+
+
+def run_server(url, scenario, concurrency, duration):
+    """Same scenario against a running server through load_test's keep-alive client"""
+    result = asyncio.run(run_load(url, concurrency, duration, mix=[scenario[1:]]))
+    return result, None
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print changes against an earlier results file; returns the regressed rows"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda row: (row['scenario'], row['mode'], row['concurrency'], row.get('scale', 1))
+    previous = {key(row): row for row in baseline['results']}
+
+    regressions, matched = [], 0
+    print(f"\n📊 Compared with {baseline_path} ({baseline['meta'].get('commit')}, {baseline['meta'].get('timestamp')})")
+    print(f"{'scenario':<32} {'mode':>6} {'conns':>5} {'p95 before':>11} {'p95 now':>9} {'req/s before':>13} {'req/s now':>10}")
+    for row in results:
+        old = previous.get(key(row))
+        if old is None:
+            continue
+        matched += 1
+        slower = row['p95_ms'] > old['p95_ms'] * (1 + tolerance)
+        fewer = row['throughput_rps'] < old['throughput_rps'] * (1 - tolerance)
+        flag = ' ⚠️' if slower or fewer else ''
+        if flag:
+            regressions.append(row)
+        print(f"{row['scenario']:<32} {row['mode']:>6} {row['concurrency']:>5} {old['p95_ms']:>11} {row['p95_ms']:>9} "
+              f"{old['throughput_rps']:>13} {row['throughput_rps']:>10}{flag}")
+    if not matched:
+        print("⚠️ No scenario ran with the same mode, concurrency and scale as the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every WaterTrace API route')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds per scenario and concurrency')
+    parser.add_argument('--scale', type=int, default=1, help='Multiply the dataset rows with synthetic data')
+    parser.add_argument('--only', nargs='+', help='Run only these scenarios')
+    parser.add_argument('--lookup-points', type=int, default=1000)
+    parser.add_argument('--batch-rows', type=int, default=1000)
+    parser.add_argument('--no-client', action='store_true', help='Skip the in-process Flask test client run')
+    parser.add_argument('--server', action='store_true', help='Also benchmark gunicorn on localhost')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting one')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--output', help='Results file (default benchmarks/results/api_suite_<time>.json)')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown before flagging')
+    args = parser.parse_args()
+
+    env = {'WATERTRACE_RELOAD_INTERVAL': '0'}
+    with tempfile.TemporaryDirectory() as data_dir:
+        rows = None
+        if args.scale > 1:
+            paths, rows = write_synthetic_datasets(data_dir, args.scale)
+            env.update(WATERTRACE_GRACE_CSV=paths['grace'], WATERTRACE_GLDAS_CSV=paths['gldas'])
+            print(f"🧪 Synthetic datasets: {rows['grace']:,} GRACE + {rows['gldas']:,} GLDAS rows (x{args.scale})")
+        # Set before importing the app so the in-process run and the server see the same data
+        os.environ.update(env)
+
+        import app as backend
+        scenarios = build_scenarios(backend, args.lookup_points, args.batch_rows)
+        if args.only:
+            scenarios = [scenario for scenario in scenarios if scenario[0] in args.only]
+
+        targets = [] if args.no_client else [('client', None)]
+        process = None
+        memory = None
+        try:
+            if args.url:
+                targets.append(('server', args.url))
+            elif args.server:
+                port = free_port()
+                process = launch_server([sys.executable, '-m', 'gunicorn', '-w', str(args.workers),
+                                         '-b', f"127.0.0.1:{port}", 'app:app'], port, env=env)
+                targets.append(('server', f"http://127.0.0.1:{port}"))
+                memory = {'before': worker_memory(process.pid)}
+                print_worker_memory('idle', memory['before'])
+
+            results = []
+            print(f"{'scenario':<32} {'mode':>6} {'conns':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'status':>14}")
+            for scenario in scenarios:
+                for concurrency in args.concurrency:
+                    for mode, url in targets:
+                        if mode == 'client':
+                            result, statuses = run_client(backend.app, scenario, concurrency, args.duration)
+                        else:
+                            result, statuses = run_server(url, scenario, concurrency, args.duration)
+                        status = (','.join(f"{code}:{count}" for code, count in sorted(statuses.items()))
+                                  if statuses else f"errors:{result['errors'] + result['http_errors']}")
+                        result.update(scenario=scenario[0], method=scenario[1], path=scenario[2], mode=mode,
+                                      concurrency=concurrency, scale=args.scale,
+                                      statuses={str(code): count for code, count in (statuses or {}).items()})
+                        results.append(result)
+                        print(f"{scenario[0]:<32} {mode:>6} {concurrency:>5} {result['throughput_rps']:>9} "
+                              f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8} {status:>14}")
+            if memory is not None:
+                memory['after'] = worker_memory(process.pid)
+                print_worker_memory('loaded', memory['after'])
+        finally:
+            if process is not None:
+                stop_server(process)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results', f"api_suite_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    meta = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'duration': args.duration,
+        'scale': args.scale,
+        'rows': rows,
+        'workers': args.workers if args.server else None,
+        'worker_memory': memory
+    }
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"✅ Results saved: {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# webapp/backend/benchmarks/bench_columnar.py
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar import ARROW_MIME, BINARY_ENCODERS, COLUMNAR_MIME, decode_columnar
+from serialization import float_values, iso_dates, records
+
+
+def synthetic_timeline(n_rows):
+    """Combined-timeline shaped frame: date, value and a two-valued source column"""
+    rng = np.random.default_rng(42)
+    dates = pd.date_range('1900-01-01', periods=n_rows, freq='h')
+    return pd.DataFrame({
+        'date': dates,
+        'value': rng.normal(-5, 3, n_rows),
+        'source': np.where(np.arange(n_rows) < n_rows * 2 // 3, 'GRACE', 'GLDAS')
+    })
+
+
+def encode_json(df):
+    payload = records(
+        date=iso_dates(df['date']),
+        value=float_values(df['value']),
+        source=df['source'].tolist()
+    )
+    return json.dumps({'success': True, 'data': payload}, separators=(',', ':')).encode('utf-8')
+
+
+def decode_json(body):
+    rows = json.loads(body)['data']
+    return np.array([row['value'] for row in rows])
+
+
+def decode_wtc(body):
+    return decode_columnar(body)[1]['value']
+
+
+def decode_arrow(body):
+    import pyarrow as pa
+    return pa.ipc.open_stream(body).read_all().column('value').to_numpy()
+
+
+def timed(func, arg, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON and binary columnar time-series payloads')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[247, 100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    formats = {'json': (encode_json, decode_json)}
+    formats['wtc1'] = (lambda df: BINARY_ENCODERS[COLUMNAR_MIME](df, {}), decode_wtc)
+    if ARROW_MIME in BINARY_ENCODERS:
+        formats['arrow'] = (lambda df: BINARY_ENCODERS[ARROW_MIME](df, {}), decode_arrow)
+    else:
+        print("⚠️ pyarrow not installed, skipping Arrow IPC")
+
+    print(f"{'rows':>10} {'format':>7} {'bytes':>12} {'gzip bytes':>12} {'encode (ms)':>12} {'decode (ms)':>12}")
+    for n_rows in args.sizes:
+        df = synthetic_timeline(n_rows)
+        for name, (encode, decode) in formats.items():
+            encode_time, body = timed(encode, df, args.repeats)
+            decode_time, values = timed(decode, body, args.repeats)
+            assert len(values) == n_rows
+            gzip_size = len(gzip.compress(body, compresslevel=6))
+            print(f"{n_rows:>10} {name:>7} {len(body):>12,} {gzip_size:>12,} "
+                  f"{encode_time * 1000:>12.2f} {decode_time * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# webapp/backend/benchmarks/bench_compression.py
+"""Bytes on the wire and CPU per request for the cached API payloads
+
+    python benchmarks/bench_compression.py --requests 2000
+
+For every endpoint served from the response cache, compares:
+
+- identity: the uncompressed body
+- gzip-6 per request: what on-the-fly compression middleware would cost
+- precompressed gzip-9 / brotli-11: the variants the cache stores once
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend
+from response_cache import CachedPayload, brotli
+
+ENDPOINTS = {
+    'historical_timeseries': '/api/historical/timeseries',
+    'recent_timeseries': '/api/recent/timeseries',
+    'combined_timeline': '/api/combined/timeline',
+    'gldas_trend_analysis': '/api/gldas/trend-analysis',
+    'analysis_summary': '/api/analysis/summary',
+    'district_groundwater': '/api/districts/groundwater',
+}
+
+
+def cpu_per_request(client, path, accept_encoding, n_requests, compress=None):
+    """Process CPU microseconds per request through the Flask app"""
+    start = time.process_time()
+    for _ in range(n_requests):
+        body = client.get(path, headers={'Accept-Encoding': accept_encoding}).data
+        if compress is not None:
+            compress(body)
+    return (time.process_time() - start) / n_requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure precompressed payload sizes and per-request CPU')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = backend.app.test_client()
+    if brotli is None:
+        print("⚠️ brotli not installed, skipping the br variant")
+
+    print(f"{'endpoint':<24} {'identity':>9} {'gzip-6':>8} {'gzip-9':>8} {'br-11':>8}"
+          f" {'us/req id':>10} {'us/req gz6':>11} {'us/req pre':>11} {'build ms':>9}")
+    for key, path in ENDPOINTS.items():
+        body = backend.response_cache.get(key).body
+        start = time.perf_counter()
+        entry = CachedPayload(body)
+        build_ms = (time.perf_counter() - start) * 1000
+        gzip6 = len(gzip.compress(body, compresslevel=6, mtime=0))
+        # A variant is dropped when it would not shrink the body
+        gzip9, br = (entry.encoded.get(encoding) for encoding in ('gzip', 'br'))
+        gzip9_size = f"{len(gzip9):,}" if gzip9 is not None else '-'
+        br_size = f"{len(br):,}" if br is not None else '-'
+
+        identity_us = cpu_per_request(client, path, 'identity', args.requests)
+        on_the_fly_us = cpu_per_request(client, path, 'identity', args.requests,
+                                        compress=lambda data: gzip.compress(data, compresslevel=6))
+        precompressed_us = cpu_per_request(client, path, 'br, gzip', args.requests)
+
+        print(f"{key:<24} {len(body):>9,} {gzip6:>8,} {gzip9_size:>8} "
+              f"{br_size:>8} {identity_us:>10.1f} {on_the_fly_us:>11.1f} "
+              f"{precompressed_us:>11.1f} {build_ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
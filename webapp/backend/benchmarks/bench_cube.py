@@ -0,0 +1,146 @@
+# webapp/backend/benchmarks/bench_cube.py
+"""District cube: load time, slice latency and memory shared between workers
+
+    python benchmarks/bench_cube.py --districts 5000 --months 600 --variables 4
+
+Writes a synthetic cube, then compares
+
+- loading: mapping the .npy vs reading it into memory
+- a district's series and a month's cross-section from the cube vs the same
+  query on a long-format DataFrame (one row per district and month)
+- memory: ``--workers`` forked processes each read every district, as
+  gunicorn workers serving a full sweep would. Their proportional set size
+  (PSS, shared pages split between the processes sharing them) shows the
+  mapped cube counted once instead of once per worker.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cube import INDEX_FILE, DistrictCube, write_cube
+
+
+def read_index(index_path):
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def timed_queries(function, keys):
+    """Median microseconds per call over ``keys``"""
+    samples = []
+    for key in keys:
+        start = time.perf_counter()
+        function(key)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e6
+
+
+def pss_mb():
+    """Proportional set size of this process (Linux)"""
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def worker_pss(load, workers):
+    """Total PSS of ``workers`` forked processes that each sweep every district"""
+    read_fd, write_fd = os.pipe()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            cube = load()
+            checksum = sum(float(np.nansum(cube.series(row))) for row in range(len(cube)))
+            time.sleep(1.0)  # Let every sibling finish its sweep before measuring
+            os.write(write_fd, f"{pss_mb()} {checksum}\n".encode())
+            os._exit(0)
+        children.append(pid)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        lines = f.read().split()
+    for pid in children:
+        os.waitpid(pid, 0)
+    return sum(float(value) for value in lines[::2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the memory-mapped district cube')
+    parser.add_argument('--districts', type=int, default=5000)
+    parser.add_argument('--months', type=int, default=600)
+    parser.add_argument('--variables', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    dates = np.arange(np.datetime64('1975-01'), np.datetime64('1975-01') + args.months).astype('datetime64[D]')
+    codes = rng.permutation(args.districts) + 1000
+    names = np.array([f"District {code}" for code in codes])
+    variables = {f"var_{k}": (dates, rng.normal(0, 10, (args.districts, args.months)).astype(np.float32), 'cm')
+                 for k in range(args.variables)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        index = write_cube(directory, codes, names, np.full(args.districts, 'Province'), variables)
+        write_time = time.perf_counter() - start
+        index_path = os.path.join(directory, INDEX_FILE)
+        data_path = os.path.join(directory, index['data_file'])
+        size_mb = os.path.getsize(data_path) / 1e6
+        print(f"🧊 {args.districts:,} districts x {args.months} months x {args.variables} variables: "
+              f"{size_mb:,.1f} MB float32, written in {write_time:.2f} s")
+
+        start = time.perf_counter()
+        cube = DistrictCube.load(index_path)
+        mapped = time.perf_counter() - start
+        start = time.perf_counter()
+        in_memory = DistrictCube(np.load(data_path), read_index(index_path))
+        loaded = time.perf_counter() - start
+        print(f"📂 Load: mapped {mapped * 1e3:.1f} ms, read into memory {loaded * 1e3:.1f} ms")
+
+        # The same data as a long table: one row per district and month
+        frame = pd.DataFrame({
+            'code': np.repeat(cube.codes, args.months),
+            'month': np.tile(cube.months(), args.districts),
+            **{name: cube.data[:, :, k].ravel() for k, name in enumerate(cube.variables)}
+        })
+        keys = rng.choice(cube.codes, args.queries).astype(str).tolist()
+        months = [str(month) for month in rng.choice(cube.months(), min(args.queries, 200))]
+
+        print(f"\n{'query':<28} {'cube µs':>10} {'in-memory µs':>13} {'DataFrame µs':>13}")
+        series = [
+            timed_queries(lambda key: np.array(cube.series(cube.row(key))), keys),
+            timed_queries(lambda key: np.array(in_memory.series(in_memory.row(key))), keys),
+            timed_queries(lambda key: frame[frame['code'] == int(key)].to_numpy(), keys[:200]),
+        ]
+        print(f"{'district series':<28} {series[0]:>10,.1f} {series[1]:>13,.1f} {series[2]:>13,.1f}")
+        sections = [
+            timed_queries(lambda month: np.array(cube.cross_section(cube.month_offset(month))), months),
+            timed_queries(lambda month: np.array(in_memory.cross_section(in_memory.month_offset(month))), months),
+            timed_queries(lambda month: frame[frame['month'] == np.datetime64(month, 'M')].to_numpy(), months),
+        ]
+        print(f"{'month cross-section':<28} {sections[0]:>10,.1f} {sections[1]:>13,.1f} {sections[2]:>13,.1f}")
+        del frame, in_memory
+
+        mapped_pss = worker_pss(lambda: DistrictCube.load(index_path), args.workers)
+        copied_pss = worker_pss(lambda: DistrictCube(np.load(data_path), read_index(index_path)), args.workers)
+        print(f"\n🧠 {args.workers} workers after a full sweep (total PSS, includes the interpreter and libraries):")
+        print(f"   mapped cube:   {mapped_pss:,.1f} MB")
+        print(f"   private copy:  {copied_pss:,.1f} MB  (+{copied_pss - mapped_pss:,.1f} MB; "
+              f"the cube is {size_mb:,.1f} MB)")
+
+    print("✅ Cube slices are views: a dict lookup and a month subtraction, whatever the cube size")
+
+
+if __name__ == '__main__':
+    main()
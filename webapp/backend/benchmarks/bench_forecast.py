@@ -0,0 +1,169 @@
+# webapp/backend/benchmarks/bench_forecast.py
+"""Recursive forecasts and feature updates: ring buffer vs pandas recomputation
+
+    python benchmarks/bench_forecast.py --series 150 --history 180 --horizon 60
+
+Fits a gradient boosting model on the forecast features of synthetic
+monthly series and serves it from a registry, as the API does. Then
+forecasts ``--horizon`` months three ways:
+
+- batch: one FeaturePipeline holding every series, one model call per month
+- per series: the same ring buffer, one series at a time
+- pandas: per series and month, append the prediction to a DataFrame and
+  recompute the shift/rolling/groupby features over the whole history, the
+  way notebook 13 builds them (run on ``--pandas-series`` series and
+  scaled up)
+
+and checks the three produce the same paths. Finally appends
+``--update-months`` observed months to every series with
+FeaturePipeline.update and compares its training rows with
+features.training_frame rerun over each whole series. Calendar months
+recur within the new months, so the seasonal means have to cover all of
+them; the rows of a first update are brought up to date after a second
+with FeaturePipeline.reseason.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_COLUMNS, LAGS, WINDOWS, FeaturePipeline, training_frame
+from forecast import month_axis, recursive_forecast
+from model_registry import REGISTRY_FILE, ModelRegistry, save_model
+
+
+def synthetic_series(n_series, n_months, rng):
+    """Seasonal series with a trend and noise, one per row"""
+    t = np.arange(n_months)
+    phase = rng.uniform(0, 2 * np.pi, (n_series, 1))
+    trend = rng.normal(-0.05, 0.02, (n_series, 1))
+    return 6 * np.sin(2 * np.pi * t / 12 + phase) + trend * t + rng.normal(0, 1, (n_series, n_months))
+
+
+def pandas_features(values, months, observed):
+    """Forecast features of the month after ``values``, recomputed from scratch
+
+    Seasonal means come from the first ``observed`` (real) months only, as
+    in FeaturePipeline.
+    """
+    frame = pd.DataFrame({'groundwater_cm': np.append(values, np.nan),
+                          'date': np.append(months, months[-1] + 1).astype('datetime64[ns]')})
+    frame['year'] = frame['date'].dt.year
+    frame['month'] = frame['date'].dt.month
+    previous = frame['groundwater_cm'].shift(1)
+    for lag in LAGS:
+        frame[f'gw_lag_{lag}'] = frame['groundwater_cm'].shift(lag)
+    for window in WINDOWS:
+        frame[f'gw_ma_{window}'] = previous.rolling(window=window).mean()
+    frame['linear_trend'] = range(len(frame))
+    seasonal = frame.iloc[:observed].groupby('month')['groundwater_cm'].mean()
+    frame['seasonal_avg'] = frame['month'].map(seasonal)
+    frame['seasonal_anomaly'] = previous - frame['month'].shift(1).map(seasonal)
+    return frame.iloc[[-1]][list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64)
+
+
+def pandas_forecast(model, values, months, horizon):
+    values, months = np.asarray(values), np.asarray(months, dtype='datetime64[M]')
+    observed = len(values)
+    path = []
+    for _ in range(horizon):
+        prediction = float(model.predict(pandas_features(values, months, observed))[0])
+        path.append(prediction)
+        values = np.append(values, prediction)
+        months = np.append(months, months[-1] + 1)
+    return np.array(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recursive multi-step forecasts')
+    parser.add_argument('--series', type=int, default=150)
+    parser.add_argument('--history', type=int, default=180, help='Months of history per series')
+    parser.add_argument('--horizon', type=int, default=60)
+    parser.add_argument('--pandas-series', type=int, default=3)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--update-months', type=int, default=36, help='Observed months appended per series')
+    args = parser.parse_args()
+
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    rng = np.random.default_rng(42)
+    values = synthetic_series(args.series, args.history, rng)
+    months = month_axis('2017-06', args.history)
+
+    # Training rows: every month of every series with a full year before it
+    rows, targets = [], []
+    for series in values[:20]:
+        for end in range(12, args.history):
+            pipeline = FeaturePipeline.fit(series[:end], months[:end])
+            rows.append(pipeline.features(FEATURE_COLUMNS)[0])
+            targets.append(series[end])
+    model = GradientBoostingRegressor(n_estimators=args.trees, random_state=0).fit(np.array(rows), targets)
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_model(directory, 'forecast', model, feature_names=list(FEATURE_COLUMNS))
+        served = ModelRegistry.load(os.path.join(directory, REGISTRY_FILE)).get()
+
+        start = time.perf_counter()
+        _, batch = recursive_forecast(served, FeaturePipeline.fit(values, months), args.horizon)
+        batch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single = np.vstack([recursive_forecast(served, FeaturePipeline.fit(row, months), args.horizon)[1]
+                            for row in values])
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recomputed = np.vstack([pandas_forecast(served, row, months, args.horizon)
+                                for row in values[:args.pandas_series]])
+        pandas_seconds = (time.perf_counter() - start) * args.series / args.pandas_series
+
+    steps = args.series * args.horizon
+    print(f"📈 {args.series} series x {args.history} months of history, {args.horizon}-month horizon "
+          f"({args.trees}-tree gradient boosting)")
+    print(f"{'method':<26} {'seconds':>9} {'µs per series-month':>20}")
+    for label, seconds in (('ring buffer, batched', batch_seconds), ('ring buffer, per series', single_seconds),
+                           (f'pandas (x{args.series / args.pandas_series:.0f} scaled)', pandas_seconds)):
+        print(f"{label:<26} {seconds:>9.3f} {seconds / steps * 1e6:>20,.1f}")
+
+    print(f"🔍 Max difference: batched vs per series {np.abs(batch - single).max():.2e}, "
+          f"vs pandas {np.abs(batch[:args.pandas_series] - recomputed).max():.2e}")
+
+    # New observations: incremental training rows vs rebuilding the whole frame
+    new_values = synthetic_series(args.series, args.update_months, rng)
+    pipeline = FeaturePipeline.fit(values, months)
+    start = time.perf_counter()
+    incremental = pipeline.update(new_values)
+    update_seconds = time.perf_counter() - start
+
+    all_months = month_axis(months[-1] + args.update_months, args.history + args.update_months)
+    start = time.perf_counter()
+    rebuilt = np.stack([training_frame(all_months, row)[FEATURE_COLUMNS].to_numpy()[-args.update_months:]
+                        for row in np.hstack([values, new_values])])
+    rebuild_seconds = time.perf_counter() - start
+
+    print(f"\n🧱 {args.update_months} new months x {args.series} series")
+    print(f"{'method':<26} {'seconds':>9} {'µs per series-month':>20}")
+    updates = args.series * args.update_months
+    for label, seconds in (('FeaturePipeline.update', update_seconds), ('training_frame rebuild', rebuild_seconds)):
+        print(f"{label:<26} {seconds:>9.3f} {seconds / updates * 1e6:>20,.1f}")
+    print(f"🔍 Max difference of the training rows: {np.abs(incremental - rebuilt).max():.2e}")
+
+    # The same months in two updates: the first half's seasonal columns go stale until reseasoned
+    half = args.update_months // 2
+    pipeline = FeaturePipeline.fit(values[:1], months)
+    first = pipeline.update(new_values[:1, :half])[0]
+    second = pipeline.update(new_values[:1, half:])[0]
+    stale = np.abs(np.vstack([first, second]) - rebuilt[0]).max()
+    fresh = np.abs(np.vstack([pipeline.reseason(first, FEATURE_COLUMNS), second]) - rebuilt[0]).max()
+    print(f"🔍 In two updates: max difference {stale:.2e} before reseason, {fresh:.2e} after")
+    print("✅ Each forecast month is one model call for every series, with O(window) feature updates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# webapp/backend/benchmarks/bench_lookup.py
+"""Point-to-district lookup throughput with the STRtree index
+
+    python benchmarks/bench_lookup.py --points 1000000
+
+Draws random points over Pakistan's bounding box and resolves them with
+DistrictIndex.lookup (cell raster, then bounding-box tree and exact test
+for points near borders), in one vectorized call and in chunks, and with
+the tree alone. A brute-force scan that tests every polygon for every
+point runs on a sample to check the answers and to show what the index
+saves.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial import DistrictIndex
+
+SHAPEFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'data', 'processed', 'pakistan_districts_cleaned.shp')
+
+
+def brute_force(index, lon, lat):
+    """Test every polygon against every point (what the index avoids)"""
+    points = shapely.points(lon, lat)
+    rows = np.full(len(points), -1, dtype=np.int64)
+    for i, geometry in enumerate(index.geometries):
+        hit = (rows < 0) & shapely.intersects(geometry, points)
+        rows[hit] = i
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark point-to-district lookups')
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--chunk', type=int, default=10_000, help='Chunk size for the chunked run')
+    parser.add_argument('--sample', type=int, default=20_000, help='Points checked against brute force')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = DistrictIndex.from_shapefile(SHAPEFILE)
+    print(f"🗂️ Index built over {len(index)} districts in {time.perf_counter() - start:.3f}s")
+
+    rng = np.random.default_rng(42)
+    bounds = shapely.total_bounds(index.geometries)
+    lon = rng.uniform(bounds[0], bounds[2], args.points)
+    lat = rng.uniform(bounds[1], bounds[3], args.points)
+
+    start = time.perf_counter()
+    index.cell_labels()
+    raster = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = index.lookup(lon, lat)
+    bulk = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree_rows = index._lookup_exact(lon, lat)
+    tree_only = time.perf_counter() - start
+    assert np.array_equal(rows, tree_rows), 'Raster lookup disagrees with the tree'
+
+    start = time.perf_counter()
+    for i in range(0, args.points, args.chunk):
+        index.lookup(lon[i:i + args.chunk], lat[i:i + args.chunk])
+    chunked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.names(rows)
+    naming = time.perf_counter() - start
+
+    sample = min(args.sample, args.points)
+    start = time.perf_counter()
+    expected = brute_force(index, lon[:sample], lat[:sample])
+    brute = (time.perf_counter() - start) * args.points / sample
+    assert np.array_equal(expected, rows[:sample]), 'Index lookup disagrees with brute force'
+
+    print(f"🧮 Cell raster ({index.cell_size}°) built in {raster:.3f}s")
+    print(f"📍 {args.points:,} points, {(rows >= 0).mean():.1%} inside a district")
+    print(f"{'method':<30} {'seconds':>9} {'points/s':>12}")
+    for label, seconds in [('raster + STRtree, one call', bulk),
+                           (f'raster + STRtree, {args.chunk:,}/call', chunked),
+                           ('STRtree only', tree_only),
+                           ('brute force (extrapolated)', brute)]:
+        print(f"{label:<30} {seconds:>9.3f} {args.points / seconds:>12,.0f}")
+    print(f"{'names for all rows':<30} {naming:>9.3f}")
+    print(f"✅ Matches brute force on {sample:,} sampled points")
+
+
+if __name__ == '__main__':
+    main()
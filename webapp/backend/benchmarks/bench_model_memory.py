@@ -0,0 +1,176 @@
+# webapp/backend/benchmarks/bench_model_memory.py
+"""Per-worker memory of the models: unpickled estimators vs the mapped registry
+
+    python benchmarks/bench_model_memory.py --workers 4 --trees 300
+
+Trains a random forest, a gradient boosting model and a linear model on
+synthetic data, saves them as joblib pickles (what the app loaded before
+the registry) and with ``save_model``, then starts ``--workers`` separate
+processes per variant, like gunicorn workers each loading at startup.
+Every worker loads all three models, predicts a batch so the pages it
+needs are touched, and reports its RSS, PSS (shared pages split between
+the processes sharing them) and private memory while all its siblings
+are still alive.
+
+Before that, checks every format the registry serves against scikit-learn,
+including a model served from its joblib file behind a scaler saved as
+arrays.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from model_registry import REGISTRY_FILE, ServedModel, save_model
+
+MODELS = ('random_forest', 'gradient_boosting', 'linear_regression')
+
+
+def memory_mb():
+    """RSS, PSS and private memory of this process (Linux)"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[key] = int(value.split()[0]) / 1024
+    return {'rss': fields.get('Rss', 0.0), 'pss': fields.get('Pss', 0.0),
+            'private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)}
+
+
+def worker(variant, directory, features):
+    """Child process: load every model, predict once, report memory when told to"""
+    import joblib
+    from model_registry import ModelRegistry
+
+    baseline = memory_mb()
+    start = time.perf_counter()
+    X = np.random.default_rng(1).normal(0, 1, (1000, features))
+    if variant == 'pickle':
+        models = {name: joblib.load(os.path.join(directory, f'{name}.pkl')) for name in MODELS}
+        checksum = sum(float(model.predict(X).sum()) for model in models.values())
+    else:
+        registry = ModelRegistry.load(os.path.join(directory, REGISTRY_FILE))
+        checksum = sum(float(registry.get(name).predict(X).sum()) for name in MODELS)
+    load_seconds = time.perf_counter() - start
+
+    print('ready', flush=True)
+    sys.stdin.readline()  # Measure once every sibling has loaded too
+    memory = memory_mb()
+    print(json.dumps({
+        'load_seconds': load_seconds,
+        'checksum': checksum,
+        **memory,
+        **{f'{key}_growth': memory[key] - baseline[key] for key in memory},
+    }), flush=True)
+
+
+def measure(variant, directory, features, workers):
+    """Start ``workers`` processes, let them all load, then collect their reports"""
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', variant,
+                                   '--directory', directory, '--features', str(features)],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=BACKEND_DIR)
+                 for _ in range(workers)]
+    for process in processes:
+        if process.stdout.readline().strip() != 'ready':
+            raise RuntimeError(f"{variant} worker failed to load")
+    reports = []
+    for process in processes:
+        process.stdin.write('\n')
+        process.stdin.flush()
+        reports.append(json.loads(process.stdout.readline()))
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return reports
+
+
+def check_formats(X, y):
+    """Max difference between each served model and scikit-learn, with and without a scaler"""
+    from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    cases = {
+        'forest': (RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y), None),
+        'scaled_linear': (LinearRegression().fit(X_scaled, y), scaler),
+        'scaled_estimator': (HistGradientBoostingRegressor(max_iter=20, random_state=0).fit(X_scaled, y), scaler),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (model, model_scaler) in cases.items():
+            meta = save_model(directory, name, model, model_scaler)
+            served = ServedModel.load(os.path.join(directory, name, meta['version']))
+            expected = model.predict(X if model_scaler is None else X_scaled)
+            difference = np.abs(served.predict(X) - expected).max()
+            print(f"🔍 {name} ({meta['format']}): max difference from scikit-learn {difference:.2e}")
+            if difference > 1e-9:
+                raise SystemExit(f"⚠️ {name} is served wrong")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-worker model memory')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--trees', type=int, default=300)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--features', type=int, default=13)
+    parser.add_argument('--child', choices=['pickle', 'registry'], help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        worker(args.child, args.directory, args.features)
+        return
+
+    import joblib
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(0, 1, (args.rows, args.features))
+    y = 3 * X[:, 0] + np.sin(2 * X[:, 1]) + X[:, 2] * X[:, 3] + rng.normal(0, 0.5, args.rows)
+    check_formats(X[:2000], y[:2000])
+    models = {
+        'random_forest': RandomForestRegressor(n_estimators=args.trees, random_state=0),
+        'gradient_boosting': GradientBoostingRegressor(n_estimators=args.trees, random_state=0),
+        'linear_regression': LinearRegression(),
+    }
+    print(f"🌲 Training on {args.rows:,} rows x {args.features} features ({args.trees} trees per ensemble)...")
+    for model in models.values():
+        model.fit(X, y)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, model in models.items():
+            joblib.dump(model, os.path.join(directory, f'{name}.pkl'))
+            save_model(directory, name, model)
+        pickled_mb = sum(os.path.getsize(os.path.join(directory, f'{name}.pkl')) for name in MODELS) / 1e6
+        print(f"📦 Pickles: {pickled_mb:,.1f} MB on disk")
+
+        results = {variant: measure(variant, directory, args.features, args.workers)
+                   for variant in ('pickle', 'registry')}
+
+    print(f"\n{'variant':<10} {'load s':>7} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11} {'private growth MB':>18}")
+    for variant, reports in results.items():
+        mean = {key: np.mean([report[key] for report in reports]) for key in reports[0]}
+        print(f"{variant:<10} {mean['load_seconds']:>7.2f} {mean['rss']:>8.1f} {mean['pss']:>8.1f} "
+              f"{mean['private']:>11.1f} {mean['private_growth']:>18.1f}")
+    if not np.allclose([r['checksum'] for r in results['pickle']], [r['checksum'] for r in results['registry']]):
+        print("⚠️ Predictions differ between the pickles and the registry")
+
+    total = {variant: sum(report['pss'] for report in reports) for variant, reports in results.items()}
+    print(f"\n🧠 {args.workers} workers, total PSS: pickles {total['pickle']:,.1f} MB, "
+          f"registry {total['registry']:,.1f} MB ({total['pickle'] - total['registry']:,.1f} MB saved)")
+    print("✅ Mapped model arrays are one copy in the page cache, however many workers serve them")
+
+
+if __name__ == '__main__':
+    main()
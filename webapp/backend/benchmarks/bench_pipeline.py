@@ -0,0 +1,142 @@
+# webapp/backend/benchmarks/bench_pipeline.py
+"""Profile notebook 13's training pipeline on synthetic series
+
+    python benchmarks/bench_pipeline.py --series 8 --months 240 --trace pipeline_trace.json
+    python benchmarks/bench_pipeline.py --save-baseline baseline.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json --tolerance 1.25
+
+Runs the pipeline's stages on ``--series`` synthetic monthly series of
+``--months`` each: feature creation (features.training_frame), training
+(every model's TimeSeriesSplit folds and final fit on the parallel
+engine), scoring and registering into a temporary model registry. A
+profiler.TrainingProfiler times each stage and (model, fold) task with
+its peak memory, prints the summary table and optionally writes the
+Chrome trace timeline.
+
+``--save-baseline`` keeps the summary; ``--baseline`` compares a run with
+one and exits with status 1 when any span's total time grew by more than
+``--tolerance`` (spans under ``--min-seconds`` are too noisy to compare),
+so a slower pipeline is caught before the nightly retrain. Both runs need
+the same settings (series, months, trees, workers and ``--trace-memory``,
+which slows the fits it measures).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_COLUMNS, training_frame
+from forecast import month_axis
+from model_registry import save_model
+from profiler import TrainingProfiler
+from training import train_models
+
+
+def synthetic_series(n_series, n_months, rng):
+    """Seasonal series with a trend and random walk, one per row"""
+    t = np.arange(n_months)
+    phase = rng.uniform(0, 2 * np.pi, (n_series, 1))
+    return 6 * np.sin(2 * np.pi * t / 12 + phase) - 0.05 * t + np.cumsum(rng.normal(0, 0.6, (n_series, n_months)),
+                                                                          axis=1)
+
+
+def regressions(summary, baseline, tolerance, min_seconds):
+    """(name, baseline seconds, seconds) of every span slower than ``tolerance`` times its baseline"""
+    slower = []
+    for name, total in summary.items():
+        before = baseline.get(name)
+        if before is None or before['seconds'] < min_seconds:
+            continue
+        if total['seconds'] > tolerance * before['seconds']:
+            slower.append((name, before['seconds'], total['seconds']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the training pipeline on synthetic series')
+    parser.add_argument('--series', type=int, default=4)
+    parser.add_argument('--months', type=int, default=240)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Peak allocations per span too (tracemalloc; slows allocation-heavy fits)')
+    parser.add_argument('--trace', help='Write the Chrome trace timeline here')
+    parser.add_argument('--save-baseline', help='Write the summary here')
+    parser.add_argument('--baseline', help='Compare with a summary saved by --save-baseline')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    parser.add_argument('--min-seconds', type=float, default=0.1)
+    args = parser.parse_args()
+
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    models = {
+        'Linear Regression': (LinearRegression(), True),
+        'Random Forest': (RandomForestRegressor(n_estimators=args.trees, random_state=42), False),
+        'Gradient Boosting': (GradientBoostingRegressor(n_estimators=args.trees, random_state=42), False)
+    }
+    settings = {'series': args.series, 'months': args.months, 'trees': args.trees,
+                'workers': args.workers or os.cpu_count(), 'trace_memory': args.trace_memory}
+    values = synthetic_series(args.series, args.months, np.random.default_rng(42))
+    months = month_axis('2024-12', args.months)
+    print(f"🧮 {args.series} series x {args.months} months, {len(models)} models x (5 folds + final fit), "
+          f"{settings['workers']} workers")
+
+    with TrainingProfiler(memory=args.trace_memory) as profiler:
+        with profiler.stage('create features'):
+            datasets = {}
+            for i, series in enumerate(values):
+                frame = training_frame(months, series).dropna()
+                datasets[f'series_{i:03d}'] = (frame[FEATURE_COLUMNS].to_numpy(), frame['groundwater_cm'].to_numpy(),
+                                               FEATURE_COLUMNS)
+
+        with profiler.stage('train models'):
+            trained = train_models(datasets, models, n_splits=5, workers=args.workers, profiler=profiler)
+
+        for key, (_, y, _) in datasets.items():
+            for name, fit in trained[key].items():
+                with profiler.stage('score model', model=name):
+                    fit['rmse'] = np.sqrt(mean_squared_error(y, fit['prediction']))
+                    fit['mae'] = mean_absolute_error(y, fit['prediction'])
+                    fit['r2'] = r2_score(y, fit['prediction'])
+
+        with tempfile.TemporaryDirectory() as registry_dir:
+            for key in datasets:
+                for name, fit in trained[key].items():
+                    with profiler.stage('register model', model=name):
+                        save_model(registry_dir, f"{key}_{name.lower().replace(' ', '_')}", fit['estimator'],
+                                   fit['scaler'], feature_names=FEATURE_COLUMNS)
+
+    print()
+    profiler.print_summary()
+    summary = profiler.summary()
+    if args.trace:
+        profiler.write_trace(args.trace)
+        print(f"📈 Timeline saved: {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'settings': settings, 'spans': summary}, f, indent=2)
+        print(f"💾 Baseline saved: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['settings'] != settings:
+            print(f"⚠️ The baseline ran with {baseline['settings']}; timings are not comparable")
+            sys.exit(2)
+        slower = regressions(summary, baseline['spans'], args.tolerance, args.min_seconds)
+        for name, before, after in slower:
+            print(f"⚠️ {name}: {before:.3f} s -> {after:.3f} s ({after / before:.2f}x)")
+        if slower:
+            sys.exit(1)
+        print(f"✅ No span more than {args.tolerance:g}x slower than the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# webapp/backend/benchmarks/bench_predict_cache.py
+"""/api/predict latency with and without the prediction memo
+
+    python benchmarks/bench_predict_cache.py --requests 5000 --scenarios 300
+
+Replays a scenario-UI style mix: (month, year, linear_trend) tuples drawn
+from ``--scenarios`` distinct ones with Zipf-like popularity, so a few
+scenarios are posted over and over and a long tail only now and then. The
+model is a random forest fitted on those three features (the ensemble case
+the memo is for), swapped into the app the way a reload would; the same
+request sequence runs through the Flask test client with the memo off and
+on.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as backend
+from model_registry import ModelRegistry, ServedModel
+from snapshot import Snapshot
+
+
+def scenario_mix(n_requests, n_scenarios, exponent, rng):
+    """Request bodies drawn from ``n_scenarios`` tuples with Zipf(exponent) popularity"""
+    months = rng.integers(1, 13, n_scenarios)
+    years = rng.integers(2018, 2031, n_scenarios)
+    trends = rng.integers(150, 260, n_scenarios)
+    weights = 1.0 / np.arange(1, n_scenarios + 1) ** exponent
+    picks = rng.choice(n_scenarios, n_requests, p=weights / weights.sum())
+    return [{'month': int(months[i]), 'year': int(years[i]), 'linear_trend': int(trends[i])} for i in picks]
+
+
+def ensemble_model(rng, trees):
+    """A forest and scaler on (month, year, linear_trend), like the ensemble candidates of notebook 13"""
+    X = np.column_stack([rng.integers(1, 13, 2000), rng.integers(2002, 2018, 2000), rng.uniform(0, 190, 2000)])
+    y = np.sin(X[:, 0] / 12 * 2 * np.pi) * 5 - 0.08 * X[:, 2] + rng.normal(0, 1, 2000)
+    scaler = StandardScaler().fit(X)
+    return RandomForestRegressor(n_estimators=trees, random_state=0).fit(scaler.transform(X), y), scaler
+
+
+def replay(client, bodies):
+    latencies = []
+    start = time.perf_counter()
+    for body in bodies:
+        began = time.perf_counter()
+        response = client.post('/api/predict', json=body)
+        latencies.append(time.perf_counter() - began)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/predict returned {response.status_code}: {response.get_data(as_text=True)}")
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1e3
+    return {
+        'throughput_rps': round(len(bodies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /api/predict memo')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--scenarios', type=int, default=300)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Popularity exponent of the scenario mix')
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--cache-size', type=int, default=backend.prediction_cache.size)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    model, scaler = ensemble_model(rng, args.trees)
+    # No file watcher: it would swap the real files back in mid-run
+    backend.snapshots.interval = 0
+    current = backend.snapshots.current
+    served = ServedModel.from_estimator('forest', model, scaler, version='bench')
+    models = ModelRegistry({served.name: served}, served.name)
+    backend.snapshots.swap(Snapshot('bench', current.files, **dict(current.parts, models=models)))
+    bodies = scenario_mix(args.requests, args.scenarios, args.zipf, rng)
+    client = backend.app.test_client()
+
+    print(f"🌲 RandomForest ({args.trees} trees), {args.requests:,} requests over {args.scenarios} scenarios "
+          f"(Zipf {args.zipf})")
+    print(f"{'memo':>10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9} {'hit rate':>9} {'evictions':>10}")
+    for label, size in (('off', 0), (f'{args.cache_size:,}', args.cache_size)):
+        backend.prediction_cache.size = size
+        backend.prediction_cache.clear()
+        before = backend.prediction_cache.describe()
+        result = replay(client, bodies)
+        stats = backend.prediction_cache.describe()
+        hits = stats['hits'] - before['hits']
+        hit_rate = hits / args.requests
+        evictions = stats['evictions'] - before['evictions']
+        print(f"{label:>10} {result['throughput_rps']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+              f"{result['mean_ms']:>9} {hit_rate:>9.1%} {evictions:>10}")
+
+    print("✅ Repeated scenarios skip scaler.transform and model.predict entirely")
+
+
+if __name__ == '__main__':
+    main()
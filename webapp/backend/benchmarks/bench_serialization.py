@@ -0,0 +1,84 @@
+# webapp/backend/benchmarks/bench_serialization.py
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import float_values, iso_dates, records
+
+
+def synthetic_series(n_rows):
+    """Hourly series so large sizes stay inside the datetime64[ns] range"""
+    dates = pd.date_range('1900-01-01', periods=n_rows, freq='h')
+    values = np.random.default_rng(42).normal(-5, 3, n_rows)
+    return pd.DataFrame({'date': dates, 'groundwater_cm': values})
+
+
+def serialize_iterrows(df):
+    """The original per-row path used by the endpoints"""
+    data = []
+    for _, row in df.iterrows():
+        data.append({
+            'date': row['date'].strftime('%Y-%m-%d'),
+            'groundwater_cm': float(row['groundwater_cm']),
+            'data_source': 'GRACE'
+        })
+    return data
+
+
+def serialize_columns(df):
+    """The column-wise path from serialization.py"""
+    return records(
+        date=iso_dates(df['date']),
+        groundwater_cm=float_values(df['groundwater_cm']),
+        data_source='GRACE'
+    )
+
+
+def best_of(func, df, repeats):
+    """Best wall-clock time over a few runs, plus the last result"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare iterrows() and column-wise row serialization')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--iterrows-max', type=int, default=1_000_000,
+                        help='Skip the slow iterrows() path above this many rows')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'iterrows (s)':>14} {'columns (s)':>13} {'speedup':>9} {'json (s)':>10}")
+    for n_rows in args.sizes:
+        df = synthetic_series(n_rows)
+        fast_time, fast_rows = best_of(serialize_columns, df, args.repeats)
+
+        if n_rows <= args.iterrows_max:
+            slow_time, slow_rows = best_of(serialize_iterrows, df, 1)
+            assert slow_rows == fast_rows, 'Column-wise output differs from iterrows() output'
+            slow_label = f"{slow_time:14.3f}"
+            speedup = f"{slow_time / fast_time:8.1f}x"
+        else:
+            slow_label = f"{'skipped':>14}"
+            speedup = f"{'-':>9}"
+
+        start = time.perf_counter()
+        json.dumps(fast_rows, separators=(',', ':'))
+        json_time = time.perf_counter() - start
+
+        print(f"{n_rows:>10} {slow_label} {fast_time:13.3f} {speedup} {json_time:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
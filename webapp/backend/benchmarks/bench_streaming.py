@@ -0,0 +1,146 @@
+# webapp/backend/benchmarks/bench_streaming.py
+"""Peak memory and time to first byte: streamed NDJSON/CSV vs one JSON document
+
+    python benchmarks/bench_streaming.py --rows 10000000 --json-rows 1000000
+
+Each measurement runs in its own process over a synthetic historical series
+swapped into the app, and drives the Flask app the way a WSGI server does:
+iterating the response body and counting the bytes rather than keeping
+them. Peak RSS growth is the kernel's high-water mark (reset just before
+the request) minus the RSS with the dataset already loaded, i.e. what the
+response itself needed.
+
+The JSON baseline is the windowed time-series path, which builds the whole
+document before sending anything. At 10M rows it would need several GB, so
+it runs at ``--json-rows`` next to a stream of the same size; its peak is
+also shown scaled linearly to ``--rows``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUESTS = {
+    'ndjson': ('/api/export/historical', ''),
+    'csv': ('/api/export/historical', 'format=csv'),
+    # A window covering every row skips the response cache and runs jsonify on all of them
+    'json': ('/api/historical/timeseries', 'start=1900'),
+}
+
+
+def memory_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def reset_peak():
+    """Reset VmHWM to the current RSS; False where the kernel does not allow it"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def measure(mode, rows):
+    """Child process: serve one request over ``rows`` synthetic rows and report"""
+    sys.path.insert(0, BACKEND_DIR)
+    from werkzeug.test import EnvironBuilder
+
+    import app as backend
+    from snapshot import Snapshot
+
+    rng = np.random.default_rng(42)
+    frame = pd.DataFrame({
+        'date': pd.date_range('1990-01-01', periods=rows, freq='min'),
+        'groundwater_cm': np.round(rng.normal(0, 8, rows), 4),
+    })
+    # No file watcher: it would swap the real files back in mid-run
+    backend.snapshots.interval = 0
+    current = backend.snapshots.current
+    backend.snapshots.swap(Snapshot('bench', current.files, **dict(current.parts, grace_data=frame)))
+    del frame, current
+
+    path, query = REQUESTS[mode]
+    environ = EnvironBuilder(path=path, query_string=query).get_environ()
+    statuses = []
+
+    rss_before = memory_kb('VmRSS')
+    peak_reset = reset_peak()
+    start = time.perf_counter()
+    result = backend.app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    first_byte, size = None, 0
+    try:
+        for chunk in result:
+            if chunk and first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'rows': rows,
+        'status': statuses[0],
+        'bytes': size,
+        'first_byte_ms': round(first_byte * 1e3, 1),
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(rows / elapsed),
+        'rss_mb': round(rss_before / 1024, 1),
+        'peak_growth_mb': round((memory_kb('VmHWM') - rss_before) / 1024, 1) if peak_reset else None,
+    }
+
+
+def run_child(mode, rows):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, '--rows', str(rows)],
+                            capture_output=True, text=True, cwd=BACKEND_DIR)
+    if output.returncode != 0:
+        raise RuntimeError(f"{mode} at {rows:,} rows failed:\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streamed vs buffered time-series responses')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--json-rows', type=int, default=1_000_000)
+    parser.add_argument('--child', choices=list(REQUESTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.rows)))
+        return
+
+    runs = [('ndjson', args.rows), ('csv', args.rows), ('ndjson', args.json_rows), ('json', args.json_rows)]
+    print(f"{'mode':>7} {'rows':>11} {'MB out':>8} {'first byte ms':>14} {'total s':>8} {'rows/s':>10} "
+          f"{'dataset RSS MB':>15} {'peak growth MB':>15}")
+    results = []
+    for mode, rows in runs:
+        result = run_child(mode, rows)
+        results.append(result)
+        peak = result['peak_growth_mb']
+        print(f"{mode:>7} {rows:>11,} {result['bytes'] / 1e6:>8.1f} {result['first_byte_ms']:>14,.1f} "
+              f"{result['seconds']:>8.2f} {result['rows_per_second']:>10,} {result['rss_mb']:>15,.1f} "
+              f"{peak if peak is not None else 'n/a':>15}")
+
+    buffered = results[-1]
+    if buffered['peak_growth_mb'] is not None:
+        scaled = buffered['peak_growth_mb'] * args.rows / args.json_rows
+        print(f"📈 One JSON document of {args.rows:,} rows would need ~{scaled / 1024:.1f} GB on top of the dataset")
+    print("✅ Streamed responses hold one chunk at a time, whatever the row count")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# webapp/backend/benchmarks/bench_tiles.py
+"""Vector tile build cost and size per zoom level
+
+    python benchmarks/bench_tiles.py --max-zoom 9
+
+Builds every tile that covers the district layer at each zoom, cold (the
+first tile of a zoom also pays for that zoom's simplification), then reads
+them back from the LRU and from a disk cache. Vertex counts show how much
+of the full-resolution geometry each zoom's simplification keeps.
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial import DistrictIndex
+from tiles import DistrictTiles
+
+SHAPEFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'data', 'processed', 'pakistan_districts_cleaned.shp')
+
+
+def tile_range(bounds, z):
+    """Tiles (x, y) covering a lon/lat bounding box at zoom z"""
+    west, south, east, north = bounds
+    n = 1 << z
+
+    def tile_y(lat):
+        return int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+
+    xs = range(int((west + 180) / 360 * n), min(int((east + 180) / 360 * n), n - 1) + 1)
+    ys = range(tile_y(north), min(tile_y(south), n - 1) + 1)
+    return [(x, y) for x in xs for y in ys]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark district vector tiles')
+    parser.add_argument('--max-zoom', type=int, default=9)
+    args = parser.parse_args()
+
+    index = DistrictIndex.from_shapefile(SHAPEFILE)
+    full_vertices = int(shapely.get_num_coordinates(index.geometries).sum())
+    print(f"🗂️ {len(index)} districts, {full_vertices:,} vertices at full resolution")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        tiles = DistrictTiles(index, version='bench', cache_dir=cache_dir)
+        print(f"{'zoom':>4} {'tiles':>6} {'non-empty':>9} {'vertices':>10} {'KB':>9} {'KB br':>8} "
+              f"{'build ms/tile':>14} {'LRU µs':>8} {'disk ms':>8}")
+        for z in range(args.max_zoom + 1):
+            keys = tile_range(index.bounds, z)
+
+            start = time.perf_counter()
+            entries = [tiles.get(z, x, y) for x, y in keys]
+            build = (time.perf_counter() - start) / len(keys)
+
+            start = time.perf_counter()
+            for x, y in keys:
+                tiles.get(z, x, y)
+            lru = (time.perf_counter() - start) / len(keys)
+
+            # A fresh instance over the same directory: what another worker or a restart sees
+            disk_tiles = DistrictTiles(index, version='bench', cache_dir=cache_dir)
+            start = time.perf_counter()
+            for x, y in keys:
+                disk_tiles.get(z, x, y)
+            disk = (time.perf_counter() - start) / len(keys)
+
+            geometries, _ = tiles.zoom_geometries(z)
+            vertices = int(shapely.get_num_coordinates(geometries).sum())
+            size = sum(len(entry.body) for entry in entries)
+            size_br = sum(len(entry.encoded.get('br', entry.body)) for entry in entries)
+            non_empty = sum(1 for entry in entries if entry.body)
+            print(f"{z:>4} {len(keys):>6} {non_empty:>9} {vertices:>10,} {size / 1024:>9.1f} {size_br / 1024:>8.1f} "
+                  f"{build * 1e3:>14.1f} {lru * 1e6:>8.1f} {disk * 1e3:>8.2f}")
+
+    print(f"✅ Tiles cached under a per-snapshot directory; {tiles.describe()['built']} built")
+
+
+if __name__ == '__main__':
+    main()
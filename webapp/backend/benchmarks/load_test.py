@@ -0,0 +1,207 @@
+# webapp/backend/benchmarks/load_test.py
+"""Compare the sync gunicorn deployment with the ASGI mode under load
+
+    python benchmarks/load_test.py --concurrency 10 100 1000 --duration 10
+
+Starts both servers on localhost (gunicorn sync workers running app:app and
+gunicorn with uvicorn workers running asgi:application, with the same
+number of workers), then
+holds N keep-alive connections open against each and reports throughput and
+latency percentiles. Pass --sync-url/--async-url to test running servers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dashboard-like request mix: (method, path, JSON body[, extra headers])
+DEFAULT_MIX = [
+    ('GET', '/api/health', None),
+    ('GET', '/api/historical/timeseries', None),
+    ('GET', '/api/recent/timeseries', None),
+    ('GET', '/api/combined/timeline', None),
+    ('GET', '/api/gldas/trend-analysis', None),
+    ('GET', '/api/districts/groundwater', None),
+    ('POST', '/api/predict', {'month': 6, 'year': 2024, 'linear_trend': 200}),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def launch_server(command, port, timeout=60, env=None):
+    """Start a server process and wait until its health check answers"""
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=dict(os.environ, **(env or {})),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                if json.loads(response.read()).get('data_loaded'):
+                    return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"Server did not become healthy: {' '.join(command)}")
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    headers = {}
+    for line in head.split(b'\r\n')[1:]:
+        if b':' in line:
+            name, value = line.split(b':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get(b'transfer-encoding') == b'chunked':
+        size = 0
+        while True:
+            chunk_size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+            if chunk_size == 0:
+                return status, size, headers
+    length = int(headers.get(b'content-length', 0))
+    await reader.readexactly(length)
+    return status, length, headers
+
+
+async def _connection(host, port, mix, deadline, timeout, samples, offset):
+    """One keep-alive client connection cycling through the request mix"""
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        method, path, payload, *extra = mix[i % len(mix)]
+        i += 1
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        headers = ''.join(f"{name}: {value}\r\n" for name, value in (extra[0] if extra else {}).items())
+        request = (f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: identity\r\n{headers}"
+                   f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            writer.write(request)
+            status, size, headers = await asyncio.wait_for(_read_response(reader), timeout)
+            samples.append((time.perf_counter() - start, status, size))
+            if headers.get(b'connection') == b'close':
+                writer.close()
+                writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            samples.append((time.perf_counter() - start, 0, 0))
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url, concurrency, duration, mix=DEFAULT_MIX, timeout=30.0):
+    """Drive ``url`` with ``concurrency`` connections for ``duration`` seconds"""
+    parts = urlsplit(url)
+    samples = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _connection(parts.hostname, parts.port or 80, mix, deadline, timeout, samples, i)
+        for i in range(concurrency)
+    ))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def summarize(samples, elapsed):
+    latencies = np.array([s[0] for s in samples]) if samples else np.zeros(1)
+    statuses = [s[1] for s in samples]
+    completed = sum(1 for status in statuses if status)
+    return {
+        'requests': len(samples),
+        'completed': completed,
+        'errors': len(samples) - completed,
+        'http_errors': sum(1 for status in statuses if status >= 400),
+        'throughput_rps': round(completed / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2),
+        'max_ms': round(float(latencies.max()) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync vs ASGI (uvicorn worker) load test')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--sync-url')
+    parser.add_argument('--async-url')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    # 1000 connections need more file descriptors than many shells allow by default
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * max(args.concurrency) + 256)), hard))
+
+    processes, targets = [], {}
+    try:
+        if args.sync_url:
+            targets['sync'] = args.sync_url
+        else:
+            port = free_port()
+            processes.append(launch_server([sys.executable, '-m', 'gunicorn', '-w', str(args.workers),
+                                            '-b', f"127.0.0.1:{port}", 'app:app'], port))
+            targets['sync'] = f"http://127.0.0.1:{port}"
+        if args.async_url:
+            targets['async'] = args.async_url
+        else:
+            port = free_port()
+            processes.append(launch_server([sys.executable, '-m', 'gunicorn', '-k', 'uvicorn.workers.UvicornWorker',
+                                            '-w', str(args.workers), '-b', f"127.0.0.1:{port}",
+                                            'asgi:application'], port))
+            targets['async'] = f"http://127.0.0.1:{port}"
+
+        results = []
+        print(f"{'mode':>6} {'conns':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'failed':>7}")
+        for concurrency in args.concurrency:
+            for mode, url in targets.items():
+                result = asyncio.run(run_load(url, concurrency, args.duration))
+                result.update(mode=mode, concurrency=concurrency)
+                results.append(result)
+                print(f"{mode:>6} {concurrency:>6} {result['throughput_rps']:>9} {result['p50_ms']:>9} "
+                      f"{result['p95_ms']:>9} {result['p99_ms']:>9} {result['errors']:>7}")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"✅ Results saved: {args.output}")
+    finally:
+        for process in processes:
+            stop_server(process)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# webapp/backend/columnar.py
+"""Binary columnar encodings for the time-series endpoints
+
+``application/x-watertrace-columnar`` payload layout (all little-endian):
+
+    bytes 0-3    magic ``b'WTC1'``
+    bytes 4-7    uint32 header length ``H``
+    bytes 8..    ``H`` bytes of UTF-8 JSON header, space-padded so the first
+                 column starts on an 8-byte boundary
+    then         each column's values back to back, in header order
+
+The header is ``{"rows": n, "columns": [...], "metadata": {...}}``. Each
+column entry has ``name`` and ``type`` (``int32``, ``float32`` or
+``uint8``). Date columns are ``int32`` days since 1970-01-01 and carry
+``"unit": "days"``. Text columns are ``uint8`` codes into the entry's
+``categories`` list. Constant fields (e.g. ``data_source``) live in
+``metadata`` instead of being repeated per row.
+
+When pyarrow is installed the same columns are also offered as an Arrow
+IPC stream (``application/vnd.apache.arrow.stream``) with ``date32``,
+``float32`` and dictionary-encoded string columns.
+"""
+import json
+import struct
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+COLUMNAR_MIME = 'application/x-watertrace-columnar'
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+MAGIC = b'WTC1'
+
+
+def _column_arrays(columns):
+    """Normalize a mapping of columns into (name, kind, numpy array, categories)"""
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if np.issubdtype(values.dtype, np.datetime64):
+            days = values.astype('datetime64[D]').astype(np.int32)
+            yield name, 'date', days, None
+        elif values.dtype.kind in 'OUS':
+            categories, codes = np.unique(values.astype(str), return_inverse=True)
+            yield name, 'category', codes.astype(np.uint8), categories.tolist()
+        else:
+            yield name, 'float', values.astype(np.float32), None
+
+
+def encode_columnar(columns, metadata=None):
+    """Pack DataFrame columns into the WTC1 layout without per-row objects"""
+    entries, buffers, n_rows = [], [], None
+    for name, kind, array, categories in _column_arrays(columns):
+        n_rows = len(array) if n_rows is None else n_rows
+        if len(array) != n_rows:
+            raise ValueError(f"Column {name!r} has {len(array)} rows, expected {n_rows}")
+        entry = {'name': name, 'type': str(array.dtype)}
+        if kind == 'date':
+            entry['unit'] = 'days'
+        if categories is not None:
+            if len(categories) > 256:
+                raise ValueError(f"Column {name!r} has too many categories for uint8 codes")
+            entry['categories'] = categories
+        entries.append(entry)
+        buffers.append(array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes())
+
+    header = json.dumps({'rows': n_rows or 0, 'columns': entries, 'metadata': metadata or {}},
+                        separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(len(header) + 8) % 8)
+    return b''.join([MAGIC, struct.pack('<I', len(header)), header] + buffers)
+
+
+def decode_columnar(payload):
+    """Read a WTC1 payload back into zero-copy numpy views and its header"""
+    if payload[:4] != MAGIC:
+        raise ValueError('Not a WaterTrace columnar payload')
+    (header_length,) = struct.unpack_from('<I', payload, 4)
+    header = json.loads(payload[8:8 + header_length])
+
+    columns, offset = {}, 8 + header_length
+    for entry in header['columns']:
+        dtype = np.dtype(entry['type']).newbyteorder('<')
+        columns[entry['name']] = np.frombuffer(payload, dtype=dtype, count=header['rows'], offset=offset)
+        offset += dtype.itemsize * header['rows']
+    return header, columns
+
+
+def encode_arrow(columns, metadata=None):
+    """Encode the same columns as an Arrow IPC stream (requires pyarrow)"""
+    arrays, names = [], []
+    for name, kind, array, categories in _column_arrays(columns):
+        if kind == 'date':
+            arrays.append(pa.array(array, type=pa.date32()))
+        elif kind == 'category':
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(array), pa.array(categories)))
+        else:
+            arrays.append(pa.array(array))
+        names.append(name)
+
+    schema_metadata = {'watertrace': json.dumps(metadata or {}, separators=(',', ':'))}
+    table = pa.Table.from_arrays(arrays, names=names, metadata=schema_metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# Binary representations the time-series endpoints can negotiate
+BINARY_ENCODERS = {COLUMNAR_MIME: encode_columnar}
+if pa is not None:
+    BINARY_ENCODERS[ARROW_MIME] = encode_arrow
@@ -0,0 +1,166 @@
+# webapp/backend/cube.py
+"""Memory-mapped district x month x variable cube built by notebook 15
+
+A cube directory holds
+
+- ``cube-<hash>.npy``: float32 array of shape (districts, months, variables)
+  in C order, so a district's whole series is one contiguous block
+- ``index.json``: the current .npy file, district codes (the shapefile's
+  OBJECTID), names and provinces in row order, the first month and the
+  variables with their units
+
+Loading maps the .npy read-only rather than reading it, so every gunicorn
+worker shares the same page-cache pages and only the pages a request
+touches are ever read. A district's series or a month's cross-section is a
+numpy view into the mapping, found with a dict lookup and a month
+subtraction. Data files are named by content hash and never rewritten:
+writing a new cube adds a file and repoints the index, so workers still
+mapping the old one are unaffected.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+INDEX_FILE = 'index.json'
+
+
+def _replace(path, write, mode='wb'):
+    """Write through a temporary file and rename it over ``path``"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def write_cube(directory, codes, districts, provinces, variables):
+    """Write a cube from per-variable monthly series (districts x dates)
+
+    ``variables`` maps name -> (dates, values, unit). Every date is placed
+    in its calendar month on one shared axis from the earliest month to the
+    latest; dates falling in the same month are averaged and months a
+    variable does not cover are NaN. Rows are sorted by code. Returns the
+    index.
+    """
+    order = np.argsort(np.asarray(codes, dtype=np.int64), kind='stable')
+    months = {name: np.asarray(dates, dtype='datetime64[M]') for name, (dates, _, _) in variables.items()}
+    first = min(m.min() for m in months.values())
+    n_months = int((max(m.max() for m in months.values()) - first).astype(np.int64)) + 1
+
+    cube = np.full((len(order), n_months, len(variables)), np.nan, dtype=np.float32)
+    for k, (name, (_, values, _)) in enumerate(variables.items()):
+        values = np.asarray(values, dtype=np.float64)[order]
+        offsets = (months[name] - first).astype(np.int64)
+        total = np.zeros((len(order), n_months))
+        count = np.zeros((len(order), n_months))
+        valid = ~np.isnan(values)
+        np.add.at(total.T, offsets, np.where(valid, values, 0.0).T)
+        np.add.at(count.T, offsets, valid.T)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cube[:, :, k] = total / count
+
+    index = {
+        'codes': np.asarray(codes, dtype=np.int64)[order].tolist(),
+        'districts': np.asarray(districts, dtype=str)[order].tolist(),
+        'provinces': np.asarray(provinces, dtype=str)[order].tolist(),
+        'start_month': str(first),
+        'months': n_months,
+        'variables': [{'name': name, 'unit': unit} for name, (_, _, unit) in variables.items()],
+    }
+    digest = hashlib.sha256(cube.tobytes())
+    digest.update(json.dumps(index, sort_keys=True).encode('utf-8'))
+    index['data_file'] = f"cube-{digest.hexdigest()[:12]}.npy"
+
+    os.makedirs(directory, exist_ok=True)
+    _replace(os.path.join(directory, index['data_file']), lambda f: np.save(f, cube))
+    _replace(os.path.join(directory, INDEX_FILE), lambda f: json.dump(index, f, indent=2), mode='w')
+    # Running workers keep their mapping of a removed file until they reload
+    for name in os.listdir(directory):
+        if name.startswith('cube-') and name.endswith('.npy') and name != index['data_file']:
+            os.remove(os.path.join(directory, name))
+    return index
+
+
+class DistrictCube:
+    """A loaded cube with district code/name -> row and month -> offset indexes"""
+
+    def __init__(self, data, index):
+        expected = (len(index['codes']), index['months'], len(index['variables']))
+        if data.shape != expected or data.dtype != np.float32:
+            raise ValueError(f"Cube data is {data.dtype} {data.shape}, index expects float32 {expected}")
+        self.data = data
+        self.codes = np.asarray(index['codes'], dtype=np.int64)
+        self.districts = np.asarray(index['districts'])
+        self.provinces = np.asarray(index['provinces'])
+        self.variables = [variable['name'] for variable in index['variables']]
+        self.units = {variable['name']: variable['unit'] for variable in index['variables']}
+        self.start = np.datetime64(index['start_month'], 'M')
+        self.data_file = index.get('data_file')
+        self.by_code = {str(code): row for row, code in enumerate(self.codes.tolist())}
+        self.by_name = {name: row for row, name in enumerate(self.districts.tolist())}
+        self.by_folded_name = {}
+        for name, row in self.by_name.items():
+            self.by_folded_name.setdefault(name.casefold(), row)
+
+    @classmethod
+    def load(cls, index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        data = np.load(os.path.join(os.path.dirname(index_path), index['data_file']), mmap_mode='r')
+        return cls(data, index)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def n_months(self):
+        return self.data.shape[1]
+
+    def row(self, key):
+        """Row of a district code or name (exact first, then ignoring case), or None"""
+        row = self.by_code.get(str(key))
+        if row is None:
+            row = self.by_name.get(key)
+        return row if row is not None else self.by_folded_name.get(str(key).casefold())
+
+    def month_offset(self, month):
+        """Offset of a month (anything numpy reads as a date), or None outside the cube"""
+        offset = int((np.datetime64(month, 'M') - self.start).astype(np.int64))
+        return offset if 0 <= offset < self.n_months else None
+
+    def month_slice(self, start=None, end=None):
+        """Offsets of the months overlapping [start, end]; ``end`` includes the whole period it names"""
+        lo = 0 if start is None else int((start.astype('datetime64[M]') - self.start).astype(np.int64))
+        hi = self.n_months
+        if end is not None:
+            unit = np.datetime_data(end.dtype)[0]
+            last_day = end + np.timedelta64(1, unit) - np.timedelta64(1, 'D')
+            hi = int((last_day.astype('datetime64[M]') - self.start).astype(np.int64)) + 1
+        lo, hi = min(max(lo, 0), self.n_months), min(max(hi, 0), self.n_months)
+        return slice(lo, max(lo, hi))
+
+    def months(self, months=slice(None)):
+        """Month labels (datetime64[M]) of an offset slice"""
+        return (self.start + np.arange(self.n_months))[months]
+
+    def series(self, row, months=slice(None)):
+        """(months, variables) view of one district"""
+        return self.data[row, months]
+
+    def cross_section(self, offset):
+        """(districts, variables) view of one month"""
+        return self.data[:, offset]
+
+    def describe(self):
+        return {
+            'districts': len(self),
+            'months': self.n_months,
+            'first_month': str(self.start),
+            'last_month': str(self.start + (self.n_months - 1)),
+            'variables': [{'name': name, 'unit': self.units[name]} for name in self.variables],
+            'dtype': 'float32',
+            'shape': list(self.data.shape),
+            'bytes': int(self.data.nbytes),
+            'data_file': self.data_file,
+        }
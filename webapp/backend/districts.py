@@ -0,0 +1,171 @@
+# webapp/backend/districts.py
+"""Precomputed per-district groundwater table built by notebook 15
+
+The table is an .npz of plain arrays, one row per district (sorted by
+name), so loading it needs neither geopandas nor pickle:
+
+- ``district``, ``province``, ``lon``, ``lat`` (area-weighted centroid)
+- ``grace_dates`` / ``grace_anomaly_cm``: monthly GRACE LWE anomaly (districts x months)
+- ``gldas_dates`` / ``gldas_soil_moisture``: monthly GLDAS 100-200 cm soil moisture (kg/m²)
+- ``latest_change_cm``, ``latest_date``: the value the map shows for each district
+"""
+import json
+
+import numpy as np
+
+from timeseries import date_slice
+
+TABLE_ARRAYS = ('district', 'province', 'lon', 'lat', 'grace_dates', 'grace_anomaly_cm',
+                'gldas_dates', 'gldas_soil_moisture', 'latest_change_cm', 'latest_date')
+
+
+def water_status(change):
+    """Map category for a groundwater change in cm"""
+    if change < -10:
+        return "Critical"
+    if change < -5:
+        return "Warning"
+    if change < 0:
+        return "Moderate"
+    return "Improving"
+
+
+def latest_change(grace_anomaly_cm, gldas_dates, gldas_soil_moisture):
+    """Latest groundwater change per district, chained GRACE -> GLDAS like the combined timeline
+
+    Each district starts from its last GRACE anomaly (2017) and adds its
+    GLDAS soil-moisture anomaly against the 2018 mean, at the same rough
+    10 kg/m² ≈ 1 cm conversion the combined timeline uses. Returns
+    ``(change_cm, date)`` of the last month with data.
+    """
+    grace = np.asarray(grace_anomaly_cm, dtype=np.float64)
+    gldas = np.asarray(gldas_soil_moisture, dtype=np.float64)
+    years = np.asarray(gldas_dates, dtype='datetime64[Y]').astype(int) + 1970
+
+    with np.errstate(invalid='ignore'):
+        baseline = np.nanmean(np.where(years == 2018, gldas, np.nan), axis=1) if gldas.size else np.array([])
+    grace_end = np.array([row[~np.isnan(row)][-1] if (~np.isnan(row)).any() else 0.0 for row in grace])
+
+    # Last month where most districts have a GLDAS value
+    has_data = (~np.isnan(gldas)).mean(axis=0) >= 0.5 if gldas.size else np.array([], dtype=bool)
+    if not has_data.any():
+        return grace_end, None
+    last = int(np.flatnonzero(has_data)[-1])
+    change = grace_end + (gldas[:, last] - baseline) / 10
+    return change, np.asarray(gldas_dates)[last]
+
+
+def save_district_table(path, district, province, lon, lat, grace_dates, grace_anomaly_cm,
+                        gldas_dates, gldas_soil_moisture):
+    """Write the table, sorted by district name, with the latest values precomputed"""
+    order = np.argsort(np.asarray(district, dtype=str), kind='stable')
+    grace_anomaly_cm = np.asarray(grace_anomaly_cm, dtype=np.float32)[order]
+    gldas_soil_moisture = np.asarray(gldas_soil_moisture, dtype=np.float32)[order]
+    change, date = latest_change(grace_anomaly_cm, gldas_dates, gldas_soil_moisture)
+
+    np.savez_compressed(
+        path,
+        district=np.asarray(district, dtype=str)[order],
+        province=np.asarray(province, dtype=str)[order],
+        lon=np.asarray(lon, dtype=np.float64)[order],
+        lat=np.asarray(lat, dtype=np.float64)[order],
+        grace_dates=np.asarray(grace_dates, dtype='datetime64[D]'),
+        grace_anomaly_cm=grace_anomaly_cm,
+        gldas_dates=np.asarray(gldas_dates, dtype='datetime64[D]'),
+        gldas_soil_moisture=gldas_soil_moisture,
+        latest_change_cm=change.astype(np.float32),
+        latest_date=np.asarray(date if date is not None else 'NaT', dtype='datetime64[D]')
+    )
+
+
+class DistrictTable:
+    """Loaded district table with a (case-insensitive) name -> row index"""
+
+    # source -> (dates array, values array, label, unit)
+    SERIES = {
+        'grace': ('grace_dates', 'grace_anomaly_cm', 'GRACE', 'cm'),
+        'gldas': ('gldas_dates', 'gldas_soil_moisture', 'GLDAS', 'kg/m²')
+    }
+
+    def __init__(self, arrays, boundaries=None):
+        for name in TABLE_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.index = {name: row for row, name in enumerate(self.district.tolist())}
+        self.folded_index = {}
+        for name, row in self.index.items():
+            self.folded_index.setdefault(name.casefold(), row)
+        self.boundaries = boundaries or {}
+
+    @classmethod
+    def load(cls, path, boundaries_path=None):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in TABLE_ARRAYS}
+        boundaries = None
+        if boundaries_path is not None:
+            with open(boundaries_path) as f:
+                collection = json.load(f)
+            boundaries = {feature['properties']['district']: feature['geometry'] for feature in collection['features']}
+        return cls(arrays, boundaries)
+
+    def __len__(self):
+        return len(self.district)
+
+    def row(self, district):
+        """Row number of a district (exact name first, then ignoring case), or None"""
+        row = self.index.get(district)
+        return row if row is not None else self.folded_index.get(district.casefold())
+
+    def series_blocks(self, sources=('grace', 'gldas'), start=None, end=None, chunk_rows=8192):
+        """Long-format column blocks (district, province, source, date, value, unit)
+
+        Yields a few districts' months at a time, so exporting every series
+        never materializes the whole long table.
+        """
+        for source in sources:
+            dates_name, values_name, label, unit = self.SERIES[source]
+            all_dates = getattr(self, dates_name)
+            months = date_slice(all_dates.astype('datetime64[ns]'), start, end)
+            dates, values = all_dates[months], getattr(self, values_name)
+            if not len(dates):
+                continue
+            step = max(1, chunk_rows // len(dates))
+            for first in range(0, len(self), step):
+                rows = slice(first, min(first + step, len(self)))
+                count = rows.stop - rows.start
+                yield {
+                    'district': np.repeat(self.district[rows], len(dates)),
+                    'province': np.repeat(self.province[rows], len(dates)),
+                    'source': label,
+                    'date': np.tile(dates, count),
+                    'value': values[rows, months].ravel(),
+                    'unit': unit
+                }
+
+    def features(self, geometry='centroid'):
+        """GeoJSON features with the latest change per district
+
+        ``geometry='polygon'`` uses the simplified boundaries when they were
+        loaded and falls back to the centroid point otherwise.
+        """
+        as_of = str(self.latest_date) if not np.isnat(self.latest_date) else None
+        features = []
+        for row, (district, province) in enumerate(zip(self.district.tolist(), self.province.tolist())):
+            change = float(self.latest_change_cm[row])
+            # Districts the grids do not cover have no value
+            change = None if np.isnan(change) else round(change, 2)
+            shape = self.boundaries.get(district) if geometry == 'polygon' else None
+            features.append({
+                "type": "Feature",
+                "properties": {
+                    "district": district,
+                    "province": province,
+                    "groundwater_change": change,
+                    "status": water_status(change) if change is not None else "No data",
+                    "as_of": as_of
+                },
+                "geometry": shape or {
+                    "type": "Point",
+                    "coordinates": [round(float(self.lon[row]), 5), round(float(self.lat[row]), 5)]
+                }
+            })
+        return features
@@ -0,0 +1,250 @@
+# webapp/backend/features.py
+"""Feature engineering shared by notebook 13 and the API
+
+``training_frame`` builds the training features of a monthly series, one
+row per month:
+
+- ``year``, ``month``
+- ``gw_lag_1/2/3/6/12``: the value 1..12 rows earlier
+- ``gw_ma_3/6/12``: rolling mean ending at (and including) the row
+- ``linear_trend``: the row number
+- ``seasonal_avg``: the mean of every row of that calendar month
+- ``seasonal_anomaly``: the value minus its seasonal mean
+
+``FeaturePipeline`` holds what producing more rows needs: the last 12
+values of one or many series in a ring buffer, per-month sums and counts
+for the seasonal means, the row count and the last month. ``update``
+appends observed months in O(window) each and returns their training
+rows, with the seasonal means of the whole series so far, as
+``training_frame`` would give them. Rows returned before keep the means
+of their time; ``reseason`` brings them up to date. ``next_features`` gives the inputs for predicting the month after
+the last one, where the value itself is unknown: the rolling means cover
+the months before it and the anomaly is the latest month's; ``advance``
+appends a predicted month (forecast.py). Fitted once, the state is saved
+next to a model (``to_dict``, model_registry.py) and is a few hundred
+numbers per series.
+"""
+import numpy as np
+import pandas as pd
+
+LAGS = (1, 2, 3, 6, 12)
+WINDOWS = (3, 6, 12)
+BUFFER_MONTHS = max(LAGS + WINDOWS)
+FEATURE_COLUMNS = (['year', 'month'] + [f'gw_lag_{lag}' for lag in LAGS] +
+                   [f'gw_ma_{window}' for window in WINDOWS] +
+                   ['linear_trend', 'seasonal_avg', 'seasonal_anomaly'])
+
+
+def training_frame(dates, values):
+    """Training features of one date-sorted series (NaN where the history is too short)"""
+    frame = pd.DataFrame({'date': pd.to_datetime(pd.Series(dates)).reset_index(drop=True),
+                          'groundwater_cm': pd.Series(values, dtype=float).reset_index(drop=True)})
+    frame['year'] = frame['date'].dt.year
+    frame['month'] = frame['date'].dt.month
+    for lag in LAGS:
+        frame[f'gw_lag_{lag}'] = frame['groundwater_cm'].shift(lag)
+    for window in WINDOWS:
+        frame[f'gw_ma_{window}'] = frame['groundwater_cm'].rolling(window=window).mean()
+    frame['linear_trend'] = range(len(frame))
+    frame['seasonal_avg'] = frame.groupby('month')['groundwater_cm'].transform('mean')
+    frame['seasonal_anomaly'] = frame['groundwater_cm'] - frame['seasonal_avg']
+    return frame
+
+
+class FeaturePipeline:
+    """Feature state of one or many monthly series (one row each)"""
+
+    def __init__(self, ring, head, seasonal_sum, seasonal_count, trend, month):
+        self.ring = ring                      # (series, 12) last values; slot ``head`` is the oldest
+        self.head = head
+        self.seasonal_sum = seasonal_sum      # (series, 12) per calendar month, January first
+        self.seasonal_count = seasonal_count
+        self.trend = trend                    # (series,) linear_trend of the next row
+        self.month = month                    # datetime64[M] of the last row
+
+    @classmethod
+    def fit(cls, values, months):
+        """State after ``values`` (one series, or series x months NaN-padded at the front)
+
+        ``months`` is the date (any datetime64 unit) of each column.
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        months = np.asarray(months).astype('datetime64[M]')
+        ring = np.full((len(values), BUFFER_MONTHS), np.nan)
+        recent = values[:, -BUFFER_MONTHS:]
+        ring[:, BUFFER_MONTHS - recent.shape[1]:] = recent
+
+        observed = ~np.isnan(values)
+        month_numbers = months.astype(int) % 12
+        seasonal_sum = np.zeros((len(values), 12))
+        seasonal_count = np.zeros((len(values), 12))
+        for month in range(12):
+            columns = month_numbers == month
+            seasonal_sum[:, month] = np.nansum(values[:, columns], axis=1)
+            seasonal_count[:, month] = observed[:, columns].sum(axis=1)
+        return cls(ring, 0, seasonal_sum, seasonal_count, observed.sum(axis=1).astype(np.float64), months[-1])
+
+    def __len__(self):
+        return len(self.ring)
+
+    def copy(self):
+        return FeaturePipeline(self.ring.copy(), self.head, self.seasonal_sum.copy(), self.seasonal_count.copy(),
+                               self.trend.copy(), self.month)
+
+    def lag(self, lag):
+        return self.ring[:, (self.head - lag) % BUFFER_MONTHS]
+
+    def window_mean(self, window, current=None):
+        """Mean of the last ``window`` values, or of ``current`` and the ``window - 1`` before it"""
+        if current is None:
+            return np.mean([self.lag(lag) for lag in range(1, window + 1)], axis=0)
+        return (current + np.sum([self.lag(lag) for lag in range(1, window)], axis=0)) / window
+
+    def seasonal_avg(self, month_index):
+        counts = self.seasonal_count[:, month_index]
+        return np.divide(self.seasonal_sum[:, month_index], counts, out=np.full(len(self), np.nan),
+                         where=counts > 0)
+
+    def _calendar(self, month):
+        month_index = int(month.astype(int) % 12)
+        year = month.astype('datetime64[Y]').astype(int) + 1970
+        return np.full(len(self), year, dtype=np.float64), np.full(len(self), month_index + 1.0), month_index
+
+    def next_features(self):
+        """Feature name -> column for predicting the month after the last row"""
+        month = self.month + 1
+        year, month_number, month_index = self._calendar(month)
+        features = {'year': year, 'month': month_number}
+        for lag in LAGS:
+            features[f'gw_lag_{lag}'] = self.lag(lag)
+        for window in WINDOWS:
+            # The month itself is unknown, so the window ends the month before
+            features[f'gw_ma_{window}'] = self.window_mean(window)
+        features['linear_trend'] = self.trend.copy()
+        features['seasonal_avg'] = self.seasonal_avg(month_index)
+        # Likewise the latest month's anomaly stands in for this month's
+        features['seasonal_anomaly'] = self.lag(1) - self.seasonal_avg(int(self.month.astype(int) % 12))
+        return features
+
+    def features(self, names, overrides=None):
+        """(series, features) matrix in ``names`` order for the next month
+
+        ``overrides`` maps feature names to values used instead; ``month``
+        and ``year`` move the prediction to another calendar month, which
+        also changes ``seasonal_avg``.
+        """
+        features = self.next_features()
+        overrides = overrides or {}
+        if 'month' in overrides or 'year' in overrides:
+            if not 1 <= overrides.get('month', 1) <= 12:
+                raise ValueError('month must be between 1 and 12')
+            month = np.datetime64(f"{int(overrides.get('year', features['year'][0])):04d}-"
+                                  f"{int(overrides.get('month', features['month'][0])):02d}", 'M')
+            features['seasonal_avg'] = self.seasonal_avg(int(month.astype(int) % 12))
+        for name, value in overrides.items():
+            if name in features:
+                features[name] = np.broadcast_to(np.asarray(value, dtype=np.float64), (len(self),))
+        unknown = [name for name in names if name not in features]
+        if unknown:
+            raise ValueError(f"Unknown features {unknown}")
+        return np.column_stack([features[name] for name in names])
+
+    def feature_rows(self, names, given, months=None, series=0):
+        """``features`` of one series for many rows of overrides at once
+
+        ``given`` is (rows, features) in ``names`` order, NaN where the next
+        month's feature is wanted. ``months`` (1-12 per row) sets each
+        row's ``seasonal_avg`` as a ``month`` override does.
+        """
+        features = self.next_features()
+        unknown = [name for name in names if name not in features]
+        if unknown:
+            raise ValueError(f"Unknown features {unknown}")
+        given = np.asarray(given, dtype=np.float64)
+        rows = np.tile([features[name][series] for name in names], (len(given), 1))
+        if months is not None and 'seasonal_avg' in names:
+            month_index = np.asarray(months).astype(int) - 1
+            counts = self.seasonal_count[series, month_index]
+            rows[:, names.index('seasonal_avg')] = np.divide(
+                self.seasonal_sum[series, month_index], counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        return np.where(np.isnan(given), rows, given)
+
+    def _push(self, values):
+        self.ring[:, self.head] = values
+        self.head = (self.head + 1) % BUFFER_MONTHS
+        self.trend = self.trend + 1
+        self.month = self.month + 1
+
+    def advance(self, values):
+        """Append a predicted month: lags and trend move, the seasonal means do not"""
+        self._push(np.asarray(values, dtype=np.float64))
+
+    def update(self, values, months=None):
+        """Append observed months; returns their training rows (series, months, features)
+
+        ``values`` is (series, new months), or (new months,) for one
+        series; ``months`` defaults to the months after the last row. Each
+        month costs O(window): the lags and rolling means come from the
+        ring buffer and the seasonal mean from its running sum, which takes
+        in every new month first, so each row's seasonal mean covers the
+        whole series including the months after it.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(len(self), -1)
+        months = (self.month + 1 + np.arange(values.shape[1]) if months is None
+                  else np.asarray(months).astype('datetime64[M]'))
+        for step, month in enumerate(months):
+            current = values[:, step]
+            month_index = self._calendar(month)[2]
+            observed = ~np.isnan(current)
+            self.seasonal_sum[observed, month_index] += current[observed]
+            self.seasonal_count[observed, month_index] += 1
+
+        rows = np.empty((len(self), values.shape[1], len(FEATURE_COLUMNS)))
+        for step, month in enumerate(months):
+            current = values[:, step]
+            year, month_number, month_index = self._calendar(month)
+            seasonal_avg = self.seasonal_avg(month_index)
+            features = {'year': year, 'month': month_number, 'linear_trend': self.trend,
+                        'seasonal_avg': seasonal_avg, 'seasonal_anomaly': current - seasonal_avg}
+            for lag in LAGS:
+                features[f'gw_lag_{lag}'] = self.lag(lag)
+            for window in WINDOWS:
+                features[f'gw_ma_{window}'] = self.window_mean(window, current)
+            rows[:, step] = np.column_stack([features[name] for name in FEATURE_COLUMNS])
+            self._push(current)
+            self.month = month
+        return rows
+
+    def reseason(self, rows, names, series=0):
+        """Training rows of one series with the seasonal columns recomputed from the current means
+
+        ``rows`` is (rows, features) in ``names`` order, e.g. returned by an
+        earlier ``update``; the value is recovered as anomaly plus mean.
+        """
+        rows = np.array(rows, dtype=np.float64)
+        average, anomaly = names.index('seasonal_avg'), names.index('seasonal_anomaly')
+        month_index = rows[:, names.index('month')].astype(int) - 1
+        values = rows[:, anomaly] + rows[:, average]
+        rows[:, average] = self.seasonal_sum[series, month_index] / self.seasonal_count[series, month_index]
+        rows[:, anomaly] = values - rows[:, average]
+        return rows
+
+    def to_dict(self):
+        """JSON-ready state"""
+        ordered = np.roll(self.ring, -self.head, axis=1)  # Oldest first
+        return {
+            'recent': np.where(np.isnan(ordered), None, ordered).tolist(),
+            'seasonal_sum': self.seasonal_sum.tolist(),
+            'seasonal_count': self.seasonal_count.tolist(),
+            'trend': self.trend.tolist(),
+            'month': str(self.month),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(np.array(data['recent'], dtype=np.float64), 0, np.array(data['seasonal_sum']),
+                   np.array(data['seasonal_count']), np.array(data['trend'], dtype=np.float64),
+                   np.datetime64(data['month'], 'M'))
+
+    def describe(self):
+        return {'series': len(self), 'last_month': str(self.month)}
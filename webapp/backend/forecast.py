@@ -0,0 +1,55 @@
+# webapp/backend/forecast.py
+"""Recursive multi-step forecasts for many series at once
+
+The models of notebook 13 predict a month's groundwater from the previous
+months (``gw_lag_1..12``, ``gw_ma_3/6/12``), so a forecast path has to feed
+each prediction back in as the newest observation. A features.FeaturePipeline
+keeps the last 12 months of every series in a ring buffer: a step reads
+the lags at fixed offsets from the head and the rolling means from the
+last few slots, instead of re-running pandas ``shift``/``rolling`` over
+the whole history. Series are rows of one pipeline, so every step is one
+model call for all the scenarios or districts being forecast.
+
+Features match notebook 13 as in FeaturePipeline.next_features: the two
+that use the month's own value in training (the rolling means and
+``seasonal_anomaly``) cover the months before it, and the seasonal means
+stay those of the observed history.
+"""
+import os
+
+import numpy as np
+
+from features import BUFFER_MONTHS
+
+MAX_HORIZON = int(os.environ.get('WATERTRACE_FORECAST_MAX_HORIZON', '120'))
+
+
+def month_axis(end, length):
+    """``length`` consecutive months (datetime64[M]) ending with ``end``"""
+    end = np.datetime64(end, 'M')
+    return end - np.arange(length - 1, -1, -1)
+
+
+def check_history(pipeline):
+    """Raise ValueError unless every series has its last 12 months observed"""
+    if np.isnan(pipeline.ring).any():
+        raise ValueError(f"Every series needs its last {BUFFER_MONTHS} months observed")
+
+
+def recursive_forecast(model, pipeline, horizon):
+    """``(months, values)``: ``horizon`` months of every series in ``pipeline``
+
+    ``model`` is a ServedModel; each step predicts every series in one call
+    and appends the predictions as the next month. ``pipeline`` itself is
+    left as it was.
+    """
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON}")
+    check_history(pipeline)
+    state = pipeline.copy()
+    forecast = np.empty((len(state), horizon))
+    months = state.month + 1 + np.arange(horizon)
+    for step in range(horizon):
+        forecast[:, step] = model.predict(state.features(model.feature_names))
+        state.advance(forecast[:, step])
+    return months, forecast
@@ -0,0 +1,20 @@
+# webapp/backend/gunicorn.conf.py
+import gc
+import os
+
+# With WATERTRACE_STARTUP=eager, preloading imports app.py once in the master
+# so every forked worker shares the loaded modules, model and frames
+preload_app = os.environ.get('WATERTRACE_PRELOAD', '0') == '1'
+
+
+def pre_fork(server, worker):
+    # Keep the collector from touching (and so copying) objects loaded before the fork
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Workers of the fast-start entry point begin warming up before their first request
+    if getattr(server.app, 'app_uri', '').startswith('lazy_app'):
+        from lazy_app import application
+        if application.mode == 'background':
+            application.warm_up()
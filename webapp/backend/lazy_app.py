@@ -0,0 +1,111 @@
+# webapp/backend/lazy_app.py
+"""Fast-starting WSGI entry point for the WaterTrace API
+
+Importing app.py pulls in Flask, pandas, numpy and scikit-learn and loads
+the model and CSVs, which is where the multi-second cold start goes. This
+module only uses the standard library, answers ``/api/health`` at once and
+defers ``import app`` according to ``WATERTRACE_STARTUP``:
+
+- ``background`` (default): start a warm-up thread on the first request
+  (or from gunicorn's ``post_fork`` hook, see gunicorn.conf.py)
+- ``lazy``: import app.py on the first request that needs it
+- ``eager``: import app.py right here, which is what ``gunicorn --preload``
+  wants so forked workers share the loaded pages
+
+Requests other than the health check wait for the warm-up to finish. A
+failed warm-up is retried by the next request; until one succeeds the
+health check answers 503.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from startup import startup_phases
+
+STARTUP_MODE = os.environ.get('WATERTRACE_STARTUP', 'background')
+
+
+class LazyApplication:
+    """WSGI callable that forwards to app.app once it has been imported"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self._app = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = os.getpid()
+
+    @property
+    def ready(self):
+        return self._app is not None
+
+    def _load(self):
+        try:
+            with startup_phases.phase('import app'):
+                import app as backend
+            self._app = backend.app
+            self._error = None
+        except Exception as e:
+            self._error = e
+            print(f"⚠️ Warm-up failed: {e}")
+            with self._lock:
+                # Let the next warm_up try again
+                self._thread = None
+
+    def warm_up(self, wait=False):
+        """Start loading app.py in a background thread (once per process, unless it fails)"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked after the thread started: the thread did not survive the fork
+                self._thread = None
+                self._pid = os.getpid()
+            if self._app is None and self._thread is None:
+                self._thread = threading.Thread(target=self._load, name='watertrace-warmup', daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if wait and thread is not None:
+            thread.join()
+
+    def load_now(self):
+        """Import app.py in the calling thread"""
+        self.warm_up(wait=True)
+
+    def _health(self, start_response):
+        body = json.dumps({
+            'status': 'healthy' if self._error is None else 'degraded',
+            'timestamp': datetime.now().isoformat(),
+            'models_loaded': False,
+            'data_loaded': False,
+            'warming_up': self._thread is not None and self._thread.is_alive(),
+            'warmup_error': str(self._error) if self._error else None,
+            'startup_mode': self.mode,
+            'startup': startup_phases.report()
+        }).encode('utf-8')
+        status = '200 OK' if self._error is None else '503 Service Unavailable'
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+
+    def __call__(self, environ, start_response):
+        if self._app is not None:
+            return self._app(environ, start_response)
+
+        if self.mode == 'background':
+            self.warm_up()
+        if environ.get('PATH_INFO') == '/api/health':
+            return self._health(start_response)
+
+        self.warm_up(wait=True)
+        if self._app is None:
+            body = json.dumps({'error': f"API failed to start: {self._error}"}).encode('utf-8')
+            start_response('503 Service Unavailable', [('Content-Type', 'application/json'),
+                                                       ('Content-Length', str(len(body)))])
+            return [body]
+        return self._app(environ, start_response)
+
+
+application = LazyApplication(STARTUP_MODE)
+
+if STARTUP_MODE == 'eager':
+    application.load_now()
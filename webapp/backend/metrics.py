@@ -0,0 +1,222 @@
+# webapp/backend/metrics.py
+"""Request and model-inference metrics in the Prometheus text format
+
+Counts live in this process only: under gunicorn/uvicorn with several
+workers each one keeps its own numbers, and the ``pid`` in
+``watertrace_process_info`` tells scrapes of different workers apart.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_MIME = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# WSGI environ key the Flask app stores the matched route pattern under
+ROUTE_KEY = 'watertrace.route'
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set, kept as per-bucket (non-cumulative) counts"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One slot per bucket, one for +Inf, then the running sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                le = f'le="{_format_number(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(float(values[-1]))}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Metrics:
+    """The API's request, payload-size, error and inference metrics"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = Counter('watertrace_http_requests_total',
+                                'HTTP requests by route, method and status code',
+                                ('route', 'method', 'status'))
+        self.latency = Histogram('watertrace_http_request_duration_seconds',
+                                 'Time from receiving a request to sending the last body byte',
+                                 ('route', 'method'))
+        self.response_size = Histogram('watertrace_http_response_size_bytes',
+                                       'Response body size as sent (after compression)',
+                                       ('route',), buckets=SIZE_BUCKETS)
+        self.errors = Counter('watertrace_http_errors_total',
+                              'Responses with a 4xx or 5xx status by route and status code',
+                              ('route', 'status'))
+        self.exceptions = Counter('watertrace_http_exceptions_total',
+                                  'Unhandled exceptions raised by a view, by route and type',
+                                  ('route', 'exception'))
+        self.inference = Histogram('watertrace_model_inference_seconds',
+                                   'Time spent in scaler.transform plus model.predict',
+                                   ('endpoint',))
+        self.inference_rows = Counter('watertrace_model_inference_rows_total',
+                                      'Feature rows sent through the model',
+                                      ('endpoint',))
+        self.prediction_cache = Counter('watertrace_prediction_cache_events_total',
+                                        'Single-prediction memo lookups (hit, miss) and evictions',
+                                        ('event',))
+        self.collectors = [self.requests, self.latency, self.response_size, self.errors,
+                           self.exceptions, self.inference, self.inference_rows, self.prediction_cache]
+
+    def observe_request(self, route, method, status, seconds, size):
+        """Record one finished request"""
+        status = str(status)
+        self.requests.inc((route, method, status))
+        self.latency.observe((route, method), seconds)
+        self.response_size.observe((route,), size)
+        if status[0] in '45':
+            self.errors.inc((route, status))
+
+    @contextmanager
+    def time_inference(self, endpoint, rows=1):
+        """Time a transform/predict block for ``endpoint``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inference.observe((endpoint,), time.perf_counter() - start)
+            self.inference_rows.inc((endpoint,), rows)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP watertrace_process_info Worker process the numbers below come from',
+            '# TYPE watertrace_process_info gauge',
+            f'watertrace_process_info{{pid="{os.getpid()}"}} 1',
+            '# HELP watertrace_process_start_time_seconds Unix time the metrics started counting',
+            '# TYPE watertrace_process_start_time_seconds gauge',
+            f'watertrace_process_start_time_seconds {self.started_at:.3f}',
+        ]
+        for collector in self.collectors:
+            lines.append(f"# HELP {collector.name} {collector.documentation}")
+            lines.append(f"# TYPE {collector.name} {collector.kind}")
+            lines.extend(collector.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class _MeteredBody:
+    """Response iterable that records the request once its body has been sent"""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._on_close = on_close
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self._body:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._on_close(self.size)
+
+
+class MetricsMiddleware:
+    """WSGI middleware timing every request through the last byte of its body
+
+    Streamed responses (e.g. /api/predict/batch) are measured until the
+    server closes them. The route label is the pattern the app stored under
+    ``ROUTE_KEY``, so ``/api/x/<id>`` stays one series however it is called.
+    """
+
+    def __init__(self, wsgi_app, registry):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        state = {'status': '500'}
+
+        def metered_start_response(status, headers, exc_info=None):
+            state['status'] = status[:3]
+            return start_response(status, headers, exc_info)
+
+        def finish(size):
+            self.registry.observe_request(environ.get(ROUTE_KEY, UNMATCHED_ROUTE), environ.get('REQUEST_METHOD', ''),
+                                          state['status'], time.perf_counter() - start, size)
+
+        try:
+            body = self.wsgi_app(environ, metered_start_response)
+        except Exception:
+            finish(0)
+            raise
+        return _MeteredBody(body, finish)
+
+
+# One registry per process, shared by app.py and asgi.py
+metrics = Metrics()
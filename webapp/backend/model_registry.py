@@ -0,0 +1,338 @@
+# webapp/backend/model_registry.py
+"""Registry of every trained model, stored as memory-mappable arrays
+
+notebooks/13_machine_learning_pipeline.py saves each model it trains with
+``save_model``:
+
+    models/
+      registry.json                  default model and each model's current version
+      <name>/<version>/meta.json     algorithm, features, metrics, training info
+      <name>/<version>/features.json feature state at the end of training (features.py)
+      <name>/<version>/online.json   incremental update state (online.py)
+      <name>/<version>/*.npy         the model (and its scaler) as flat arrays
+      <name>/<version>/model.joblib  the fitted estimator (and scaler.joblib), for notebooks
+
+Unpickling a scikit-learn forest copies every tree's node arrays into
+memory the process owns, even with ``joblib.load(mmap_mode='r')``, so
+each gunicorn worker would hold its own copy. The API serves from the flat
+arrays instead, mapped read-only, so all workers share one physical copy
+in the page cache. Tree ensembles (random forests, extra trees, gradient
+boosting, single trees) become one concatenated node table walked a level
+at a time for every row and tree together; linear models become
+``coef``/``intercept``; a StandardScaler becomes ``mean``/``scale``.
+Anything else is served from its joblib file.
+
+Versions are content hashes and a version's directory is never rewritten,
+so workers still mapping an old version are unaffected by a new save.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import FeaturePipeline
+
+REGISTRY_FILE = 'registry.json'
+LEGACY_FEATURES = ['month', 'year', 'linear_trend']
+PREDICT_CHUNK_ROWS = 4096
+
+
+def _tree_tables(trees):
+    """One node table for many fitted trees; leaves point at themselves
+
+    Returns the arrays (``children``, ``feature``, ``threshold``, ``value``,
+    ``roots``) and the deepest tree's depth, which is how many steps a walk
+    from the roots needs. ``children`` interleaves left and right, so a step
+    is one gather at ``2 * node + went_right``.
+    """
+    tables = {name: [] for name in ('children', 'feature', 'threshold', 'value')}
+    roots, offset, depth = [], 0, 0
+    for tree in trees:
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        left = np.where(leaf, nodes, tree.children_left)
+        right = np.where(leaf, nodes, tree.children_right)
+        tables['children'].append(np.column_stack([left, right]).ravel() + offset)
+        tables['feature'].append(np.where(leaf, 0, tree.feature))
+        tables['threshold'].append(tree.threshold)
+        tables['value'].append(tree.value[:, 0, 0])
+        roots.append(offset)
+        offset += tree.node_count
+        depth = max(depth, int(tree.max_depth))
+
+    arrays = {
+        'children': np.concatenate(tables['children']).astype(np.int32),
+        'feature': np.concatenate(tables['feature']).astype(np.int32),
+        'threshold': np.concatenate(tables['threshold']).astype(np.float64),
+        'value': np.concatenate(tables['value']).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+    }
+    return arrays, depth
+
+
+def export_model(model):
+    """``(format, arrays, params)`` for a fitted regressor; format 'estimator' when unsupported"""
+    trees = getattr(model, 'estimators_', None)
+    if hasattr(model, 'tree_'):
+        trees = [model]
+    if trees is not None and getattr(model, 'n_outputs_', 1) == 1:
+        trees = list(np.ravel(trees))
+        if all(hasattr(tree, 'tree_') for tree in trees):
+            arrays, depth = _tree_tables([tree.tree_ for tree in trees])
+            if hasattr(model, 'learning_rate') and hasattr(model, 'init_'):
+                # Gradient boosting: init prediction plus the shrunk sum of every stage
+                if model.init_ == 'zero':
+                    init = 0.0
+                elif hasattr(model.init_, 'constant_'):
+                    init = float(np.ravel(model.init_.constant_)[0])
+                else:
+                    return 'estimator', {}, {}
+                return 'boosting', arrays, {'depth': depth, 'learning_rate': float(model.learning_rate),
+                                            'init': init}
+            return 'forest', arrays, {'depth': depth}
+
+    coef, intercept = getattr(model, 'coef_', None), getattr(model, 'intercept_', None)
+    if coef is not None and intercept is not None and np.size(coef) == np.shape(coef)[-1]:
+        return 'linear', {'coef': np.ravel(coef).astype(np.float64)}, {'intercept': float(np.ravel(intercept)[0])}
+    return 'estimator', {}, {}
+
+
+def export_scaler(scaler):
+    """Arrays of a StandardScaler, or None when the scaler needs its joblib file"""
+    if scaler is None or type(scaler).__name__ != 'StandardScaler':
+        return None
+    n_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    return {'scaler_mean': np.asarray(mean, dtype=np.float64), 'scaler_scale': np.asarray(scale, dtype=np.float64)}
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_registry(registry_dir):
+    path = os.path.join(registry_dir, REGISTRY_FILE)
+    if not os.path.exists(path):
+        return {'default': None, 'models': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_model(registry_dir, name, model, scaler=None, feature_names=None, metrics=None, info=None, pipeline=None,
+               online=None, default=False):
+    """Save a fitted model (and the scaler its inputs go through) as a new version
+
+    ``metrics`` and ``info`` (training period, rows, display name, ...) are
+    stored in meta.json as given. The first model saved, or any saved with
+    ``default=True``, becomes the registry's default. ``pipeline`` is the
+    features.FeaturePipeline after the training data, which the API
+    builds prediction inputs from; ``online`` the state online.py updates
+    the model with. Returns the meta.
+    """
+    model_format, arrays, params = export_model(model)
+    scaler_arrays = export_scaler(scaler)
+    arrays = dict(arrays, **(scaler_arrays or {}))
+    model_bytes = io.BytesIO()
+    joblib.dump(model, model_bytes)
+    if feature_names is None:
+        feature_names = getattr(scaler, 'feature_names_in_', getattr(model, 'feature_names_in_', None))
+
+    pipeline_state = None if pipeline is None else pipeline.to_dict()
+    digest = hashlib.sha256(model_bytes.getvalue())
+    for key in sorted(arrays):
+        digest.update(arrays[key].tobytes())
+    digest.update(json.dumps([pipeline_state, online], sort_keys=True).encode())
+    version = digest.hexdigest()[:12]
+    meta = {
+        'name': name,
+        'version': version,
+        'algorithm': type(model).__name__,
+        'format': model_format,
+        'params': params,
+        'feature_names': [str(feature) for feature in feature_names] if feature_names is not None else None,
+        'scaler': None if scaler is None else type(scaler).__name__,
+        'scaler_format': None if scaler is None else ('arrays' if scaler_arrays else 'estimator'),
+        'arrays': sorted(arrays),
+        'pipeline': None if pipeline is None else pipeline.describe(),
+        'online': online is not None,
+        'bytes': int(sum(array.nbytes for array in arrays.values())),
+        'metrics': metrics or {},
+        'info': info or {},
+        'saved_at': datetime.now().isoformat(),
+    }
+
+    directory = os.path.join(registry_dir, name, version)
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        os.makedirs(directory, exist_ok=True)
+        for key, array in arrays.items():
+            np.save(os.path.join(directory, f'{key}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(directory, 'model.joblib'), 'wb') as f:
+            f.write(model_bytes.getvalue())
+        if scaler is not None:
+            joblib.dump(scaler, os.path.join(directory, 'scaler.joblib'))
+        if pipeline is not None:
+            _write_json(os.path.join(directory, 'features.json'), pipeline_state)
+        if online is not None:
+            _write_json(os.path.join(directory, 'online.json'), online)
+        _write_json(os.path.join(directory, 'meta.json'), meta)
+
+    registry = read_registry(registry_dir)
+    registry['models'][name] = {'version': version, 'path': f'{name}/{version}'}
+    if default or registry.get('default') not in registry['models']:
+        registry['default'] = name
+    _write_json(os.path.join(registry_dir, REGISTRY_FILE), registry)
+
+    # Older versions go; a worker still mapping one keeps it until it reloads
+    for old in os.listdir(os.path.join(registry_dir, name)):
+        if old != version:
+            shutil.rmtree(os.path.join(registry_dir, name, old), ignore_errors=True)
+    return meta
+
+
+def load_fitted(registry_dir, name):
+    """The saved estimator, scaler, feature pipeline and online state of a model, for updating it"""
+    directory = os.path.join(registry_dir, read_registry(registry_dir)['models'][name]['path'])
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    fitted = {'meta': meta, 'model': joblib.load(os.path.join(directory, 'model.joblib')), 'scaler': None,
+              'pipeline': None, 'online': None}
+    if meta.get('scaler'):
+        fitted['scaler'] = joblib.load(os.path.join(directory, 'scaler.joblib'))
+    if meta.get('pipeline'):
+        with open(os.path.join(directory, 'features.json')) as f:
+            fitted['pipeline'] = FeaturePipeline.from_dict(json.load(f))
+    if meta.get('online'):
+        with open(os.path.join(directory, 'online.json')) as f:
+            fitted['online'] = json.load(f)
+    return fitted
+
+
+def set_default(registry_dir, name):
+    registry = read_registry(registry_dir)
+    if name not in registry['models']:
+        raise KeyError(name)
+    registry['default'] = name
+    _write_json(os.path.join(registry_dir, REGISTRY_FILE), registry)
+
+
+class ServedModel:
+    """A model ready to predict, from mapped arrays or a loaded estimator"""
+
+    def __init__(self, meta, arrays=None, estimator=None, scaler=None, pipeline=None):
+        self.meta = meta
+        self.name = meta['name']
+        self.version = meta['version']
+        self.format = meta['format']
+        self.params = meta.get('params', {})
+        self.feature_names = meta.get('feature_names') or list(LEGACY_FEATURES)
+        self.arrays = arrays or {}
+        self.estimator = estimator
+        self.scaler = scaler
+        self.pipeline = pipeline
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {key: np.load(os.path.join(directory, f'{key}.npy'), mmap_mode='r') for key in meta['arrays']}
+        estimator = scaler = None
+        if meta['format'] == 'estimator':
+            estimator = joblib.load(os.path.join(directory, 'model.joblib'), mmap_mode='r')
+        if meta.get('scaler_format') == 'estimator':
+            scaler = joblib.load(os.path.join(directory, 'scaler.joblib'), mmap_mode='r')
+        pipeline = None
+        if meta.get('pipeline'):
+            with open(os.path.join(directory, 'features.json')) as f:
+                pipeline = FeaturePipeline.from_dict(json.load(f))
+        return cls(meta, arrays, estimator, scaler, pipeline)
+
+    @classmethod
+    def from_estimator(cls, name, model, scaler=None, version=None, info=None):
+        """Serve an already loaded estimator (the single best_groundwater_model.pkl)"""
+        names = getattr(scaler, 'feature_names_in_', getattr(model, 'feature_names_in_', None))
+        meta = {
+            'name': name,
+            'version': version,
+            'algorithm': type(model).__name__,
+            'format': 'estimator',
+            'feature_names': [str(feature) for feature in names] if names is not None else None,
+            'scaler': None if scaler is None else type(scaler).__name__,
+            'scaler_format': None if scaler is None else 'estimator',
+            'metrics': {},
+            'info': info or {},
+        }
+        return cls(meta, estimator=model, scaler=scaler)
+
+    def predict(self, X):
+        """Predictions for a (rows, features) array in ``feature_names`` order"""
+        X = np.asarray(X, dtype=np.float64)
+        if 'scaler_mean' in self.arrays:
+            X = (X - self.arrays['scaler_mean']) / self.arrays['scaler_scale']
+        elif self.scaler is not None:
+            X = self.scaler.transform(pd.DataFrame(X, columns=self.feature_names))
+        if self.format == 'estimator':
+            # Estimators fitted on DataFrames warn about bare arrays
+            if hasattr(self.estimator, 'feature_names_in_'):
+                X = pd.DataFrame(X, columns=self.feature_names)
+            return np.asarray(self.estimator.predict(X), dtype=np.float64)
+        if self.format == 'linear':
+            return X @ self.arrays['coef'] + self.params['intercept']
+        return np.concatenate([self._predict_trees(X[start:start + PREDICT_CHUNK_ROWS])
+                               for start in range(0, len(X), PREDICT_CHUNK_ROWS)] or [np.empty(0)])
+
+    def _predict_trees(self, X):
+        a = self.arrays
+        # Trees compare float32 features against float64 thresholds, as scikit-learn does
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        # Flat offsets into X: np.take on 1-d arrays beats 2-d fancy indexing
+        row_offsets = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        X = X.ravel()
+        nodes = np.broadcast_to(a['roots'], (len(row_offsets), len(a['roots'])))
+        for _ in range(self.params['depth']):
+            went_right = np.take(X, row_offsets + np.take(a['feature'], nodes)) > np.take(a['threshold'], nodes)
+            nodes = np.take(a['children'], 2 * nodes + went_right)
+        values = np.take(a['value'], nodes)
+        if self.format == 'boosting':
+            return self.params['init'] + self.params['learning_rate'] * values.sum(axis=1)
+        return values.mean(axis=1)
+
+    def describe(self):
+        return dict({key: value for key, value in self.meta.items() if key != 'arrays'},
+                    shared_arrays=self.format != 'estimator')
+
+
+class ModelRegistry:
+    """Every servable model of one snapshot, by name"""
+
+    def __init__(self, models, default):
+        self.models = models
+        self.default = default
+
+    @classmethod
+    def load(cls, registry_path):
+        registry_dir = os.path.dirname(registry_path)
+        with open(registry_path) as f:
+            registry = json.load(f)
+        models = {name: ServedModel.load(os.path.join(registry_dir, entry['path']))
+                  for name, entry in registry['models'].items()}
+        return cls(models, registry.get('default') or next(iter(models), None))
+
+    def __len__(self):
+        return len(self.models)
+
+    def get(self, name=None):
+        """A model by name (the default when None); raises KeyError for unknown names"""
+        return self.models[name or self.default]
+
+    def describe(self):
+        return {'default': self.default, 'models': [model.describe() for model in self.models.values()]}
@@ -0,0 +1,188 @@
+# webapp/backend/online.py
+"""Incremental model updates from new monthly observations
+
+notebooks/17_incremental_model_update.py folds the months that arrived
+since notebook 13 ran into the registered models instead of retraining
+them on the whole history:
+
+- linear models: recursive least squares on the scaled features, which
+  gives the least squares fit of all rows seen so far. The inverse Gram
+  matrix it needs is kept in the model's online state. Rows already in it
+  keep the seasonal means of when they arrived.
+- random forests: warm start a few new trees on the rolling window of
+  recent rows (new months included) and drop as many of the oldest, so
+  the forest keeps its size and drifts towards recent behaviour.
+- gradient boosting: warm start a few more stages fitted to the window's
+  residuals. Stages only accumulate, so after ``MAX_STAGE_GROWTH`` times
+  the trained count the model asks for a retrain.
+
+Each update costs O(new rows + window), whatever the history length.
+Every new month is first predicted as the API would have predicted it
+(test, then train), and the last ``EVALUATION_MONTHS`` errors decide
+whether to keep updating or to run notebook 13 again: the model's RMSE
+must stay within ``ERROR_BUDGET`` times that of persistence (last month's
+value), and the mean error of the last ``DRIFT_MONTHS`` must not show a
+bias (drift).
+
+The state is JSON (online.json next to the model, model_registry.py).
+"""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from features import FEATURE_COLUMNS
+
+EVALUATION_MONTHS = 24
+REFRESH_MONTHS = 24          # New trees per month: this fraction of the trained count
+MAX_STAGE_GROWTH = 2.0
+ERROR_BUDGET = 1.0
+DRIFT_MONTHS = 6
+DRIFT_Z = 3.0
+MIN_EVALUATED = 6
+RIDGE = 1e-6                 # Keeps the Gram matrix of near-collinear features invertible
+
+
+def _scaled(scaler, X, feature_names):
+    X = np.asarray(X, dtype=np.float64)
+    if scaler is None:
+        return X
+    return scaler.transform(pd.DataFrame(X, columns=feature_names))
+
+
+def _frame(X, feature_names):
+    return pd.DataFrame(np.asarray(X, dtype=np.float64), columns=feature_names)
+
+
+def is_linear(model):
+    return hasattr(model, 'coef_') and np.size(model.coef_) == np.shape(model.coef_)[-1]
+
+
+def initial_state(model, scaler, X, y, feature_names):
+    """Online state of a model just fitted on every row of (X, y)"""
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    state = {
+        'rows': X[-EVALUATION_MONTHS:].tolist(),
+        'targets': y[-EVALUATION_MONTHS:].tolist(),
+        'residuals': [],
+        'persistence_residuals': [],
+        'trained_estimators': len(np.ravel(getattr(model, 'estimators_', []))),
+        'updates': 0,
+    }
+    if is_linear(model):
+        Z = np.column_stack([np.ones(len(X)), _scaled(scaler, X, feature_names)])
+        state['inverse_gram'] = np.linalg.inv(Z.T @ Z + RIDGE * np.eye(Z.shape[1])).tolist()
+    return state
+
+
+def observe(pipeline, values, months, feature_names):
+    """``(inputs, rows)`` of each new month, advancing ``pipeline``
+
+    ``inputs`` are what the API would have predicted the month from and
+    ``rows`` its training features, both in ``feature_names`` order.
+    """
+    order = [FEATURE_COLUMNS.index(name) for name in feature_names]
+    inputs, rows = [], []
+    for value, month in zip(values, np.asarray(months).astype('datetime64[M]')):
+        calendar = {'year': int(str(month)[:4]), 'month': int(str(month)[5:7])}
+        inputs.append(pipeline.features(feature_names, calendar)[0])
+        rows.append(pipeline.update([value], [month])[0, 0, order])
+    return np.array(inputs), np.array(rows)
+
+
+def rolling_errors(state):
+    """RMSE of the model and of persistence over the evaluation window"""
+    residuals = np.asarray(state['residuals'])
+    persistence = np.asarray(state['persistence_residuals'])
+    if not len(residuals):
+        return None, None
+    return float(np.sqrt(np.mean(residuals ** 2))), float(np.sqrt(np.mean(persistence ** 2)))
+
+
+def retrain_reason(model, state, new_months, error_budget=ERROR_BUDGET):
+    """Why the model needs a full retrain instead of an update, or None"""
+    if not isinstance(model, (RandomForestRegressor, GradientBoostingRegressor)) and not is_linear(model):
+        return f"{type(model).__name__} has no online update"
+    if is_linear(model) and 'inverse_gram' not in state:
+        return 'No recursive least squares state'
+    if isinstance(model, GradientBoostingRegressor):
+        stages = len(model.estimators_) + _new_trees(state, new_months)
+        if stages > MAX_STAGE_GROWTH * state['trained_estimators']:
+            return f"Boosting would grow to {stages} stages ({state['trained_estimators']} trained)"
+
+    residuals = np.asarray(state['residuals'])
+    if len(residuals) < MIN_EVALUATED:
+        return None
+    rmse, persistence = rolling_errors(state)
+    if rmse > error_budget * persistence:
+        return f"Rolling RMSE {rmse:.3f} over budget ({error_budget:g}x persistence {persistence:.3f})"
+    recent = residuals[-DRIFT_MONTHS:]
+    spread = residuals.std() / np.sqrt(len(recent))
+    if spread > 0 and abs(recent.mean()) / spread > DRIFT_Z:
+        return f"Drift: mean error {recent.mean():+.3f} over the last {len(recent)} months"
+    return None
+
+
+def _new_trees(state, new_months):
+    return max(1, int(round(state['trained_estimators'] * new_months / REFRESH_MONTHS)))
+
+
+def _recursive_least_squares(model, scaler, state, X, y, feature_names):
+    Z = np.column_stack([np.ones(len(X)), _scaled(scaler, X, feature_names)])
+    weights = np.concatenate([[float(np.ravel(model.intercept_)[0])], np.ravel(model.coef_)])
+    inverse_gram = np.array(state['inverse_gram'])
+    for z, target in zip(Z, y):
+        projected = inverse_gram @ z
+        gain = projected / (1.0 + z @ projected)
+        weights = weights + gain * (target - z @ weights)
+        inverse_gram = inverse_gram - np.outer(gain, projected)
+    model.intercept_ = weights[0]
+    model.coef_ = weights[1:].reshape(np.shape(model.coef_))
+    state['inverse_gram'] = inverse_gram.tolist()
+
+
+def _warm_start(model, state, new_months, feature_names, seed):
+    window = _frame(state['rows'], feature_names)
+    new = _new_trees(state, new_months)
+    trained = len(model.estimators_)
+    if isinstance(model, RandomForestRegressor):
+        # Fresh seed per update; the forest seeds its new trees by their position
+        model.set_params(warm_start=True, n_estimators=trained + new, random_state=seed)
+        model.fit(window, state['targets'])
+        model.estimators_ = model.estimators_[new:]
+    else:
+        model.set_params(warm_start=True, n_estimators=trained + new)
+        model.fit(window, state['targets'])
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+
+
+def update(model, scaler, state, pipeline, inputs, rows, y, feature_names, error_budget=ERROR_BUDGET, seed=0):
+    """Test, then train on new months; returns None, or why to retrain instead
+
+    ``inputs``/``rows``/``y`` come from ``observe`` on ``pipeline`` and the
+    observed values. The model (its scaler stays fixed) and ``state`` are
+    updated in place unless a retrain is due; the errors are recorded
+    either way. The window's seasonal columns are recomputed from the
+    pipeline's means, new months included, as a full rebuild would.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    lag_1 = feature_names.index('gw_lag_1')
+    if scaler is None and hasattr(model, 'feature_names_in_'):
+        predictions = model.predict(_frame(inputs, feature_names))
+    else:
+        predictions = model.predict(_scaled(scaler, inputs, feature_names))
+    state['residuals'] = (state['residuals'] + (y - predictions).tolist())[-EVALUATION_MONTHS:]
+    state['persistence_residuals'] = (state['persistence_residuals'] +
+                                      (y - inputs[:, lag_1]).tolist())[-EVALUATION_MONTHS:]
+
+    reason = retrain_reason(model, state, len(y), error_budget)
+    if reason:
+        return reason
+    window = (state['rows'] + np.asarray(rows).tolist())[-EVALUATION_MONTHS:]
+    state['rows'] = pipeline.reseason(window, feature_names).tolist()
+    state['targets'] = (state['targets'] + y.tolist())[-EVALUATION_MONTHS:]
+    if is_linear(model):
+        _recursive_least_squares(model, scaler, state, rows, y, feature_names)
+    else:
+        _warm_start(model, state, len(y), feature_names, seed)
+    state['updates'] += 1
+    return None
@@ -0,0 +1,85 @@
+# webapp/backend/prediction_cache.py
+"""Bounded LRU memo of single predictions
+
+Scenario UIs post the same (month, year, linear_trend) tuples again and
+again; a hit skips ``scaler.transform`` and ``model.predict``. Keys are the
+served model's version plus the feature vector normalized to floats, so
+``6``, ``6.0`` and ``"6"`` share an entry and a retrained model never
+answers from its predecessor's entries. The cache is also cleared whenever a snapshot is
+swapped in, so old entries do not hold on to capacity.
+
+``WATERTRACE_PREDICTION_CACHE_SIZE`` sets the number of entries (default
+4096, 0 turns the memo off). Counts are per process, like the metrics.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import metrics
+
+PREDICTION_CACHE_SIZE = int(os.environ.get('WATERTRACE_PREDICTION_CACHE_SIZE', '4096'))
+
+
+def normalize_features(values):
+    """Feature vector as a tuple of finite floats; raises ValueError otherwise"""
+    try:
+        # + 0.0 folds -0.0 into 0.0
+        features = tuple(float(value) + 0.0 for value in values)
+    except (TypeError, ValueError):
+        raise ValueError('Features must be numbers')
+    if not all(math.isfinite(value) for value in features):
+        raise ValueError('Features must be finite numbers')
+    return features
+
+
+class PredictionCache:
+    """Thread-safe LRU of (model version, features) -> prediction"""
+
+    def __init__(self, size=PREDICTION_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'clears': 0}
+
+    def get_or_compute(self, version, features, compute):
+        """``(prediction, hit)``, calling ``compute()`` on a miss
+
+        Failed computations raise and are not stored. Two threads missing
+        the same key at once both compute it; the result is the same.
+        """
+        key = (version, features)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                metrics.prediction_cache.inc(('hit',))
+                return self._entries[key], True
+            self.stats['misses'] += 1
+        metrics.prediction_cache.inc(('miss',))
+
+        value = compute()
+        if self.size > 0:
+            evicted = 0
+            with self._lock:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+                    evicted += 1
+                self.stats['evictions'] += evicted
+            if evicted:
+                metrics.prediction_cache.inc(('eviction',), evicted)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats['clears'] += 1
+
+    def describe(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries), capacity=self.size)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
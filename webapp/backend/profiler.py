@@ -0,0 +1,159 @@
+# webapp/backend/profiler.py
+"""Time and peak memory of the training pipeline's stages and tasks
+
+``TrainingProfiler.stage`` wraps a step of notebook 13 (feature creation,
+search, training, scoring, registering); training.py records the
+preparation (fold slicing and scaling), fit and score of every (model,
+fold) task inside the worker that runs it, and ``train_models`` hands
+those spans to the profiler. Every span keeps:
+
+- wall seconds, and when it started (for the timeline)
+- ``max_rss``: the process's peak resident memory so far, which also
+  counts native buffers scikit-learn allocates outside tracemalloc's view
+- ``peak_bytes``: the most Python and numpy memory allocated above what
+  was in use when the span started, with ``memory=True`` (tracemalloc,
+  which makes allocation-heavy fits several times slower, so compare
+  timings only between runs with the same setting)
+
+``summary`` totals the spans by name and ``write_trace`` saves them in the
+Chrome trace event format (open in chrome://tracing or ui.perfetto.dev):
+one track per process, so the workers' tasks show side by side, with
+each process's max RSS as a counter.
+"""
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Open spans of this process, innermost last: [traced bytes at the start, peak so far]
+_open = []
+
+
+def _max_rss():
+    if resource is None:
+        return None
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def span(name, records, **args):
+    """Time ``name`` (and its memory peak while tracing); appends its record to ``records``"""
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if _open:
+            _open[-1][1] = max(_open[-1][1], peak)
+        tracemalloc.reset_peak()
+        _open.append([current, current])
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {'name': name, 'started': started, 'seconds': time.perf_counter() - start, 'pid': os.getpid(),
+                  'peak_bytes': None, 'max_rss': _max_rss(), 'args': args}
+        if tracing:
+            base, peak = _open.pop()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if _open:
+                _open[-1][1] = max(_open[-1][1], peak)
+            record['peak_bytes'] = peak - base
+        records.append(record)
+
+
+def _megabytes(value):
+    return None if value is None else round(value / 1e6, 3)
+
+
+class TrainingProfiler:
+    """Spans of one training run; a disabled profiler records nothing
+
+    Use as a context manager; with ``memory=True`` it traces allocations
+    while open.
+    """
+
+    def __init__(self, enabled=True, memory=False):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.records = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def stage(self, name, **args):
+        if not self.enabled:
+            return nullcontext()
+        return span(name, self.records, **args)
+
+    def add(self, records):
+        """Spans recorded elsewhere (a training worker)"""
+        if self.enabled:
+            self.records.extend(records)
+
+    def summary(self):
+        """Span name -> count, total/mean/max seconds and peak memory, slowest first"""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['name'], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                                                       'peak_bytes': None, 'max_rss': None})
+            total['count'] += 1
+            total['seconds'] += record['seconds']
+            total['max_seconds'] = max(total['max_seconds'], record['seconds'])
+            for key in ('peak_bytes', 'max_rss'):
+                if record[key] is not None:
+                    total[key] = max(total[key] or 0, record[key])
+        for total in totals.values():
+            total['mean_seconds'] = total['seconds'] / total['count']
+        return dict(sorted(totals.items(), key=lambda item: -item[1]['seconds']))
+
+    def print_summary(self):
+        print(f"{'span':<36} {'count':>6} {'total s':>9} {'mean s':>9} {'max s':>9} {'peak MB':>9} {'max RSS MB':>11}")
+        for name, total in self.summary().items():
+            peak, rss = _megabytes(total['peak_bytes']), _megabytes(total['max_rss'])
+            print(f"{name:<36} {total['count']:>6} {total['seconds']:>9.3f} {total['mean_seconds']:>9.3f} "
+                  f"{total['max_seconds']:>9.3f} {'-' if peak is None else f'{peak:,.1f}':>9} "
+                  f"{'-' if rss is None else f'{rss:,.1f}':>11}")
+
+    def trace_events(self):
+        """Chrome trace events: one complete event per span, timestamps in µs from the first"""
+        if not self.records:
+            return []
+        origin = min(record['started'] for record in self.records)
+        main = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': pid,
+                   'args': {'name': 'main' if pid == main else f'worker {pid}'}}
+                  for pid in sorted({record['pid'] for record in self.records})]
+        for record in sorted(self.records, key=lambda record: record['started']):
+            start = (record['started'] - origin) * 1e6
+            args = {key: value if isinstance(value, (int, float, str)) or value is None else str(value)
+                    for key, value in record['args'].items()}
+            args.update(peak_mb=_megabytes(record['peak_bytes']), max_rss_mb=_megabytes(record['max_rss']))
+            events.append({'name': record['name'], 'cat': 'training', 'ph': 'X', 'ts': start,
+                           'dur': record['seconds'] * 1e6, 'pid': record['pid'], 'tid': record['pid'], 'args': args})
+            if record['max_rss'] is not None:
+                events.append({'name': 'max RSS', 'ph': 'C', 'ts': start + record['seconds'] * 1e6,
+                               'pid': record['pid'], 'args': {'MB': _megabytes(record['max_rss'])}})
+        return events
+
+    def write_trace(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,199 @@
+# webapp/backend/response_cache.py
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from flask import Response, request
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always offered
+    brotli = None
+
+JSON_MIME = 'application/json'
+
+# Content-Encoding -> ETag suffix, in order of preference when q-values tie
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+
+class CachedPayload:
+    """Serialized, compressed and tagged bytes for one endpoint payload
+
+    Every encoding is compressed once, at the highest level, when the entry
+    is built; requests only pick one of the stored variants.
+    """
+
+    __slots__ = ('body', 'encoded', 'etag', 'mimetype')
+
+    def __init__(self, body, mimetype=JSON_MIME):
+        self.body = body
+        variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=11)
+        # Packed binary columns barely compress; only keep variants that pay off
+        self.encoded = {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.mimetype = mimetype
+
+    @classmethod
+    def restore(cls, body, encoded, mimetype=JSON_MIME):
+        """Rebuild a payload from stored variants without compressing again"""
+        entry = cls.__new__(cls)
+        entry.body = body
+        entry.encoded = dict(encoded)
+        entry.etag = hashlib.sha256(body).hexdigest()[:32]
+        entry.mimetype = mimetype
+        return entry
+
+    def choose_encoding(self, accept_encoding):
+        """Stored encoding the client ranks highest, or None for identity"""
+        if not accept_encoding or not self.encoded:
+            return None
+        accepted = parse_accept_header(accept_encoding)
+        best, best_quality = None, 0
+        for encoding in ENCODING_SUFFIXES:
+            quality = accepted[encoding]
+            if encoding in self.encoded and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+
+def read_payload(path, mimetype=JSON_MIME):
+    """Load a payload stored by ``write_payload`` (variants as ``path-gz``/``path-br``)"""
+    with open(path, 'rb') as f:
+        body = f.read()
+    encoded = {}
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        if os.path.exists(path + suffix):
+            with open(path + suffix, 'rb') as f:
+                encoded[encoding] = f.read()
+    return CachedPayload.restore(body, encoded, mimetype)
+
+
+def write_payload(path, entry):
+    """Store a payload and its variants next to each other
+
+    Variants go first and the plain body last, each through a rename, so a
+    reader that finds the body also finds its variants.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    files = [(path + ENCODING_SUFFIXES[encoding], data) for encoding, data in entry.encoded.items()]
+    for target, data in files + [(path, entry.body)]:
+        temporary = f'{target}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, target)
+
+
+def payload_response(entry, accept_encoding=None, if_none_match=None, vary='Accept-Encoding'):
+    """``(status, headers, body)`` for a ``CachedPayload``, with 304 on a matching ETag"""
+    encoding = entry.choose_encoding(accept_encoding)
+    etag = entry.etag + ENCODING_SUFFIXES[encoding] if encoding else entry.etag
+
+    headers = {
+        'ETag': quote_etag(etag),
+        'Cache-Control': 'no-cache',
+        'Vary': vary
+    }
+    etags = parse_etags(if_none_match)
+    if any(etags.contains_weak(entry.etag + suffix) for suffix in ('',) + tuple(ENCODING_SUFFIXES.values())):
+        return 304, headers, b''
+
+    headers['Content-Type'] = entry.mimetype
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        return 200, headers, entry.encoded[encoding]
+    return 200, headers, entry.body
+
+
+class ResponseCache:
+    """Build endpoint payloads once and answer from memory with strong ETags
+
+    A key can have several representations (JSON plus binary formats);
+    ``respond`` picks one from the request's ``Accept`` header.
+    """
+
+    def __init__(self, dumps=None):
+        self._dumps = dumps or (lambda payload: json.dumps(payload, separators=(',', ':'), sort_keys=True))
+        self._builders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def payload(self, key, mimetype=JSON_MIME):
+        """Decorator registering a function that builds ``key`` as ``mimetype``
+
+        JSON builders return a JSON-serializable object; other builders
+        return the encoded bytes.
+        """
+        def register(builder):
+            self._builders[(key, mimetype)] = builder
+            return builder
+        return register
+
+    def mimetypes(self, key):
+        """Representations registered for ``key``, JSON first"""
+        return sorted((m for k, m in self._builders if k == key), key=lambda m: m != JSON_MIME)
+
+    def get(self, key, mimetype=JSON_MIME):
+        """Return the cached payload for ``key``, building it on first use"""
+        entry = self._entries.get((key, mimetype))
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get((key, mimetype))
+            if entry is None:
+                entry = self._build(key, mimetype)
+                self._entries[(key, mimetype)] = entry
+        return entry
+
+    def _build(self, key, mimetype):
+        result = self._builders[(key, mimetype)]()
+        if mimetype == JSON_MIME:
+            result = f"{self._dumps(result)}\n".encode('utf-8')
+        return CachedPayload(result, mimetype)
+
+    def warm(self):
+        """Build every registered payload up front"""
+        for key, mimetype in list(self._builders):
+            self.get(key, mimetype)
+
+    def build_all(self):
+        """Build every registered payload into a fresh set of entries, without installing it"""
+        return {(key, mimetype): self._build(key, mimetype) for key, mimetype in list(self._builders)}
+
+    def install(self, entries):
+        """Replace all cached payloads at once, e.g. with a new data snapshot's"""
+        with self._lock:
+            self._entries = dict(entries)
+            self.generation += 1
+
+    def invalidate(self):
+        """Drop all cached payloads, e.g. after the datasets were reloaded"""
+        self.install({})
+
+    def lookup(self, key, accept=None, accept_encoding=None, if_none_match=None):
+        """Pick a cached representation from raw request headers
+
+        Returns ``(status, headers, body)`` so both the Flask routes and the
+        ASGI fast path (asgi.py) can answer from the same bytes.
+        """
+        accept_mimetypes = parse_accept_header(accept, MIMEAccept)
+        # Clients that accept none of the representations keep getting JSON
+        mimetype = accept_mimetypes.best_match(self.mimetypes(key), default=JSON_MIME) if accept else JSON_MIME
+        return payload_response(self.get(key, mimetype), accept_encoding, if_none_match, vary='Accept, Accept-Encoding')
+
+    def respond(self, key):
+        """Answer the current Flask request from the cache"""
+        status, headers, body = self.lookup(
+            key,
+            request.headers.get('Accept'),
+            request.headers.get('Accept-Encoding'),
+            request.headers.get('If-None-Match')
+        )
+        return Response(body, status=status, headers=headers)
@@ -0,0 +1,111 @@
+# webapp/backend/search.py
+"""Successive-halving hyperparameter search on the TimeSeriesSplit folds
+
+Every candidate (one combination of a parameter space) starts with a
+small budget of trees; after each rung, only the best ``1 / factor`` by
+mean cross-validated R² go on to ``factor`` times the budget, so most of
+the compute is spent on the few candidates still in the running and the
+poor ones are stopped early. Candidates run in parallel as (candidate,
+fold) tasks on a training.TrainingPool, whose workers keep each fold's
+prepared matrices between candidates and rungs.
+
+``grid_search`` runs every candidate at the full budget on the same pool
+and folds, for comparing cost and result.
+"""
+import itertools
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from training import time_series_folds
+
+# Model name -> (estimator, scale, parameter grid); the budget is n_estimators
+SEARCH_SPACES = {
+    'Random Forest': (RandomForestRegressor(random_state=42), False, {
+        'max_depth': [None, 4, 8, 16],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    }),
+    'Gradient Boosting': (GradientBoostingRegressor(random_state=42), False, {
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [2, 3, 4],
+        'subsample': [0.7, 1.0],
+        'min_samples_leaf': [1, 5],
+    }),
+}
+
+
+def candidates(grid, n_candidates=None, seed=42):
+    """Every combination of ``grid``, or ``n_candidates`` of them drawn without replacement"""
+    names = sorted(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    if n_candidates is not None and n_candidates < len(combinations):
+        picks = np.random.default_rng(seed).choice(len(combinations), n_candidates, replace=False)
+        combinations = [combinations[i] for i in sorted(picks)]
+    return combinations
+
+
+def budgets(min_budget, max_budget, factor):
+    """Budget of every rung: ..., max_budget / factor, max_budget, none below min_budget"""
+    rungs = [max_budget]
+    while rungs[0] / factor >= min_budget:
+        rungs.insert(0, int(round(rungs[0] / factor)))
+    return rungs
+
+
+def score_candidates(pool, key, estimator, scale, params, budget, n_splits):
+    """Mean and per-fold CV R² of each parameter set at ``budget`` trees"""
+    splits = time_series_folds(pool.datasets[key][0], n_splits)
+    tasks = []
+    for index, candidate in enumerate(params):
+        model = clone(estimator).set_params(n_estimators=budget, **candidate)
+        tasks.extend((key, index, fold, model, scale, train, validate)
+                     for fold, (train, validate) in enumerate(splits))
+    scores = np.array([output['score'] for output in pool.run(tasks)]).reshape(len(params), n_splits)
+    return scores.mean(axis=1), scores
+
+
+def successive_halving(pool, key, estimator, scale, grid, min_budget=10, max_budget=300, factor=3,
+                       n_candidates=None, n_splits=5):
+    """Search ``grid`` on dataset ``key`` of ``pool``
+
+    Returns ``{'best_params', 'best_score', 'rungs'}`` for the winner of
+    the last rung; each rung records its budget, how many candidates ran,
+    its best mean CV score and parameters, and the seconds elapsed since
+    the search started.
+    """
+    params = candidates(grid, n_candidates)
+    alive = list(range(len(params)))
+    rungs = []
+    start = time.perf_counter()
+    for budget in budgets(min_budget, max_budget, factor):
+        if len(alive) == 1 and rungs:
+            # A lone survivor goes straight to the full budget
+            budget = max_budget
+        means, _ = score_candidates(pool, key, estimator, scale, [params[i] for i in alive], budget, n_splits)
+        order = np.argsort(-means, kind='stable')
+        rungs.append({
+            'budget': budget,
+            'candidates': len(alive),
+            'best_score': float(means[order[0]]),
+            'best_params': dict(params[alive[order[0]]], n_estimators=budget),
+            'seconds': time.perf_counter() - start,
+        })
+        # Early stopping: only the best 1 / factor get the next, larger budget
+        if budget == max_budget:
+            break
+        alive = [alive[i] for i in order[:max(1, len(alive) // factor)]]
+    return {'best_params': rungs[-1]['best_params'], 'best_score': rungs[-1]['best_score'], 'rungs': rungs}
+
+
+def grid_search(pool, key, estimator, scale, grid, budget=300, n_candidates=None, n_splits=5):
+    """Every candidate at the full budget; same result keys as successive_halving"""
+    params = candidates(grid, n_candidates)
+    start = time.perf_counter()
+    means, _ = score_candidates(pool, key, estimator, scale, params, budget, n_splits)
+    best = int(np.argmax(means))
+    rung = {'budget': budget, 'candidates': len(params), 'best_score': float(means[best]),
+            'best_params': dict(params[best], n_estimators=budget), 'seconds': time.perf_counter() - start}
+    return {'best_params': rung['best_params'], 'best_score': rung['best_score'], 'rungs': [rung]}
@@ -0,0 +1,45 @@
+# webapp/backend/serialization.py
+from itertools import repeat
+
+import numpy as np
+
+
+def iso_dates(dates):
+    """Format a datetime column as 'YYYY-MM-DD' strings in one vectorized pass"""
+    values = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]')
+    return np.datetime_as_string(values, unit='D').tolist()
+
+
+def float_values(values):
+    """Convert a numeric column to a list of Python floats"""
+    return np.asarray(values, dtype=np.float64).tolist()
+
+
+def int_values(values):
+    """Convert a numeric column to a list of Python ints"""
+    return np.asarray(values, dtype=np.int64).tolist()
+
+
+def records(**columns):
+    """Zip column lists into row dicts; scalar values are repeated on every row
+
+    Columns must already be plain Python lists (see ``iso_dates`` and
+    ``float_values``) so rows are assembled without touching pandas.
+    """
+    keys = list(columns)
+    lengths = {len(v) for v in columns.values() if isinstance(v, list)}
+    if len(lengths) > 1:
+        raise ValueError(f"Column lengths differ: {sorted(lengths)}")
+    if not lengths:
+        return []
+
+    iterables = [v if isinstance(v, list) else repeat(v) for v in columns.values()]
+    return [dict(zip(keys, row)) for row in zip(*iterables)]
+
+
+def nullable_floats(values, decimals=None):
+    """Convert a numeric column to Python floats with NaN as None (JSON null)"""
+    values = np.asarray(values, dtype=np.float64)
+    if decimals is not None:
+        values = values.round(decimals)
+    return [None if value != value else value for value in values.tolist()]
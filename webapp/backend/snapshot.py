@@ -0,0 +1,202 @@
+# webapp/backend/snapshot.py
+"""Versioned snapshots of the model artifacts and datasets, with hot reload
+
+A ``SnapshotManager`` loads every watched file into one immutable
+``Snapshot`` and swaps it in with a single reference assignment. A watcher
+thread compares file sizes and mtimes every ``WATERTRACE_RELOAD_INTERVAL``
+seconds (default 30, 0 turns it off), confirms a change by content hash,
+then loads and prepares the new snapshot in the background; requests keep
+using the old one until the swap. ``pin`` fixes the snapshot a request
+sees, so it never mixes two versions even if a swap lands mid-request.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+RELOAD_INTERVAL = float(os.environ.get('WATERTRACE_RELOAD_INTERVAL', '30'))
+
+
+def file_stat(path):
+    """(size, mtime_ns) of a file, or None when it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class Snapshot:
+    """One consistent set of loaded artifacts, tagged with a content version"""
+
+    def __init__(self, version, files, **parts):
+        self.version = version
+        self.files = files
+        self.loaded_at = datetime.now().isoformat()
+        self.parts = parts
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['parts'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'files': {name: {'sha256': info['sha256'][:16] if info['sha256'] else None, 'size': info['size']}
+                      for name, info in self.files.items()}
+        }
+
+
+class SnapshotManager:
+    """Load, watch and atomically swap ``Snapshot`` objects
+
+    ``loader(paths)`` returns a dict of the loaded parts. ``prepare(snapshot)``
+    runs with the new snapshot pinned, before it becomes current, and may
+    return more parts derived from it (e.g. cached payloads);
+    ``install(snapshot)`` then runs under the swap lock as it becomes current.
+    """
+
+    def __init__(self, paths, loader, prepare=None, install=None, interval=RELOAD_INTERVAL):
+        self.paths = dict(paths)
+        self.loader = loader
+        self.prepare = prepare
+        self.install = install
+        self.interval = interval
+        self.current = None
+        self.reloads = 0
+        self.last_error = None
+        self.last_checked = None
+        self._failed_version = None
+        self._pinned = ContextVar('watertrace_snapshot', default=None)
+        self._reload_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def snapshot(self):
+        """The snapshot pinned for this request/thread, else the current one"""
+        return self._pinned.get() or self.current
+
+    @contextmanager
+    def pin(self, snapshot=None):
+        token = self._pinned.set(snapshot or self.current)
+        try:
+            yield self._pinned.get()
+        finally:
+            self._pinned.reset(token)
+
+    def pin_request(self):
+        """Pin the current snapshot for the rest of this request; returns a reset token"""
+        return self._pinned.set(self.current)
+
+    def unpin(self, token):
+        self._pinned.reset(token)
+
+    def _fingerprint(self, known=None):
+        """Per-file size, mtime and content hash, hashing only files whose stat changed"""
+        files = {}
+        for name, path in self.paths.items():
+            stat = file_stat(path)
+            previous = (known or {}).get(name)
+            if previous is not None and previous['stat'] == stat:
+                files[name] = previous
+            else:
+                files[name] = {'stat': stat, 'size': stat[0] if stat else None, 'sha256': file_sha256(path)}
+        version = hashlib.sha256(
+            ''.join(f"{name}:{files[name]['sha256']};" for name in sorted(files)).encode('utf-8')
+        ).hexdigest()[:12]
+        return version, files
+
+    def load(self):
+        """Load and install a snapshot of the files as they are now (used at startup)"""
+        with self._reload_lock:
+            version, files = self._fingerprint()
+            self.swap(self._build(version, files))
+            return self.current
+
+    def reload(self, force=False):
+        """Load a new snapshot if any watched file's content changed; returns True on a swap
+
+        A snapshot that fails to load is dropped and the current one stays.
+        """
+        with self._reload_lock:
+            self.last_checked = datetime.now().isoformat()
+            known = self.current.files if self.current is not None else None
+            version, files = self._fingerprint(known)
+            if not force and self.current is not None and version == self.current.version:
+                return False
+            if not force and version == self._failed_version:
+                # Same broken files as last time; wait until they change again
+                return False
+            try:
+                snapshot = self._build(version, files)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._failed_version = version
+                current = self.current.version if self.current is not None else None
+                print(f"⚠️ Snapshot {version} failed to load, keeping {current}: {e}")
+                return False
+            self.swap(snapshot)
+            self.reloads += 1
+            print(f"🔄 Swapped in data snapshot {version}")
+            return True
+
+    def _build(self, version, files):
+        snapshot = Snapshot(version, files, **self.loader(self.paths))
+        if self.prepare is not None:
+            with self.pin(snapshot):
+                snapshot.parts.update(self.prepare(snapshot) or {})
+        return snapshot
+
+    def swap(self, snapshot):
+        """Make ``snapshot`` current, running ``install`` first"""
+        with self._swap_lock:
+            if self.install is not None:
+                self.install(snapshot)
+            self.current = snapshot
+        self.last_error = None
+
+    def ensure_watching(self):
+        """Start the watcher thread in this process (threads do not survive a fork)"""
+        if self.interval <= 0 or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._swap_lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._watch, name='watertrace-snapshots', daemon=True)
+                self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reload()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def describe(self):
+        details = self.current.describe() if self.current is not None else {'version': None}
+        details.update({
+            'reloads': self.reloads,
+            'last_checked': self.last_checked,
+            'last_error': self.last_error,
+            'watch_interval_seconds': self.interval if self.interval > 0 else None
+        })
+        return details
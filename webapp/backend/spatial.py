@@ -0,0 +1,200 @@
+# webapp/backend/spatial.py
+"""Point-to-district lookup over the cleaned district shapefile
+
+The 145 district polygons are read once (with pyshp, no GDAL needed) into
+a shapely STRtree. A lookup first narrows each point to the districts whose
+bounding boxes contain it, then runs the exact point-in-polygon test on
+those candidates only; shapely does both steps for whole arrays of points
+in C, so bulk lookups never loop in Python.
+
+District polygons are detailed and their bounding boxes overlap a lot, so
+bulk lookups add a coarse raster in front of the tree: cells that lie
+wholly inside one district (or outside all of them) answer by array
+indexing, and only points in cells crossed by a border reach the tree.
+"""
+import io
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import shapefile
+import shapely
+from shapely.geometry import shape
+
+MAX_LOOKUP_POINTS = 1_000_000
+
+# Batches at least this large go through the cell raster first
+RASTER_MIN_POINTS = 2048
+BORDER_CELL = -2
+
+
+class PointsError(ValueError):
+    """Raised when a bulk lookup body cannot be read"""
+
+
+class DistrictIndex:
+    """STRtree over district polygons with their district/province names"""
+
+    def __init__(self, geometries, districts, provinces, cell_size=0.05):
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.districts = np.asarray(districts, dtype=object)
+        self.provinces = np.asarray(provinces, dtype=object)
+        # Prepared polygons make the exact containment test much cheaper
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+        self.bounds = shapely.total_bounds(self.geometries)
+        self.cell_size = cell_size
+        self._cells = None
+        self._cells_lock = threading.Lock()
+
+    @classmethod
+    def from_shapefile(cls, path, district_field='DISTRICT', province_field='PROVINCE_C'):
+        """Load the polygons and the ``DISTRICT``/``PROVINCE_CLEAN`` fields
+
+        The .dbf format truncates field names to 10 characters, so
+        notebooks/03_clean_province_names.py's PROVINCE_CLEAN is stored as
+        PROVINCE_C; rows it could not map keep the raw PROVINCE value.
+        """
+        reader = shapefile.Reader(path)
+        try:
+            geometries, districts, provinces = [], [], []
+            for record in reader.iterShapeRecords():
+                geometry = shape(record.shape.__geo_interface__)
+                geometries.append(geometry if geometry.is_valid else shapely.make_valid(geometry))
+                attributes = record.record.as_dict()
+                districts.append(attributes[district_field])
+                provinces.append(attributes.get(province_field) or attributes.get('PROVINCE'))
+        finally:
+            reader.close()
+        return cls(geometries, districts, provinces)
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def cell_labels(self):
+        """District of each raster cell, -1 outside all, BORDER_CELL where borders cross
+
+        Built on the first bulk lookup (about a second for 0.05° cells) so
+        it never delays startup.
+        """
+        if self._cells is None:
+            with self._cells_lock:
+                if self._cells is None:
+                    west, south, east, north = self.bounds
+                    nx = max(int(np.ceil((east - west) / self.cell_size)), 1)
+                    ny = max(int(np.ceil((north - south) / self.cell_size)), 1)
+                    x, y = np.meshgrid(west + np.arange(nx) * self.cell_size, south + np.arange(ny) * self.cell_size)
+                    boxes = shapely.box(x.ravel(), y.ravel(), x.ravel() + self.cell_size, y.ravel() + self.cell_size)
+
+                    box_index, district_index = self.tree.query(boxes, predicate='intersects')
+                    hits = np.bincount(box_index, minlength=len(boxes))
+                    labels = np.where(hits > 0, BORDER_CELL, -1)
+                    # A cell touched by a single district may still lie wholly inside it
+                    single = hits[box_index] == 1
+                    box_index, district_index = box_index[single], district_index[single]
+                    inside = shapely.contains_properly(self.geometries[district_index], boxes[box_index])
+                    labels[box_index[inside]] = district_index[inside]
+                    self._cells = (nx, ny, labels)
+        return self._cells
+
+    def lookup(self, lon, lat):
+        """Index of the district containing each point, or -1 outside every district
+
+        Points on a shared border belong to the lower-indexed district.
+        """
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        if len(lon) < RASTER_MIN_POINTS:
+            return self._lookup_exact(lon, lat)
+
+        nx, ny, labels = self.cell_labels()
+        west, south, east, north = self.bounds
+        in_bounds = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        rows = np.full(len(lon), -1, dtype=np.int64)
+        col = np.minimum(((lon[in_bounds] - west) / self.cell_size).astype(np.int64), nx - 1)
+        row = np.minimum(((lat[in_bounds] - south) / self.cell_size).astype(np.int64), ny - 1)
+        rows[in_bounds] = labels[row * nx + col]
+
+        border = rows == BORDER_CELL
+        rows[border] = self._lookup_exact(lon[border], lat[border])
+        return rows
+
+    def _lookup_exact(self, lon, lat):
+        """Tree query plus exact point-in-polygon test for every point"""
+        points = shapely.points(lon, lat)
+        point_index, district_index = self.tree.query(points, predicate='intersects')
+
+        rows = np.full(len(points), -1, dtype=np.int64)
+        if len(point_index):
+            order = np.lexsort((district_index, point_index))
+            point_index, district_index = point_index[order], district_index[order]
+            first = np.ones(len(point_index), dtype=bool)
+            first[1:] = point_index[1:] != point_index[:-1]
+            rows[point_index[first]] = district_index[first]
+        return rows
+
+    def names(self, rows):
+        """District and province name lists for lookup rows (None where unmatched)"""
+        matched = rows >= 0
+        districts = np.full(len(rows), None, dtype=object)
+        provinces = np.full(len(rows), None, dtype=object)
+        districts[matched] = self.districts[rows[matched]]
+        provinces[matched] = self.provinces[rows[matched]]
+        return districts.tolist(), provinces.tolist()
+
+
+def parse_coordinate(value, name, limit):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not -limit <= number <= limit:
+        raise ValueError(f"{name} must be between -{limit} and {limit}")
+    return number
+
+
+def read_points(body, content_type):
+    """Parse a bulk lookup body into ``(lat, lon)`` float arrays
+
+    Accepts JSON as ``{"lat": [...], "lon": [...]}``, ``{"points": [...]}``
+    or a bare list, where each point is ``[lat, lon]`` or
+    ``{"lat": .., "lon": ..}``; or CSV with ``lat`` and ``lon`` columns.
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    text = body.decode('utf-8') if isinstance(body, bytes) else body
+
+    try:
+        if content_type == 'text/csv':
+            frame = pd.read_csv(io.StringIO(text))
+            if 'lat' not in frame or 'lon' not in frame:
+                raise PointsError('CSV body needs lat and lon columns')
+            lat, lon = frame['lat'].to_numpy(), frame['lon'].to_numpy()
+        else:
+            payload = json.loads(text)
+            if isinstance(payload, dict) and 'lat' in payload and 'lon' in payload:
+                lat, lon = payload['lat'], payload['lon']
+            else:
+                points = payload.get('points') if isinstance(payload, dict) else payload
+                if not isinstance(points, list):
+                    raise PointsError('Expected {"lat": [...], "lon": [...]} or a list of points')
+                if any(isinstance(point, dict) for point in points):
+                    lat = [point['lat'] if isinstance(point, dict) else point[0] for point in points]
+                    lon = [point['lon'] if isinstance(point, dict) else point[1] for point in points]
+                else:
+                    pairs = np.asarray(points, dtype=np.float64)
+                    if pairs.ndim != 2 or pairs.shape[1] != 2:
+                        raise PointsError('Each point must be [lat, lon] or {"lat": .., "lon": ..}')
+                    lat, lon = pairs[:, 0], pairs[:, 1]
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+    except PointsError:
+        raise
+    except (ValueError, TypeError, KeyError, IndexError, pd.errors.ParserError) as e:
+        raise PointsError(f"Invalid points: {e}")
+
+    if lat.shape != lon.shape or lat.ndim != 1:
+        raise PointsError('lat and lon must be equal-length lists of numbers')
+    if len(lat) > MAX_LOOKUP_POINTS:
+        raise PointsError(f"Too many points: {len(lat)} (max {MAX_LOOKUP_POINTS})")
+    return lat, lon
@@ -0,0 +1,45 @@
+# webapp/backend/startup.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupPhases:
+    """Wall-clock timings of each import and loading phase during startup"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._phases.append({
+                    'phase': name,
+                    'seconds': round(elapsed, 4),
+                    'started_after': round(start - self._origin, 4),
+                    'pid': os.getpid()
+                })
+
+    def report(self):
+        with self._lock:
+            phases = list(self._phases)
+        # Phases nest (e.g. 'import app' spans the loads inside it), so report
+        # when the last one finished rather than summing them
+        return {
+            'phases': phases,
+            'ready_after_seconds': round(max((p['started_after'] + p['seconds'] for p in phases), default=0), 4),
+            'uptime_seconds': round(time.time() - self.started_at, 2)
+        }
+
+
+# Shared by lazy_app.py (which must stay light) and app.py
+startup_phases = StartupPhases()
@@ -0,0 +1,116 @@
+# webapp/backend/streaming.py
+"""Streaming NDJSON and CSV encodings for time series and bulk exports
+
+Rows are formatted straight from the column arrays, ``CHUNK_ROWS`` at a
+time, and each chunk is yielded as soon as it is ready: the first bytes go
+out before later rows are even formatted, and a response never holds more
+than one chunk of text however many rows it covers.
+
+Sources hand over *blocks*: dicts of equal-length column arrays (a scalar
+stands for a constant column). ``column_blocks`` cuts one big set of
+columns into blocks; bulk exports can generate blocks lazily instead.
+"""
+import json
+
+import numpy as np
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+NDJSON_MIME = 'application/x-ndjson'
+CSV_MIME = 'text/csv'
+STREAM_FORMATS = {'ndjson': NDJSON_MIME, 'csv': CSV_MIME}
+CHUNK_ROWS = 8192
+
+
+def requested_format(format_param=None, accept=None, others=('application/json',)):
+    """Streaming format a request asks for: ``?format=`` first, then ``Accept``
+
+    ``others`` are the endpoint's other representations, JSON first, so a
+    client preferring one of those does not get a stream. Returns None for
+    a non-streaming response and raises ValueError for an unknown format.
+    """
+    if format_param:
+        if format_param not in STREAM_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(STREAM_FORMATS)}")
+        return format_param
+    if not accept:
+        return None
+    best = parse_accept_header(accept, MIMEAccept).best_match(list(others) + list(STREAM_FORMATS.values()))
+    for name, mimetype in STREAM_FORMATS.items():
+        if best == mimetype:
+            return name
+    return None
+
+
+def column_blocks(columns, chunk_rows=CHUNK_ROWS):
+    """Cut a dict of equal-length columns into blocks of at most ``chunk_rows`` rows"""
+    arrays = {name: np.asarray(values) if np.ndim(values) else values for name, values in columns.items()}
+    lengths = {len(values) for values in arrays.values() if np.ndim(values)}
+    if len(lengths) > 1:
+        raise ValueError(f"Column lengths differ: {sorted(lengths)}")
+    n_rows = lengths.pop() if lengths else 0
+    for start in range(0, n_rows, chunk_rows):
+        yield {name: values[start:start + chunk_rows] if np.ndim(values) else values
+               for name, values in arrays.items()}
+
+
+def _block_rows(block):
+    return next((len(values) for values in block.values() if np.ndim(values)), 0)
+
+
+def _format_column(values, n_rows, quote, missing):
+    """Text of one block column: dates as YYYY-MM-DD, floats via repr, strings through ``quote``"""
+    if not np.ndim(values):
+        return [quote(str(values)) if isinstance(values, str) else str(values)] * n_rows
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        text = np.datetime_as_string(values.astype('datetime64[D]'), unit='D').tolist()
+        text = [missing if day == 'NaT' else quote(day) for day in text]
+        return text
+    if values.dtype.kind in 'OUS':
+        # Few distinct labels per block (sources, districts): quote each once
+        labels, codes = np.unique(values.astype(str), return_inverse=True)
+        quoted = [quote(label) for label in labels.tolist()]
+        return [quoted[code] for code in codes.tolist()]
+    if values.dtype.kind in 'iub':
+        return [str(value) for value in values.tolist()]
+    return [missing if value != value else repr(value) for value in values.astype(np.float64).tolist()]
+
+
+def _csv_quote(text):
+    if any(c in text for c in ',"\n\r'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def ndjson_stream(blocks):
+    """One JSON object per row, e.g. ``{"date":"2002-03-31","groundwater_cm":4.98}``"""
+    line = None
+    for block in blocks:
+        n_rows = _block_rows(block)
+        if not n_rows:
+            continue
+        if line is None:
+            keys = [json.dumps(name).replace('{', '{{').replace('}', '}}') for name in block]
+            line = '{{' + ','.join(f'{key}:{{}}' for key in keys) + '}}\n'
+        text = [_format_column(values, n_rows, json.dumps, 'null') for values in block.values()]
+        yield ''.join(map(line.format, *text)).encode('utf-8')
+
+
+def csv_stream(blocks, names):
+    """Header row of ``names``, then one CSV row per input row (empty cells for NaN)"""
+    yield (','.join(_csv_quote(name) for name in names) + '\n').encode('utf-8')
+    line = ','.join(['{}'] * len(names)) + '\n'
+    for block in blocks:
+        n_rows = _block_rows(block)
+        if not n_rows:
+            continue
+        text = [_format_column(block[name], n_rows, _csv_quote, '') for name in names]
+        yield ''.join(map(line.format, *text)).encode('utf-8')
+
+
+def encode_stream(stream_format, blocks, names):
+    """Chunk generator for ``blocks`` in ``'ndjson'`` or ``'csv'``"""
+    if stream_format == 'csv':
+        return csv_stream(blocks, names)
+    return ndjson_stream(blocks)
@@ -0,0 +1,300 @@
+# webapp/backend/tiles.py
+"""Mapbox Vector Tiles of the district layer
+
+District polygons are projected to Web Mercator once per snapshot. The
+first tile requested at a zoom level simplifies every district to about
+one tile unit at that zoom (the z0 tile keeps about 1,500 of the 37,000
+shapefile vertices, z9 nearly all of them) and indexes the result; each
+tile then clips only the districts whose boxes touch it. Tiles carry the
+latest groundwater change of each district as feature properties, so the
+map can style them without a second request.
+
+Built tiles stay in an in-memory LRU and, when ``WATERTRACE_TILE_CACHE_DIR``
+is set, on disk under the snapshot version, so a restart or another worker
+reuses them and a data reload never serves stale tiles.
+
+The MVT protobuf (spec v2.1) is written by hand; the layer only needs
+polygons and string/double values, which keeps the encoder small and
+avoids a protobuf dependency.
+"""
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import shapely
+
+from districts import water_status
+from response_cache import CachedPayload, read_payload, write_payload
+
+MVT_MIME = 'application/vnd.mapbox-vector-tile'
+LAYER_NAME = 'districts'
+EXTENT = 4096
+BUFFER = 64  # Tile units drawn past each edge so strokes do not end at tile seams
+MAX_ZOOM = 14
+# Simplification at z12 is already finer than the shapefile; deeper zooms reuse it
+MAX_SIMPLIFY_ZOOM = 12
+
+TILE_CACHE_SIZE = int(os.environ.get('WATERTRACE_TILE_CACHE_SIZE', '2048'))
+TILE_CACHE_DIR = os.environ.get('WATERTRACE_TILE_CACHE_DIR') or None
+
+WORLD = 20037508.342789244  # Half the Web Mercator world width in meters
+MAX_LATITUDE = 85.0511287798
+
+FIELDS = {'district': 'String', 'province': 'String', 'groundwater_change': 'Number',
+          'status': 'String', 'as_of': 'String'}
+
+
+def mercator(coords):
+    """(N, 2) lon/lat degrees to Web Mercator meters"""
+    lon = coords[:, 0]
+    lat = np.clip(coords[:, 1], -MAX_LATITUDE, MAX_LATITUDE)
+    x = lon * WORLD / 180
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * WORLD / np.pi
+    return np.column_stack([x, y])
+
+
+def tile_bounds(z, x, y):
+    """Mercator (minx, miny, maxx, maxy) of a tile"""
+    size = 2 * WORLD / (1 << z)
+    minx = -WORLD + x * size
+    maxy = WORLD - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+# ---- protobuf ----
+
+def varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def field(number, payload):
+    """Length-delimited field (strings, messages, packed repeated ints)"""
+    return varint((number << 3) | 2) + varint(len(payload)) + payload
+
+
+def int_field(number, value):
+    return varint(number << 3) + varint(value)
+
+
+def packed(number, values):
+    return field(number, b''.join(varint(int(value)) for value in values))
+
+
+def encode_value(value):
+    """Layer value message: double for numbers, string otherwise"""
+    if isinstance(value, float):
+        return field(4, varint((3 << 3) | 1) + struct.pack('<d', value))
+    return field(4, field(1, str(value).encode('utf-8')))
+
+
+# ---- geometry ----
+
+def command(command_id, count):
+    return (command_id & 0x7) | (count << 3)
+
+
+def zigzag(values):
+    return (values << 1) ^ (values >> 63)
+
+
+def ring_commands(ring, exterior, cursor):
+    """MoveTo/LineTo/ClosePath integers for one ring of tile coordinates
+
+    Drops repeated points left by rounding and returns None when the ring
+    collapses. Exterior rings are wound to positive area and holes to
+    negative area in tile space (y down), as MVT 2.x requires.
+    """
+    ring = ring[:-1] if len(ring) > 1 and (ring[0] == ring[-1]).all() else ring
+    if len(ring):
+        keep = np.ones(len(ring), dtype=bool)
+        keep[1:] = (ring[1:] != ring[:-1]).any(axis=1)
+        ring = ring[keep]
+        if len(ring) > 1 and (ring[0] == ring[-1]).all():
+            ring = ring[:-1]
+    if len(ring) < 3:
+        return None
+
+    x, y = ring[:, 0], ring[:, 1]
+    area = int(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+    if area == 0:
+        return None
+    if (area > 0) != exterior:
+        ring = ring[::-1]
+
+    deltas = np.diff(np.vstack([cursor, ring]), axis=0)
+    params = zigzag(deltas).ravel()
+    cursor[:] = ring[-1]
+    return [command(1, 1), int(params[0]), int(params[1]), command(2, len(ring) - 1)] + params[2:].tolist() + [command(7, 1)]
+
+
+def polygon_commands(geometry, bounds):
+    """Geometry command stream of a clipped (multi)polygon in tile coordinates"""
+    minx, miny, maxx, maxy = bounds
+    scale = EXTENT / (maxx - minx)
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for polygon in shapely.get_parts(geometry):
+        if shapely.get_type_id(polygon) != 3:  # Clipping can leave slivers as lines or points
+            continue
+        holes = shapely.get_interior_ring(polygon, range(shapely.get_num_interior_rings(polygon)))
+        rings = [shapely.get_exterior_ring(polygon)] + list(holes)
+        for i, ring in enumerate(rings):
+            coords = shapely.get_coordinates(ring)
+            tile = np.column_stack([(coords[:, 0] - minx) * scale, (maxy - coords[:, 1]) * scale])
+            encoded = ring_commands(np.round(tile).astype(np.int64), i == 0, cursor)
+            if encoded is None and i == 0:
+                break  # Holes of a collapsed polygon go with it
+            if encoded is not None:
+                commands.extend(encoded)
+    return commands
+
+
+class DistrictTiles:
+    """Vector tiles for one snapshot's district index and groundwater table"""
+
+    def __init__(self, index, table=None, version=None, cache_size=TILE_CACHE_SIZE, cache_dir=TILE_CACHE_DIR):
+        self.index = index
+        self.version = version or 'unversioned'
+        self.geometries = shapely.transform(index.geometries, mercator)
+        self.properties = [self._properties(row, table) for row in range(len(index))]
+        self.cache_size = cache_size
+        self.cache_dir = os.path.join(cache_dir, self.version) if cache_dir else None
+        self._zooms = {}
+        self._zoom_locks = {}
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'built': 0}
+
+    def _properties(self, row, table):
+        district = self.index.districts[row]
+        properties = {'district': district, 'province': self.index.provinces[row]}
+        table_row = table.row(district) if table is not None else None
+        change = float(table.latest_change_cm[table_row]) if table_row is not None else float('nan')
+        if not np.isnan(change):
+            properties['groundwater_change'] = round(change, 2)
+            properties['status'] = water_status(change)
+        else:
+            properties['status'] = 'No data'
+        if table is not None and not np.isnat(table.latest_date):
+            properties['as_of'] = str(table.latest_date)
+        return properties
+
+    def zoom_geometries(self, z):
+        """(geometries, STRtree) simplified to about one tile unit at zoom ``z``, built once"""
+        z = min(z, MAX_SIMPLIFY_ZOOM)
+        level = self._zooms.get(z)
+        if level is not None:
+            return level
+        # Concurrent first requests at a zoom wait for one build; other zooms go on
+        with self._lock:
+            zoom_lock = self._zoom_locks.setdefault(z, threading.Lock())
+        with zoom_lock:
+            level = self._zooms.get(z)
+            if level is None:
+                tolerance = 2 * WORLD / ((1 << z) * EXTENT)
+                geometries = shapely.simplify(self.geometries, tolerance, preserve_topology=True)
+                level = (geometries, shapely.STRtree(geometries))
+                self._zooms[z] = level
+        return level
+
+    def build(self, z, x, y):
+        """Encode one tile; returns b'' when no district touches it"""
+        geometries, tree = self.zoom_geometries(z)
+        bounds = tile_bounds(z, x, y)
+        pad = (bounds[2] - bounds[0]) * BUFFER / EXTENT
+        clip = (bounds[0] - pad, bounds[1] - pad, bounds[2] + pad, bounds[3] + pad)
+
+        keys, values, features = {}, {}, []
+        for row in np.sort(tree.query(shapely.box(*clip), predicate='intersects')):
+            geometry = shapely.clip_by_rect(geometries[row], *clip)
+            commands = polygon_commands(geometry, bounds)
+            if not commands:
+                continue
+            tags = []
+            for key, value in self.properties[row].items():
+                tags.append(keys.setdefault(key, len(keys)))
+                tags.append(values.setdefault(value, len(values)))
+            features.append(field(2, int_field(1, int(row)) + packed(2, tags) + int_field(3, 3) + packed(4, commands)))
+
+        if not features:
+            return b''
+        layer = (int_field(15, 2) + field(1, LAYER_NAME.encode('utf-8')) + b''.join(features)
+                 + b''.join(field(3, key.encode('utf-8')) for key in keys)
+                 + b''.join(encode_value(value) for value in values)
+                 + int_field(5, EXTENT))
+        return field(3, layer)
+
+    def get(self, z, x, y):
+        """Cached payload for a tile (``body`` is b'' for empty tiles)"""
+        key = (z, x, y)
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                self._tiles.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+
+        entry = self._read_disk(key)
+        source = 'disk_hits'
+        if entry is None:
+            entry = CachedPayload(self.build(z, x, y), MVT_MIME)
+            source = 'built'
+            self._write_disk(key, entry)
+
+        with self._lock:
+            self.stats[source] += 1
+            self._tiles[key] = entry
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+        return entry
+
+    def _tile_path(self, key):
+        z, x, y = key
+        return os.path.join(self.cache_dir, str(z), str(x), f'{y}.mvt')
+
+    def _read_disk(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            return read_payload(self._tile_path(key), MVT_MIME)
+        except OSError:
+            return None
+
+    def _write_disk(self, key, entry):
+        if self.cache_dir is None:
+            return
+        try:
+            write_payload(self._tile_path(key), entry)
+        except OSError as e:
+            print(f"⚠️ Could not cache tile {key}: {e}")
+
+    def tilejson(self, url):
+        """TileJSON 3.0 description of the layer for MapLibre/Leaflet plugins"""
+        west, south, east, north = (float(v) for v in self.index.bounds)
+        return {
+            'tilejson': '3.0.0',
+            'name': 'WaterTrace districts',
+            'version': self.version,
+            'tiles': [url],
+            'minzoom': 0,
+            'maxzoom': MAX_ZOOM,
+            'bounds': [west, south, east, north],
+            'vector_layers': [{'id': LAYER_NAME, 'fields': FIELDS, 'minzoom': 0, 'maxzoom': MAX_ZOOM}]
+        }
+
+    def describe(self):
+        with self._lock:
+            return dict(self.stats, cached_tiles=len(self._tiles), simplified_zooms=sorted(self._zooms),
+                        cache_dir=self.cache_dir)
@@ -0,0 +1,118 @@
+# webapp/backend/timeseries.py
+import numpy as np
+
+MAX_POINTS_LIMIT = 100_000
+
+
+class Window:
+    """Date range and point budget requested for a time series"""
+
+    def __init__(self, start=None, end=None, max_points=None):
+        self.start = start
+        self.end = end
+        self.max_points = max_points
+
+    def describe(self):
+        return {
+            'start': str(self.start) if self.start is not None else None,
+            'end': str(self.end) if self.end is not None else None,
+            'max_points': self.max_points
+        }
+
+
+def parse_window(args):
+    """Read ``start``, ``end`` and ``max_points`` query parameters
+
+    Dates may be given as YYYY, YYYY-MM or YYYY-MM-DD; ``end`` includes the
+    whole period it names. Returns None when no parameter was given and
+    raises ValueError for malformed values.
+    """
+    start, end, max_points = args.get('start'), args.get('end'), args.get('max_points')
+    if start is None and end is None and max_points is None:
+        return None
+
+    window = Window()
+    try:
+        if start:
+            window.start = np.datetime64(start)
+        if end:
+            window.end = np.datetime64(end)
+    except ValueError:
+        raise ValueError('start and end must be dates like 2010, 2010-06 or 2010-06-15')
+    if window.start is not None and window.end is not None and window.end < window.start:
+        raise ValueError('end must not be before start')
+
+    if max_points is not None:
+        try:
+            window.max_points = int(max_points)
+        except ValueError:
+            raise ValueError('max_points must be an integer')
+        if not 3 <= window.max_points <= MAX_POINTS_LIMIT:
+            raise ValueError(f"max_points must be between 3 and {MAX_POINTS_LIMIT}")
+    return window
+
+
+def date_slice(dates, start=None, end=None):
+    """Binary-search a sorted datetime64 array for the rows inside [start, end]"""
+    lo = np.searchsorted(dates, start.astype(dates.dtype), side='left') if start is not None else 0
+    if end is None:
+        hi = len(dates)
+    else:
+        # Step past the end of the named period, e.g. '2010-06' covers all of June
+        unit = np.datetime_data(end.dtype)[0]
+        end_exclusive = (end + np.timedelta64(1, unit)).astype(dates.dtype)
+        hi = np.searchsorted(dates, end_exclusive, side='left')
+    return slice(int(lo), int(max(lo, hi)))
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets downsampling, returning the kept indices
+
+    Bucket edges and the per-bucket averages are computed for all buckets
+    at once; the remaining loop only picks the best point in each bucket,
+    which depends on the point kept in the previous one.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError('n_out must be at least 3')
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = (np.arange(n_out - 1) * (n - 2) // (n_out - 2)) + 1
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    avg_x = np.add.reduceat(x[:n - 1], starts) / counts
+    avg_y = np.add.reduceat(y[:n - 1], starts) / counts
+
+    # The third triangle vertex is the next bucket's average (the last point for the final bucket)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = starts[i], ends[i]
+        areas = np.abs((x[a] - next_x[i]) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (next_y[i] - y[a]))
+        a = s + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+def apply_window(columns, window, value_column):
+    """Slice date-sorted columns to the window and downsample them to its point budget"""
+    dates = np.asarray(columns['date'], dtype='datetime64[ns]')
+    rows = date_slice(dates, window.start, window.end)
+    sliced = {name: np.asarray(values)[rows] for name, values in columns.items()}
+    source_points = rows.stop - rows.start
+
+    if window.max_points is not None and source_points > window.max_points:
+        x = sliced['date'].astype('datetime64[s]').astype(np.float64)
+        kept = lttb(x, sliced[value_column], window.max_points)
+        sliced = {name: values[kept] for name, values in sliced.items()}
+
+    info = dict(window.describe(), source_points=int(source_points), returned_points=len(sliced['date']))
+    return sliced, info
@@ -0,0 +1,190 @@
+# webapp/backend/topology.py
+"""Quantized TopoJSON with shared arcs for the district polygons
+
+Coordinates are first snapped to a ``quantization`` x ``quantization``
+integer grid over the layer's bounding box. A vertex is a junction where
+the rings passing through it stop agreeing on its neighbours; cutting
+every ring at its junctions yields arcs, and an arc that two districts
+share (in either direction) is stored once. Simplification runs on the
+arcs, with their end points fixed, so neighbouring districts stay
+stitched together at every level.
+
+Used by notebooks/16_export_topojson.py; the API serves the exported files.
+"""
+import json
+
+import numpy as np
+import shapely
+
+
+def polygon_rings(geometry):
+    """Polygon or MultiPolygon as a list of polygons, each a list of (N, 2) rings"""
+    polygons = []
+    for polygon in shapely.get_parts(geometry):
+        if shapely.get_type_id(polygon) != 3:
+            continue
+        holes = shapely.get_interior_ring(polygon, range(shapely.get_num_interior_rings(polygon)))
+        rings = [shapely.get_exterior_ring(polygon)] + list(holes)
+        polygons.append([shapely.get_coordinates(ring) for ring in rings])
+    return polygons
+
+
+def open_ring(ring):
+    """Drop repeated points (including the closing one) from an integer ring"""
+    keep = np.ones(len(ring), dtype=bool)
+    keep[1:] = (ring[1:] != ring[:-1]).any(axis=1)
+    ring = ring[keep]
+    while len(ring) > 1 and (ring[0] == ring[-1]).all():
+        ring = ring[:-1]
+    return ring
+
+
+class Topology:
+    """Shared-arc topology of a list of polygon geometries
+
+    ``arcs`` holds absolute quantized coordinates; ``objects`` mirrors the
+    input as geometry -> polygon -> ring -> arc references, where ``~i``
+    means arc ``i`` reversed, as in TopoJSON.
+    """
+
+    def __init__(self, geometries, properties, quantization=100_000):
+        self.properties = list(properties)
+        west, south, east, north = shapely.total_bounds(geometries)
+        self.translate = np.array([west, south])
+        self.scale = np.array([east - west, north - south]) / (quantization - 1)
+        self.bbox = [float(west), float(south), float(east), float(north)]
+
+        rings, owners = [], []
+        for g, geometry in enumerate(geometries):
+            for p, polygon in enumerate(polygon_rings(geometry)):
+                for r, ring in enumerate(polygon):
+                    quantized = open_ring(np.round((ring - self.translate) / self.scale).astype(np.int64))
+                    if len(quantized) >= 3:
+                        rings.append(quantized)
+                        owners.append((g, p, r))
+
+        junctions = self._junctions(rings, quantization)
+        self.arcs = []
+        self._arc_ids = {}
+        self.objects = [[] for _ in geometries]
+        polygons = {}
+        for (g, p, r), ring in zip(owners, rings):
+            if r == 0:
+                polygons[(g, p)] = []
+                self.objects[g].append(polygons[(g, p)])
+            elif (g, p) not in polygons:
+                continue  # Exterior collapsed; its holes go with it
+            polygons[(g, p)].append(self._cut(ring, junctions))
+
+    @staticmethod
+    def _junctions(rings, quantization):
+        """Keys of vertices where rings through them have different neighbours"""
+        keys = [ring[:, 0] * (quantization + 1) + ring[:, 1] for ring in rings]
+        point = np.concatenate(keys)
+        before = np.concatenate([np.roll(k, 1) for k in keys])
+        after = np.concatenate([np.roll(k, -1) for k in keys])
+        neighbours = np.column_stack([point, np.minimum(before, after), np.maximum(before, after)])
+        distinct = np.unique(neighbours, axis=0)
+        points, counts = np.unique(distinct[:, 0], return_counts=True)
+        return set(points[counts > 1].tolist()), quantization + 1
+
+    def _cut(self, ring, junctions):
+        """Arc references for one ring, adding new arcs as needed"""
+        junction_keys, base = junctions
+        keys = ring[:, 0] * base + ring[:, 1]
+        cuts = np.flatnonzero([key in junction_keys for key in keys.tolist()])
+
+        if len(cuts) == 0:
+            # A ring nobody else touches (or one another ring repeats whole): one closed arc
+            # from a canonical start, so the repeated ring matches either way round
+            start = int(np.argmin(keys))
+            ring = np.roll(ring, -start, axis=0)
+            return [self._arc(np.vstack([ring, ring[:1]]), closed=True)]
+
+        ring = np.roll(ring, -cuts[0], axis=0)
+        cuts = np.append(cuts - cuts[0], len(ring))
+        ring = np.vstack([ring, ring[:1]])
+        return [self._arc(ring[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+    def _arc(self, coords, closed=False):
+        forward = coords.tobytes()
+        if forward in self._arc_ids:
+            return self._arc_ids[forward]
+        backward = coords[::-1]
+        if closed:
+            # Reversed closed ring, rotated back to the same canonical start
+            backward = np.vstack([backward[:-1], backward[:1]])
+        if backward.tobytes() in self._arc_ids:
+            return ~self._arc_ids[backward.tobytes()]
+        self._arc_ids[forward] = len(self.arcs)
+        self.arcs.append(coords)
+        return len(self.arcs) - 1
+
+    def rings(self):
+        """Every ring's arc references, for checks that need all of them"""
+        return [ring for polygons in self.objects for polygon in polygons for ring in polygon]
+
+    def simplify(self, tolerance):
+        """Arcs simplified with Douglas-Peucker at ``tolerance`` degrees
+
+        Arc end points never move. A ring that would drop below three
+        vertices keeps its arcs at full resolution (and so do the districts
+        sharing them).
+        """
+        if tolerance <= 0:
+            return list(self.arcs)
+        lines = np.array([shapely.linestrings(arc * self.scale + self.translate) for arc in self.arcs], dtype=object)
+        simplified = shapely.simplify(lines, tolerance, preserve_topology=False)
+        arcs = []
+        for original, line in zip(self.arcs, simplified):
+            coords = np.round((shapely.get_coordinates(line) - self.translate) / self.scale).astype(np.int64)
+            closed = (original[0] == original[-1]).all()
+            arcs.append(original if closed and len(coords) < 4 else coords)
+
+        for ring in self.rings():
+            if sum(len(arcs[ref if ref >= 0 else ~ref]) - 1 for ref in ring) < 3:
+                for ref in ring:
+                    arcs[ref if ref >= 0 else ~ref] = self.arcs[ref if ref >= 0 else ~ref]
+        return arcs
+
+    def ring_coordinates(self, ring, arcs):
+        """Absolute lon/lat coordinates of a ring from its arc references"""
+        parts = []
+        for ref in ring:
+            arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+            parts.append(arc if not parts else arc[1:])
+        return np.vstack(parts) * self.scale + self.translate
+
+    def geometries(self, arcs):
+        """Shapely geometries rebuilt from (simplified) arcs"""
+        rebuilt = []
+        for polygons in self.objects:
+            parts = [shapely.polygons(self.ring_coordinates(polygon[0], arcs),
+                                      holes=[self.ring_coordinates(ring, arcs) for ring in polygon[1:]] or None)
+                     for polygon in polygons]
+            rebuilt.append(parts[0] if len(parts) == 1 else shapely.multipolygons(parts) if parts else shapely.Polygon())
+        return np.array(rebuilt, dtype=object)
+
+    def to_topojson(self, arcs, name='districts'):
+        """TopoJSON dict with delta-encoded arcs"""
+        geometries = []
+        for polygons, properties in zip(self.objects, self.properties):
+            if not polygons:
+                geometry = {'type': None}
+            elif len(polygons) == 1:
+                geometry = {'type': 'Polygon', 'arcs': polygons[0]}
+            else:
+                geometry = {'type': 'MultiPolygon', 'arcs': polygons}
+            geometries.append(dict(geometry, properties=properties))
+
+        return {
+            'type': 'Topology',
+            'bbox': self.bbox,
+            'transform': {'scale': self.scale.tolist(), 'translate': self.translate.tolist()},
+            'objects': {name: {'type': 'GeometryCollection', 'geometries': geometries}},
+            'arcs': [np.vstack([arc[:1], np.diff(arc, axis=0)]).tolist() for arc in arcs]
+        }
+
+
+def dumps(topology):
+    return json.dumps(topology, separators=(',', ':')).encode('utf-8')
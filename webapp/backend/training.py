@@ -0,0 +1,257 @@
+# webapp/backend/training.py
+"""Parallel (dataset, model, fold) training engine for notebook 13
+
+Every cross-validation fit and every final full-data fit is an independent
+task: ``train_models`` puts all of them on one process pool, so the three
+models' five TimeSeriesSplit folds (and those of every district, when many
+datasets are trained together) run side by side instead of one after
+another on one core.
+
+The feature matrices and targets of every dataset are copied once into a
+single ``multiprocessing.shared_memory`` block; workers attach to it when
+they start and build their fold matrices as views into it, so a task only
+carries its dataset, model and fold boundaries. Each worker also caches
+a fold's prepared matrices (scaled when the model needs it), so the
+candidates of a hyperparameter search (search.py) running on the same
+``TrainingPool`` fit and score the same folds without redoing that work.
+Tasks are dispatched largest training set first, but results are
+collected in task order (dataset, then model, then fold), so the output
+does not depend on which worker finished first. With ``workers=1`` the
+same tasks run in this process.
+
+Every task times its fold preparation, fit and scoring as profiler.py
+spans, which come back with its result.
+"""
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+from profiler import span
+
+FINAL = 'final'
+
+# Worker-side view of the shared block: dataset key -> (X, y, feature names)
+_shared = {}
+# Worker-side prepared folds: (dataset, train, validate, scale) -> (X_train, X_eval, scaler)
+_folds = {}
+
+
+def _layout(datasets):
+    """Float64 offsets of every dataset's X and y in one block, and its size"""
+    layout, offset = {}, 0
+    for key, (X, y, _) in datasets.items():
+        layout[key] = (offset, X.shape, offset + X.size, len(y))
+        offset += X.size + len(y)
+    return layout, offset
+
+
+def _share(block, layout, feature_names):
+    """Keep views of every dataset in ``block`` for ``_fit``"""
+    buffer = np.ndarray(block.size // 8, dtype=np.float64, buffer=block.buf)
+    for key, (x_offset, shape, y_offset, rows) in layout.items():
+        X = buffer[x_offset:x_offset + shape[0] * shape[1]].reshape(shape)
+        _shared[key] = (X, buffer[y_offset:y_offset + rows], feature_names[key])
+    _shared[None] = block  # Keeps the mapping alive
+
+
+def _attach(name, layout, feature_names, trace_memory=False):
+    """Pool initializer: map the parent's block"""
+    from threadpoolctl import threadpool_limits
+
+    # Pool workers share the parent's resource tracker, so the parent's unlink covers them
+    block = shared_memory.SharedMemory(name=name)
+    _share(block, layout, feature_names)
+    # One BLAS thread per worker; the pool is the parallelism
+    threadpool_limits(1)
+    if trace_memory:
+        tracemalloc.start()
+
+
+def _rows(index):
+    """A contiguous index as a slice, so the fold is a view rather than a copy"""
+    index = np.asarray(index)
+    if len(index) and index[-1] - index[0] == len(index) - 1:
+        return slice(int(index[0]), int(index[-1]) + 1)
+    return index
+
+
+def _train_rows(task):
+    train = task[5]
+    return train.stop - train.start if isinstance(train, slice) else len(train)
+
+
+def _bounds(rows):
+    return (rows.start, rows.stop) if isinstance(rows, slice) else None
+
+
+def _prepare(key, train, validate, scale):
+    """Training and evaluation matrices of a fold, cached when the fold is contiguous"""
+    cache_key = (key, _bounds(train), _bounds(validate), scale)
+    if cache_key in _folds:
+        return _folds[cache_key]
+    X, _, feature_names = _shared[key]
+    X_train, X_eval, scaler = X[train], X[validate], None
+    if scale:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(pd.DataFrame(X_train, columns=feature_names))
+        X_eval = scaler.transform(pd.DataFrame(X_eval, columns=feature_names))
+    elif feature_names is not None:
+        X_train = pd.DataFrame(X_train, columns=feature_names)
+        X_eval = pd.DataFrame(X_eval, columns=feature_names)
+    if None not in cache_key[1:3]:
+        _folds[cache_key] = (X_train, X_eval, scaler)
+    return X_train, X_eval, scaler
+
+
+def _fit(task):
+    """Fit one (dataset, model, fold); scores folds, returns the fitted model for FINAL"""
+    key, name, fold, estimator, scale, train, validate = task
+    _, y, _ = _shared[key]
+    spans, labels = [], {'dataset': key, 'model': name, 'fold': fold}
+    start = time.perf_counter()
+
+    with span(f'{name}: task', spans, **labels):
+        with span(f'{name}: prepare fold', spans, **labels):
+            X_train, X_eval, scaler = _prepare(key, train, validate, scale)
+        with span(f'{name}: fit', spans, **labels):
+            model = clone(estimator).fit(X_train, y[train])
+        with span(f'{name}: score', spans, **labels):
+            prediction = model.predict(X_eval)
+            score = None if fold == FINAL else r2_score(y[validate], prediction)
+
+    result = {
+        'dataset': key,
+        'model': name,
+        'fold': fold,
+        'seconds': time.perf_counter() - start,
+        'pid': os.getpid(),
+        'feature_importance': getattr(model, 'feature_importances_', None),
+        'spans': spans,
+    }
+    if fold == FINAL:
+        result.update(estimator=model, scaler=scaler, prediction=prediction)
+    else:
+        result['score'] = score
+    return result
+
+
+def time_series_folds(X, n_splits=5):
+    """TimeSeriesSplit (train, validate) rows of ``X``, as slices where contiguous"""
+    return [(_rows(train), _rows(validate)) for train, validate in TimeSeriesSplit(n_splits).split(X)]
+
+
+def fold_tasks(datasets, models, n_splits=5):
+    """Every (dataset, model, fold) fit plus each pair's final fit, in result order"""
+    tasks = []
+    for key, (X, y, _) in datasets.items():
+        splits = time_series_folds(X, n_splits)
+        everything = slice(0, len(y))
+        for name, (estimator, scale) in models.items():
+            for fold, (train, validate) in enumerate(splits):
+                tasks.append((key, name, fold, estimator, scale, train, validate))
+            tasks.append((key, name, FINAL, estimator, scale, everything, everything))
+    return tasks
+
+
+class TrainingPool:
+    """Datasets in shared memory and the worker processes that fit on them
+
+    ``datasets`` maps a key (``'pakistan'``, a district, ...) to ``(X, y)``
+    or ``(X, y, feature_names)``. Use as a context manager; ``run`` can be
+    called any number of times and the workers (and their fold caches)
+    stay up in between. ``trace_memory`` has workers trace their
+    allocations, for the spans' peak memory.
+    """
+
+    def __init__(self, datasets, workers=None, trace_memory=False):
+        self.datasets = {key: (np.asarray(value[0], dtype=np.float64), np.asarray(value[1], dtype=np.float64),
+                               list(value[2]) if len(value) > 2 and value[2] is not None else None)
+                         for key, value in datasets.items()}
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.trace_memory = trace_memory
+        self.layout, size = _layout(self.datasets)
+        self.feature_names = {key: names for key, (_, _, names) in self.datasets.items()}
+        self._pool = None
+
+        self.block = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8)
+        buffer = np.ndarray(size, dtype=np.float64, buffer=self.block.buf)
+        for key, (X, y, _) in self.datasets.items():
+            x_offset, shape, y_offset, rows = self.layout[key]
+            buffer[x_offset:x_offset + X.size] = X.ravel()
+            buffer[y_offset:y_offset + rows] = y
+        del buffer
+        if self.workers == 1:
+            _share(self.block, self.layout, self.feature_names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, tasks):
+        """Outputs of ``_fit`` for every task, in task order"""
+        if self.workers == 1:
+            return [_fit(task) for task in tasks]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_attach,
+                                             initargs=(self.block.name, self.layout, self.feature_names,
+                                                       self.trace_memory))
+        # Largest training sets first, so a final fit does not start last and hold up the end
+        order = sorted(range(len(tasks)), key=lambda i: -_train_rows(tasks[i]))
+        futures = {i: self._pool.submit(_fit, tasks[i]) for i in order}
+        return [futures[i].result() for i in range(len(tasks))]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.workers == 1:
+            _shared.clear()
+            _folds.clear()
+        self.block.close()
+        self.block.unlink()
+
+
+def train_models(datasets, models, n_splits=5, workers=None, profiler=None):
+    """Cross-validate and fit every model on every dataset
+
+    ``datasets`` as for TrainingPool; ``models`` maps a name to
+    ``(estimator, scale)``, where ``scale`` fits a StandardScaler inside
+    each fold first. ``workers`` defaults to one per CPU. Returns
+    ``{key: {name: result}}`` with ``cv_scores`` (fold order),
+    ``feature_importance`` (summed over the folds, None for models without
+    one), ``estimator``, ``scaler`` and the final model's in-sample
+    ``prediction``, plus ``timings`` per task. A profiler.TrainingProfiler
+    receives every task's spans.
+    """
+    trace_memory = profiler is not None and profiler.memory
+    with TrainingPool(datasets, workers, trace_memory) as pool:
+        tasks = fold_tasks(pool.datasets, models, n_splits)
+        outputs = pool.run(tasks)
+
+    results = {key: {name: {'cv_scores': [], 'feature_importance': None, 'timings': []} for name in models}
+               for key in pool.datasets}
+    for output in outputs:
+        result = results[output['dataset']][output['model']]
+        result['timings'].append({'fold': output['fold'], 'seconds': output['seconds'], 'pid': output['pid']})
+        if profiler is not None:
+            profiler.add(output['spans'])
+        if output['fold'] == FINAL:
+            result.update(estimator=output['estimator'], scaler=output['scaler'], prediction=output['prediction'])
+            continue
+        result['cv_scores'].append(output['score'])
+        if output['feature_importance'] is not None:
+            if result['feature_importance'] is None:
+                result['feature_importance'] = np.zeros_like(output['feature_importance'])
+            result['feature_importance'] += output['feature_importance']
+    return results
@@ -0,0 +1,204 @@
+# webapp/backend/zonal.py
+"""Area-weighted zonal statistics of gridded fields over district polygons
+
+The grid is a regular, north-up lon/lat raster. Each polygon is clipped
+against every grid cell its bounding box touches (Sutherland-Hodgman
+against the cell's four edges, vectorized over the ring's vertices), and
+the clipped area times cos(latitude) becomes that cell's weight for the
+zone. Fields are then reduced as weighted means over the cells with data,
+so a district half covered by a pixel gets half that pixel's weight.
+
+Polygons use GeoJSON nesting: a zone is a list of polygons, a polygon a
+list of rings (exterior first, then holes), a ring an (N, 2) lon/lat array.
+"""
+import numpy as np
+
+
+class Grid:
+    """Regular north-up lon/lat grid: west/north edges, cell size in degrees and shape"""
+
+    def __init__(self, west, north, cell_width, cell_height, width, height):
+        self.west = float(west)
+        self.north = float(north)
+        self.cell_width = float(cell_width)
+        self.cell_height = float(cell_height)
+        self.width = int(width)
+        self.height = int(height)
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def column_edges(self):
+        return self.west + np.arange(self.width + 1) * self.cell_width
+
+    def row_edges(self):
+        """Top edge of each row, north to south, plus the bottom edge of the last"""
+        return self.north - np.arange(self.height + 1) * self.cell_height
+
+    def describe(self):
+        return {'west': self.west, 'north': self.north, 'cell_width': self.cell_width,
+                'cell_height': self.cell_height, 'width': self.width, 'height': self.height}
+
+
+class ZonalWeights:
+    """Sparse zone x cell overlap weights (cos-latitude scaled square degrees)"""
+
+    def __init__(self, zone_index, cell_index, weight, n_zones, grid):
+        order = np.lexsort((cell_index, zone_index))
+        self.zone_index = np.asarray(zone_index, dtype=np.int64)[order]
+        self.cell_index = np.asarray(cell_index, dtype=np.int64)[order]
+        self.weight = np.asarray(weight, dtype=np.float64)[order]
+        self.n_zones = n_zones
+        self.grid = grid
+
+    def coverage(self):
+        """Total weight per zone, i.e. its cos-latitude scaled area inside the grid"""
+        return np.bincount(self.zone_index, weights=self.weight, minlength=self.n_zones)
+
+
+def ring_area(ring):
+    """Signed shoelace area of a closed or open ring (positive when counter-clockwise)"""
+    if len(ring) < 3:
+        return 0.0
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def clip_half_plane(ring, axis, bound, keep_above):
+    """Clip a ring to ``coord[axis] >= bound`` (or ``<=`` when keep_above is False)"""
+    if len(ring) == 0:
+        return ring
+    nxt = np.roll(ring, -1, axis=0)
+    sign = 1.0 if keep_above else -1.0
+    d_this = (ring[:, axis] - bound) * sign
+    d_next = (nxt[:, axis] - bound) * sign
+    inside = d_this >= 0
+    crossing = inside != (d_next >= 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(crossing, d_this / (d_this - d_next), 0.0)
+    intersection = ring + t[:, None] * (nxt - ring)
+
+    # Each edge emits its start vertex when inside, then the crossing point if it leaves or enters
+    points = np.stack([ring, intersection], axis=1)
+    keep = np.stack([inside, crossing], axis=1)
+    return points[keep]
+
+
+def clip_box(ring, west, south, east, north):
+    ring = clip_half_plane(ring, 0, west, True)
+    ring = clip_half_plane(ring, 0, east, False)
+    ring = clip_half_plane(ring, 1, south, True)
+    return clip_half_plane(ring, 1, north, False)
+
+
+def polygon_cell_areas(polygon, grid):
+    """Overlap area (square degrees) of one polygon with each grid cell it touches
+
+    Returns ``(cell_index, area)`` arrays. Holes are subtracted.
+    """
+    rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon]
+    exterior = rings[0]
+    xs, ys = grid.column_edges(), grid.row_edges()
+
+    # Columns/rows the exterior's bounding box touches
+    col_lo = max(int(np.floor((exterior[:, 0].min() - grid.west) / grid.cell_width)), 0)
+    col_hi = min(int(np.ceil((exterior[:, 0].max() - grid.west) / grid.cell_width)), grid.width)
+    row_lo = max(int(np.floor((grid.north - exterior[:, 1].max()) / grid.cell_height)), 0)
+    row_hi = min(int(np.ceil((grid.north - exterior[:, 1].min()) / grid.cell_height)), grid.height)
+
+    cells, areas = [], []
+    for col in range(col_lo, col_hi):
+        # Clip to the column strip once, then cut the strip into cells
+        strips = [clip_half_plane(clip_half_plane(ring, 0, xs[col], True), 0, xs[col + 1], False) for ring in rings]
+        if len(strips[0]) < 3:
+            continue
+        for row in range(row_lo, row_hi):
+            area = 0.0
+            for i, strip in enumerate(strips):
+                piece = clip_half_plane(clip_half_plane(strip, 1, ys[row + 1], True), 1, ys[row], False)
+                piece_area = abs(ring_area(piece))
+                area += piece_area if i == 0 else -piece_area
+            if area > 0:
+                cells.append(row * grid.width + col)
+                areas.append(area)
+    return np.array(cells, dtype=np.int64), np.array(areas, dtype=np.float64)
+
+
+def overlap_weights(zones, grid):
+    """Build ``ZonalWeights`` for a list of zones (each a list of polygons)"""
+    row_centers = grid.north - (np.arange(grid.height) + 0.5) * grid.cell_height
+    cos_lat = np.cos(np.radians(row_centers))
+
+    zone_index, cell_index, weight = [], [], []
+    for zone, polygons in enumerate(zones):
+        for polygon in polygons:
+            cells, areas = polygon_cell_areas(polygon, grid)
+            zone_index.append(np.full(len(cells), zone))
+            cell_index.append(cells)
+            weight.append(areas * cos_lat[cells // grid.width])
+
+    if not zone_index:
+        return ZonalWeights(np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]), len(zones), grid)
+    return ZonalWeights(np.concatenate(zone_index), np.concatenate(cell_index), np.concatenate(weight), len(zones), grid)
+
+
+def zonal_mean(weights, fields, min_coverage=0.5):
+    """Weighted mean of each field over each zone
+
+    ``fields`` is (time, height, width) or (height, width); NaN pixels are
+    left out and the remaining weights renormalized. Zones whose valid
+    weight falls under ``min_coverage`` of their full weight get NaN.
+    Returns (time, zones), or (zones,) for a single field.
+    """
+    fields = np.asarray(fields, dtype=np.float64)
+    single = fields.ndim == 2
+    flat = fields.reshape(1 if single else fields.shape[0], -1)
+
+    values = flat[:, weights.cell_index]
+    valid = ~np.isnan(values)
+    weighted = np.where(valid, values, 0.0) * weights.weight
+    valid_weight = valid * weights.weight
+
+    # Zones are sorted, so each zone's cells form one contiguous run
+    zones_present, starts = np.unique(weights.zone_index, return_index=True)
+    result = np.full((flat.shape[0], weights.n_zones), np.nan)
+    if len(starts):
+        totals = np.add.reduceat(weighted, starts, axis=1)
+        covered = np.add.reduceat(valid_weight, starts, axis=1)
+        full = weights.coverage()[zones_present]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = totals / covered
+        means[covered < min_coverage * full] = np.nan
+        result[:, zones_present] = means
+    return result[0] if single else result
+
+
+def geojson_polygons(geometry):
+    """Polygon or MultiPolygon GeoJSON geometry as a list of polygons"""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return list(geometry['coordinates'])
+    raise ValueError(f"Unsupported geometry type: {geometry['type']}")
+
+
+def polygon_centroid(polygons):
+    """Area-weighted centroid (lon, lat) of a zone's exterior rings"""
+    total = cx = cy = 0.0
+    for polygon in polygons:
+        ring = np.asarray(polygon[0], dtype=np.float64)[:, :2]
+        x, y = ring[:, 0], ring[:, 1]
+        x1, y1 = np.roll(x, -1), np.roll(y, -1)
+        cross = x * y1 - x1 * y
+        area = cross.sum() / 2
+        if area == 0:
+            continue
+        cx += ((x + x1) * cross).sum() / 6
+        cy += ((y + y1) * cross).sum() / 6
+        total += area
+    if total == 0:
+        ring = np.asarray(polygons[0][0], dtype=np.float64)
+        return float(ring[:, 0].mean()), float(ring[:, 1].mean())
+    return cx / total, cy / total